@@ -0,0 +1,498 @@
+"""
+Module for benchmarking the search layer against a fake Bigdata backend.
+
+Each scenario screens a number of companies for a number of sentences over
+a number of monthly date ranges, the way `search_by_companies` does, with
+`FakeBigdata` injecting server latency, throttling and errors. The search
+(`run_search`, i.e. `SearchManager.concurrent_search`), the knowledge graph
+lookups (`EntityResolver.look_up_keys`) and the screener post-processing
+are timed separately. Results can be saved as a JSON baseline and compared
+with the baseline of another version to catch regressions:
+
+    python -m bigdata_research_tools.benchmark --output baseline.json
+    python -m bigdata_research_tools.benchmark --baseline baseline.json
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from bigdata_client.models.search import DocumentType
+
+from bigdata_research_tools.client import set_bigdata_client_factory
+from bigdata_research_tools.fake_bigdata import (
+    FakeBackendConfig,
+    FakeBigdata,
+    FakeCorpus,
+    FakeCorpusConfig,
+    use_fake_bigdata,
+)
+from bigdata_research_tools.search.entity_resolver import (
+    EntityResolver,
+    set_entity_resolver,
+)
+from bigdata_research_tools.search.query_builder import (
+    EntitiesToSearch,
+    build_batched_query,
+    create_date_ranges,
+)
+from bigdata_research_tools.search.rate_limiter import RateLimiter
+from bigdata_research_tools.search.screener_search import (
+    filter_company_entities,
+    process_screener_search_results,
+)
+from bigdata_research_tools.search.search import run_search
+from bigdata_research_tools.search.search_utils import filter_search_results
+from bigdata_research_tools.tracing import Trace
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Last day of the synthetic corpus; date ranges are counted back from it
+END_DATE = "2024-12-31"
+
+# Metrics where a higher value is better; lower is better for the others
+HIGHER_IS_BETTER = ("queries_per_second",)
+COMPARED_METRICS = (
+    "queries_per_second",
+    "latency_p95",
+    "latency_p99",
+    "token_wait_seconds",
+    "lookup_seconds",
+    "processing_seconds",
+    "peak_rss_mb",
+)
+
+
+@dataclass(frozen=True)
+class BenchmarkScenario:
+    """
+    A screening workload.
+
+    Args:
+        companies (int): Number of companies screened.
+        date_ranges (int): Number of monthly date ranges, ending on `END_DATE`.
+        sentences (int): Number of sentences screened for.
+    """
+
+    companies: int
+    date_ranges: int
+    sentences: int
+
+    @property
+    def name(self) -> str:
+        return f"{self.companies}c-{self.date_ranges}d-{self.sentences}s"
+
+
+SCENARIOS = [
+    BenchmarkScenario(companies, date_ranges, sentences)
+    for companies in (10, 100, 1000)
+    for date_ranges in (12, 60)
+    for sentences in (5, 20)
+]
+
+
+@dataclass
+class BenchmarkConfig:
+    """
+    Settings shared by the scenarios of a benchmark.
+
+    Args:
+        corpus (FakeCorpusConfig): The synthetic corpus; it must hold at least
+            as many companies as the largest scenario.
+        backend (FakeBackendConfig): Latency and failures of the fake backend.
+        rpm (int): Requests per minute of the client-side rate limiter.
+        max_workers (Optional[int]): Concurrent searches, see `run_search`.
+        adaptive_concurrency (bool): Whether to adapt the concurrency, see `run_search`.
+        document_limit (int): Documents per search.
+        batch_size (int): Companies per search.
+    """
+
+    corpus: FakeCorpusConfig = field(
+        default_factory=lambda: FakeCorpusConfig(documents=20_000, companies=1_000)
+    )
+    backend: FakeBackendConfig = field(
+        default_factory=lambda: FakeBackendConfig(
+            search_latency=0.05, search_latency_sigma=0.5, kg_latency=0.005
+        )
+    )
+    rpm: int = 60_000
+    max_workers: Optional[int] = 32
+    adaptive_concurrency: bool = False
+    document_limit: int = 10
+    batch_size: int = 10
+
+
+@dataclass
+class BenchmarkResult:
+    """
+    Measurements of a scenario.
+
+    Args:
+        scenario (str): Name of the scenario.
+        companies (int): Number of companies screened.
+        date_ranges (int): Number of date ranges.
+        sentences (int): Number of sentences.
+        searches (int): Searches issued, i.e. queries x date ranges.
+        failed_searches (int): Searches that failed after all retries.
+        search_seconds (float): Wall time of `run_search`.
+        queries_per_second (float): Searches completed per second of `run_search`.
+        latency_p50 (float): Median latency (in seconds) of a search as served by the backend.
+        latency_p95 (float): 95th percentile of the search latency.
+        latency_p99 (float): 99th percentile of the search latency.
+        token_wait_seconds (float): Total time spent waiting for rate limiter tokens.
+        lookup_seconds (float): Wall time of the knowledge graph lookup of the entities found.
+        processing_seconds (float): Wall time of the screener post-processing.
+        rows (int): Rows of the screener DataFrame.
+        peak_rss_mb (Optional[float]): Peak resident memory of the process
+            running the scenario, None where it cannot be measured.
+    """
+
+    scenario: str
+    companies: int
+    date_ranges: int
+    sentences: int
+    searches: int
+    failed_searches: int
+    search_seconds: float
+    queries_per_second: float
+    latency_p50: float
+    latency_p95: float
+    latency_p99: float
+    token_wait_seconds: float
+    lookup_seconds: float
+    processing_seconds: float
+    rows: int
+    peak_rss_mb: Optional[float]
+
+
+def run_scenario(
+    scenario: BenchmarkScenario,
+    config: Optional[BenchmarkConfig] = None,
+    corpus: Optional[FakeCorpus] = None,
+) -> BenchmarkResult:
+    """
+    Run a scenario in the current process.
+
+    Args:
+        scenario (BenchmarkScenario): The workload.
+        config (Optional[BenchmarkConfig]): The settings. Defaults to `BenchmarkConfig()`.
+        corpus (Optional[FakeCorpus]): A corpus generated from `config.corpus`,
+            to share it between scenarios.
+    Returns:
+        BenchmarkResult: The measurements. The peak memory covers the whole
+            process, see `run_benchmark` to isolate scenarios.
+    """
+    config = config or BenchmarkConfig()
+    backend = use_fake_bigdata(FakeBigdata(corpus or config.corpus, config.backend))
+    try:
+        return _run_scenario(scenario, config, backend)
+    finally:
+        set_bigdata_client_factory(None)
+        set_entity_resolver(None)
+
+
+def _run_scenario(
+    scenario: BenchmarkScenario, config: BenchmarkConfig, backend: FakeBigdata
+) -> BenchmarkResult:
+    """Run the phases of a scenario against an installed fake backend."""
+    companies = _pick_companies(backend.corpus, scenario.companies)
+    sentences = [f"Theme sentence {i}" for i in range(scenario.sentences)]
+    start_date = (
+        pd.Timestamp(END_DATE)
+        + pd.Timedelta(days=1)
+        - pd.DateOffset(months=scenario.date_ranges)
+    ).strftime("%Y-%m-%d")
+    date_ranges = create_date_ranges(start_date, END_DATE, "M")
+    # Company lookups and searches share the budget, as in a real run
+    rate_limiter = RateLimiter(rpm=config.rpm)
+    set_entity_resolver(EntityResolver(rate_limiter=rate_limiter))
+    queries = build_batched_query(
+        sentences=sentences,
+        keywords=None,
+        entities=EntitiesToSearch(companies=[company.id for company in companies]),
+        control_entities=None,
+        sources=None,
+        batch_size=config.batch_size,
+        fiscal_year=None,
+        scope=DocumentType.NEWS,
+        custom_batches=None,
+    )
+
+    started_at = time.perf_counter()
+    table, failed = run_search(
+        queries,
+        date_ranges=date_ranges,
+        scope=DocumentType.NEWS,
+        limit=config.document_limit,
+        return_failed=True,
+        max_workers=config.max_workers,
+        adaptive_concurrency=config.adaptive_concurrency,
+        as_chunk_table=True,
+        rate_limiter=rate_limiter,
+        current_trace=Trace(),
+    )
+    search_seconds = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    table, entities = filter_search_results(table)
+    lookup_seconds = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    try:
+        rows = len(
+            process_screener_search_results(
+                table,
+                filter_company_entities(entities),
+                companies=companies,
+                document_type=DocumentType.NEWS,
+            )
+        )
+    except ValueError:  # No rows to process
+        rows = 0
+    processing_seconds = time.perf_counter() - started_at
+
+    searches = len(queries) * len(date_ranges)
+    latencies = np.asarray(backend.stats.search_latencies or [0.0])
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]).tolist()
+    return BenchmarkResult(
+        scenario=scenario.name,
+        companies=scenario.companies,
+        date_ranges=len(date_ranges),
+        sentences=scenario.sentences,
+        searches=searches,
+        failed_searches=len(failed),
+        search_seconds=search_seconds,
+        queries_per_second=searches / search_seconds if search_seconds else 0.0,
+        latency_p50=p50,
+        latency_p95=p95,
+        latency_p99=p99,
+        token_wait_seconds=rate_limiter.stats.total_wait,
+        lookup_seconds=lookup_seconds,
+        processing_seconds=processing_seconds,
+        rows=rows,
+        peak_rss_mb=_peak_rss_mb(),
+    )
+
+
+def run_benchmark(
+    scenarios: Sequence[BenchmarkScenario] = SCENARIOS,
+    config: Optional[BenchmarkConfig] = None,
+    isolate: bool = True,
+) -> List[BenchmarkResult]:
+    """
+    Run scenarios one after the other.
+
+    Args:
+        scenarios (Sequence[BenchmarkScenario]): The workloads. Defaults to `SCENARIOS`.
+        config (Optional[BenchmarkConfig]): The settings. Defaults to `BenchmarkConfig()`.
+        isolate (bool): If True, run each scenario in a fresh process so that its
+            peak memory is measured on its own. If False, run them in the current
+            process, sharing one corpus. Defaults to True.
+    Returns:
+        List[BenchmarkResult]: The measurements of each scenario.
+    """
+    config = config or BenchmarkConfig()
+    results = []
+    corpus = None if isolate else FakeCorpus(config.corpus)
+    for scenario in scenarios:
+        logger.info(f"Running scenario {scenario.name}")
+        if isolate:
+            with ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context("spawn")
+            ) as executor:
+                result = executor.submit(run_scenario, scenario, config).result()
+        else:
+            result = run_scenario(scenario, config, corpus)
+        logger.info(
+            f"{result.scenario}: {result.queries_per_second:.1f} queries/s, "
+            f"p95 {result.latency_p95 * 1000:.0f} ms, {result.rows} rows"
+        )
+        results.append(result)
+    return results
+
+
+def save_baseline(
+    results: List[BenchmarkResult],
+    path: Optional[str],
+    config: Optional[BenchmarkConfig] = None,
+) -> dict:
+    """
+    Write benchmark results to a JSON file, with the version and settings they come from.
+
+    Args:
+        results (List[BenchmarkResult]): The measurements.
+        path (Optional[str]): The JSON file. None to only build the baseline.
+        config (Optional[BenchmarkConfig]): The settings of the run.
+    Returns:
+        dict: The baseline.
+    """
+    baseline = {
+        "version": _package_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "config": asdict(config or BenchmarkConfig()),
+        "results": [asdict(result) for result in results],
+    }
+    if path is not None:
+        with open(path, "w") as baseline_file:
+            json.dump(baseline, baseline_file, indent=2)
+    return baseline
+
+
+def load_baseline(path: str) -> dict:
+    """Read a baseline written by `save_baseline`."""
+    with open(path) as baseline_file:
+        return json.load(baseline_file)
+
+
+def compare_baselines(
+    baseline: dict, current: dict, tolerance: float = 0.2, min_seconds: float = 0.05
+) -> List[str]:
+    """
+    Find the regressions of a benchmark run with respect to a baseline.
+
+    Scenarios are matched by name. A metric regresses if it is worse than
+    in the baseline by more than `tolerance` (relative); durations must also
+    be worse by more than `min_seconds`, so that the noise of very short
+    phases is not reported. The number of rows regresses if it changes at
+    all, as the output should not depend on performance work.
+
+    Args:
+        baseline (dict): The reference, as returned by `save_baseline` or `load_baseline`.
+        current (dict): The run to check, in the same format.
+        tolerance (float): Allowed relative degradation. Defaults to 0.2.
+        min_seconds (float): Allowed absolute degradation of durations. Defaults to 0.05.
+    Returns:
+        List[str]: A description of each regression, empty if there is none.
+    """
+    reference = {result["scenario"]: result for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        previous = reference.get(result["scenario"])
+        if previous is None:
+            continue
+        if result["rows"] != previous["rows"]:
+            regressions.append(
+                f"{result['scenario']}: rows changed from {previous['rows']} "
+                f"to {result['rows']}"
+            )
+        for metric in COMPARED_METRICS:
+            before, after = previous.get(metric), result.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            if metric in HIGHER_IS_BETTER:
+                change = -change
+            is_duration = metric.endswith("_seconds") or metric.startswith("latency")
+            if is_duration and abs(after - before) <= min_seconds:
+                continue
+            if change > tolerance:
+                regressions.append(
+                    f"{result['scenario']}: {metric} went from {before:.4g} "
+                    f"to {after:.4g} ({change:+.0%} worse)"
+                )
+    return regressions
+
+
+def _pick_companies(corpus: FakeCorpus, count: int) -> list:
+    """Pick companies spread over the popularity range of the corpus."""
+    if count > len(corpus.companies):
+        raise ValueError(
+            f"The corpus has {len(corpus.companies)} companies, {count} requested"
+        )
+    step = len(corpus.companies) // count
+    return corpus.companies[::step][:count]
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Peak resident memory of the current process, in MB."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in kilobytes elsewhere
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+def _package_version() -> Optional[str]:
+    """The installed version of the package, if any."""
+    try:
+        from bigdata_research_tools import __version__
+    except Exception:  # Not installed
+        return None
+    return __version__
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point. Returns 1 if a regression is found."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--companies", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--date-ranges", type=int, nargs="+", default=[12, 60])
+    parser.add_argument("--sentences", type=int, nargs="+", default=[5, 20])
+    parser.add_argument("--documents", type=int, default=20_000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--kg-latency", type=float, default=0.005)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rpm", type=int, default=60_000)
+    parser.add_argument("--max-workers", type=int, default=32)
+    parser.add_argument("--adaptive-concurrency", action="store_true")
+    parser.add_argument("--no-isolate", action="store_true")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare the results with this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    config = BenchmarkConfig(
+        corpus=FakeCorpusConfig(
+            documents=args.documents, companies=max(1_000, max(args.companies))
+        ),
+        backend=FakeBackendConfig(
+            search_latency=args.latency,
+            search_latency_sigma=args.latency_sigma,
+            kg_latency=args.kg_latency,
+            throttle_rate=args.throttle_rate,
+            error_rate=args.error_rate,
+        ),
+        rpm=args.rpm,
+        max_workers=args.max_workers,
+        adaptive_concurrency=args.adaptive_concurrency,
+    )
+    scenarios = [
+        BenchmarkScenario(companies, date_ranges, sentences)
+        for companies in args.companies
+        for date_ranges in args.date_ranges
+        for sentences in args.sentences
+    ]
+    results = run_benchmark(scenarios, config, isolate=not args.no_isolate)
+
+    current = save_baseline(results, args.output, config)
+    if args.baseline:
+        regressions = compare_baselines(
+            load_baseline(args.baseline), current, args.tolerance
+        )
+        for regression in regressions:
+            logger.warning(regression)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,19 @@
+from hashlib import sha256
 from logging import Logger, getLogger
 from os import environ
+from threading import Lock
 from time import sleep
-from typing import Optional
+from typing import Callable, Dict, Optional
 
 from bigdata_client import Bigdata
 
 logger: Logger = getLogger(__name__)
 
-_bigdata_client: Optional[Bigdata] = None
+# Authenticated clients, keyed by a digest of their credentials
+_bigdata_clients: Dict[str, Bigdata] = {}
+_bigdata_clients_lock = Lock()
+# Creates a client from a username and a password, see `set_bigdata_client_factory`
+_bigdata_client_factory: Callable[[Optional[str], Optional[str]], Bigdata] = Bigdata
 
 
 def init_bigdata_client(
@@ -35,7 +41,7 @@ def init_bigdata_client(
             logger.debug(
                 f"Attempting to initialize BigData client.\nFile config: {file_config}"
             )
-            client = Bigdata(user, password)
+            client = _bigdata_client_factory(user, password)
         except Exception as e:
             logger.warning(
                 f"Bigdata error: {type(e).__name__}. {e}.\n"
@@ -55,11 +61,81 @@ def init_bigdata_client(
     return client
 
 
-def bigdata_connection():
+def bigdata_connection(user: str = None, password: str = None) -> Bigdata:
     """
-    Get the BigData client, using a singleton pattern.
+    Get the shared BigData client for the given credentials.
+
+    Clients are authenticated once per set of credentials and then reused by
+    every search, knowledge graph lookup and trace of the process, so repeated
+    calls keep their HTTP connections warm instead of authenticating again.
+    The function is thread-safe: concurrent first calls wait for a single
+    authentication. The size of the HTTP connection pool of each client is
+    set by the environment variable `BIGDATA_MAX_PARALLEL_REQUESTS`.
+
+    Args:
+        user (str): The username to authenticate.
+            If None, it will try to get it from the environment variable BIGDATA_USERNAME.
+        password (str): The password to authenticate.
+            If None, it will try to get it from the environment variable BIGDATA_PASSWORD.
+    Returns:
+        Bigdata: The shared client.
+    """
+    key = _credentials_key(user, password)
+    client = _bigdata_clients.get(key)
+    if client is not None:
+        return client
+    with _bigdata_clients_lock:
+        client = _bigdata_clients.get(key)
+        if client is None:
+            client = _bigdata_clients[key] = init_bigdata_client(user, password)
+    return client
+
+
+def set_bigdata_connection(
+    client: Bigdata, user: str = None, password: str = None
+) -> None:
+    """
+    Register a client as the shared BigData client for the given credentials,
+    e.g. to reuse a client created by the caller in the knowledge graph
+    lookups and traces of the library.
+
+    Args:
+        client (Bigdata): The client to share.
+        user (str): The username the client was authenticated with.
+            If None, it will try to get it from the environment variable BIGDATA_USERNAME.
+        password (str): The password the client was authenticated with.
+            If None, it will try to get it from the environment variable BIGDATA_PASSWORD.
+    """
+    with _bigdata_clients_lock:
+        _bigdata_clients[_credentials_key(user, password)] = client
+
+
+def set_bigdata_client_factory(
+    factory: Optional[Callable[[Optional[str], Optional[str]], Bigdata]],
+) -> None:
+    """
+    Replace the way BigData clients are created, e.g. to run the library
+    against `bigdata_research_tools.fake_bigdata.FakeBigdata`. The shared
+    clients created so far are dropped, so the next `bigdata_connection`
+    call uses the new factory.
+
+    Args:
+        factory (Optional[Callable[[Optional[str], Optional[str]], Bigdata]]): Called with
+            the username and password to create a client. None to go back to `Bigdata`.
     """
-    global _bigdata_client
-    if _bigdata_client is None:
-        _bigdata_client = init_bigdata_client()
-    return _bigdata_client
+    global _bigdata_client_factory
+    with _bigdata_clients_lock:
+        _bigdata_client_factory = factory or Bigdata
+        _bigdata_clients.clear()
+
+
+def _credentials_key(user: Optional[str], password: Optional[str]) -> str:
+    """Digest of the credentials resolved the same way as `init_bigdata_client`."""
+    credentials = "\0".join(
+        [
+            user or environ.get("BIGDATA_USERNAME", ""),
+            password or environ.get("BIGDATA_PASSWORD", ""),
+            environ.get("BIGDATA_API_KEY", ""),
+        ]
+    )
+    return sha256(credentials.encode("utf-8")).hexdigest()
@@ -0,0 +1,582 @@
+"""
+Module for a local stand-in of the Bigdata backend.
+
+`FakeBigdata` answers the calls the library makes to a `Bigdata` client
+(`search.new(...).run(limit)`, `knowledge_graph.get_entities`,
+`knowledge_graph.find_companies`, trace events) from a synthetic corpus
+generated from a seed, so searches, post-processing and the workflows can
+be exercised without an account, e.g. to benchmark or load test them in CI.
+Every request can be delayed by a random latency and can fail with
+throttling or transient errors at configurable rates, which exercises the
+retry, rate limiting and concurrency machinery like the real API does.
+
+Install it with `use_fake_bigdata`, which registers it as the client
+returned by `bigdata_connection`, or pass it as the `bigdata` argument of
+the search managers.
+"""
+
+import math
+import random
+import threading
+import time
+import zlib
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Deque, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import requests
+from bigdata_client.daterange import AbsoluteDateRange, RollingDateRange
+from bigdata_client.document import Document
+from bigdata_client.exceptions import BigdataClientRateLimitError
+from bigdata_client.models.advanced_search_query import QueryComponent
+from bigdata_client.models.entities import Company
+from bigdata_client.models.search import DocumentType, SortBy
+
+from bigdata_research_tools.client import set_bigdata_client_factory
+from bigdata_research_tools.search.entity_resolver import set_entity_resolver
+
+TOPICS = (
+    "artificial intelligence",
+    "supply chain",
+    "pricing power",
+    "data center demand",
+    "regulatory scrutiny",
+    "labor costs",
+    "share buybacks",
+    "energy transition",
+)
+
+
+@dataclass
+class FakeCorpusConfig:
+    """
+    Shape of the synthetic corpus of a `FakeBigdata`.
+
+    Args:
+        documents (int): Number of documents.
+        companies (int): Number of companies in the knowledge graph.
+        start_date (str): Earliest document timestamp.
+        end_date (str): Latest document timestamp.
+        chunks_per_document (Tuple[int, int]): Bounds of the number of chunks of a document.
+        entities_per_chunk (Tuple[int, int]): Bounds of the number of companies
+            mentioned in a chunk.
+        popularity (float): Exponent of the Zipf-like law with which companies are
+            mentioned; higher values concentrate mentions on a few companies.
+        similarity_rate (float): Fraction of chunks matched by any similarity sentence.
+        scopes (Tuple[str, ...]): Document scopes to draw from, e.g. ('news', 'transcripts').
+        seed (int): Seed of the corpus; the same seed gives the same corpus.
+    """
+
+    documents: int = 10_000
+    companies: int = 1_000
+    start_date: str = "2020-01-01"
+    end_date: str = "2024-12-31"
+    chunks_per_document: Tuple[int, int] = (1, 4)
+    entities_per_chunk: Tuple[int, int] = (1, 3)
+    popularity: float = 1.0
+    similarity_rate: float = 0.2
+    scopes: Tuple[str, ...] = ("news",)
+    seed: int = 0
+
+
+@dataclass
+class FakeBackendConfig:
+    """
+    Behaviour of the requests to a `FakeBigdata`.
+
+    Latencies follow a log-normal distribution with the given median and
+    shape (0 gives a constant latency). Searches beyond `rpm` in the last
+    minute, and a random `throttle_rate` of the others, raise
+    `BigdataClientRateLimitError`; a random `error_rate` raises a
+    `requests.ConnectionError`.
+
+    Args:
+        search_latency (float): Median latency (in seconds) of a search.
+        search_latency_sigma (float): Shape of the log-normal search latency.
+        kg_latency (float): Median latency (in seconds) of a knowledge graph lookup.
+        kg_latency_sigma (float): Shape of the log-normal lookup latency.
+        rpm (Optional[int]): Searches per minute accepted before throttling. None for no limit.
+        throttle_rate (float): Probability that a search is throttled.
+        error_rate (float): Probability that a search fails with a transient error.
+        kg_error_rate (float): Probability that a lookup fails with a transient error.
+        query_units (float): Query units reported by `get_usage` per search.
+        seed (Optional[int]): Seed of the latencies and failures. None for a random seed.
+    """
+
+    search_latency: float = 0.0
+    search_latency_sigma: float = 0.0
+    kg_latency: float = 0.0
+    kg_latency_sigma: float = 0.0
+    rpm: Optional[int] = None
+    throttle_rate: float = 0.0
+    error_rate: float = 0.0
+    kg_error_rate: float = 0.0
+    query_units: float = 1.0
+    seed: Optional[int] = 0
+
+
+@dataclass
+class FakeBackendStats:
+    """
+    Requests served by a `FakeBigdata`.
+
+    Args:
+        searches (int): Searches answered successfully.
+        throttled (int): Searches rejected by throttling.
+        errors (int): Searches failed with a transient error.
+        kg_lookups (int): Knowledge graph calls answered successfully.
+        kg_errors (int): Knowledge graph calls failed with a transient error.
+        traces (int): Trace events received.
+        search_latencies (List[float]): Time (in seconds) taken to answer each
+            successful search, including the injected latency.
+    """
+
+    searches: int = 0
+    throttled: int = 0
+    errors: int = 0
+    kg_lookups: int = 0
+    kg_errors: int = 0
+    traces: int = 0
+    search_latencies: List[float] = field(default_factory=list)
+
+
+class FakeCorpus:
+    """
+    Synthetic documents, indexed by the companies they mention.
+
+    Documents are kept as plain tuples sorted by timestamp and are only
+    turned into `Document` objects when returned by a search.
+    """
+
+    def __init__(self, config: FakeCorpusConfig):
+        self.config = config
+        rng = np.random.default_rng(config.seed)
+
+        self.companies = [
+            Company(
+                key=f"{0xA00000 + i:06X}",
+                name=f"Company {i:04d} Inc.",
+                entityType="COMP",
+                group2="United States",
+                group3=f"Sector {i % 11}",
+                group5=f"Industry {i % 37}",
+                metadata1=f"C{i:04d}",
+            )
+            for i in range(config.companies)
+        ]
+        self.company_by_key = {company.id: company for company in self.companies}
+
+        start = datetime.fromisoformat(config.start_date)
+        span = (datetime.fromisoformat(config.end_date) - start).total_seconds()
+        offsets = np.sort(rng.uniform(0, span, config.documents))
+        self.timestamps = [start + timedelta(seconds=int(offset)) for offset in offsets]
+        # Seconds since `start`, for bisection by date range
+        self._start = start
+        self._offsets = offsets.astype(np.int64)
+
+        weights = 1.0 / np.arange(1, config.companies + 1) ** config.popularity
+        weights /= weights.sum()
+        chunk_counts = rng.integers(
+            config.chunks_per_document[0],
+            config.chunks_per_document[1] + 1,
+            config.documents,
+        )
+        self.scopes = [
+            config.scopes[i]
+            for i in rng.integers(0, len(config.scopes), config.documents)
+        ]
+
+        # Per document: list of chunks, each a (text, mentions) pair
+        self.chunks: List[List[Tuple[str, List[Tuple[str, int, int]]]]] = []
+        documents_by_key: Dict[str, List[int]] = {}
+        for document, chunk_count in enumerate(chunk_counts):
+            chunks = []
+            for _ in range(chunk_count):
+                mentioned = rng.choice(
+                    config.companies,
+                    size=int(
+                        rng.integers(
+                            config.entities_per_chunk[0],
+                            config.entities_per_chunk[1] + 1,
+                        )
+                    ),
+                    replace=False,
+                    p=weights,
+                )
+                topic = TOPICS[int(rng.integers(len(TOPICS)))]
+                chunks.append(self._build_chunk(mentioned, topic))
+                for company in mentioned:
+                    key = self.companies[company].id
+                    keys = documents_by_key.setdefault(key, [])
+                    if not keys or keys[-1] != document:
+                        keys.append(document)
+            self.chunks.append(chunks)
+        self.documents_by_key = {
+            key: np.asarray(documents, dtype=np.int64)
+            for key, documents in documents_by_key.items()
+        }
+
+    def _build_chunk(
+        self, mentioned: Sequence[int], topic: str
+    ) -> Tuple[str, List[Tuple[str, int, int]]]:
+        """Write the text of a chunk mentioning some companies."""
+        text = ""
+        mentions = []
+        for company in mentioned:
+            company = self.companies[company]
+            if text:
+                text += " and "
+            mentions.append((company.id, len(text), len(text) + len(company.name)))
+            text += company.name
+        text += f" commented on {topic}."
+        return text, mentions
+
+    def date_bounds(
+        self, date_range: Union[AbsoluteDateRange, RollingDateRange, None]
+    ) -> Tuple[int, int]:
+        """The first and past-the-last document within a date range."""
+        if not isinstance(date_range, AbsoluteDateRange):
+            return 0, len(self.timestamps)
+        bounds = []
+        for bound, default in (
+            (date_range.start_dt, -math.inf),
+            (date_range.end_dt, math.inf),
+        ):
+            bounds.append(
+                (bound - self._start).total_seconds() if bound is not None else default
+            )
+        return (
+            int(np.searchsorted(self._offsets, bounds[0], side="left")),
+            int(np.searchsorted(self._offsets, bounds[1], side="right")),
+        )
+
+    def build_document(self, document: int, chunks: List[int]) -> Document:
+        """Build the `Document` of a search result with its matched chunks."""
+        scope = self.scopes[document]
+        first_mention = self.chunks[document][0][1][0][0]
+        return Document(
+            id=f"FAKE{document:08d}",
+            headline=f"Synthetic document {document}",
+            sentiment=0.0,
+            document_scope=scope,
+            source={"key": "FAKE01", "name": "Fake source", "rank": 1},
+            timestamp=self.timestamps[document],
+            chunks=[
+                {
+                    "text": self.chunks[document][chunk][0],
+                    "chunk": chunk,
+                    "entities": [
+                        {"key": key, "start": start, "end": end, "query_type": "entity"}
+                        for key, start, end in self.chunks[document][chunk][1]
+                    ],
+                    "sentences": [{"paragraph": 0, "sentence": chunk}],
+                    "relevance": 1.0,
+                    "sentiment": 0.0,
+                    "section_metadata": None,
+                    "speaker": None,
+                }
+                for chunk in chunks
+            ],
+            language="en",
+            reporting_entities=[first_mention] if scope != "news" else None,
+        )
+
+
+class FakeSearch:
+    """A search of a `FakeBigdata`, run with `run(limit)`."""
+
+    def __init__(
+        self,
+        backend: "FakeBigdata",
+        query: QueryComponent,
+        date_range: Union[AbsoluteDateRange, RollingDateRange, None],
+        sortby: SortBy,
+        scope: DocumentType,
+    ):
+        self._backend = backend
+        self._query = query.to_dict() if query is not None else None
+        self._date_range = date_range
+        self._sortby = sortby
+        self._scope = scope
+        self._usage = 0.0
+
+    def run(self, limit: int) -> List[Document]:
+        """Search the corpus, returning at most `limit` documents."""
+        started_at = time.monotonic()
+        self._backend._serve_search()
+        self._usage = self._backend.backend_config.query_units
+        corpus = self._backend.corpus
+
+        first, last = corpus.date_bounds(self._date_range)
+        keys = _required_entities(self._query)
+        if keys is None:
+            candidates = range(first, last)
+        else:
+            candidates = set()
+            for key in keys:
+                documents = corpus.documents_by_key.get(key)
+                if documents is not None:
+                    candidates.update(
+                        documents[
+                            np.searchsorted(documents, first) : np.searchsorted(
+                                documents, last
+                            )
+                        ].tolist()
+                    )
+            candidates = sorted(candidates)
+
+        matches = []
+        for document in candidates:
+            if (
+                self._scope not in (None, DocumentType.ALL)
+                and corpus.scopes[document] != self._scope.value
+            ):
+                continue
+            chunks = [
+                chunk
+                for chunk, (_, mentions) in enumerate(corpus.chunks[document])
+                if self._matches(self._query, document, chunk, mentions)
+            ]
+            if chunks:
+                matches.append((document, chunks))
+
+        if self._sortby == SortBy.DATE:
+            matches.reverse()
+        elif self._sortby != SortBy.DATE_ASC:
+            matches.sort(key=lambda match: -self._relevance(*match))
+        documents = [
+            corpus.build_document(document, chunks)
+            for document, chunks in matches[:limit]
+        ]
+        with self._backend._lock:
+            self._backend.stats.search_latencies.append(time.monotonic() - started_at)
+        return documents
+
+    def get_usage(self) -> float:
+        """Query units used by the search."""
+        return self._usage
+
+    def _matches(
+        self,
+        node: Optional[dict],
+        document: int,
+        chunk: int,
+        mentions: List[Tuple[str, int, int]],
+    ) -> bool:
+        """Evaluate a serialized query against a chunk."""
+        if node is None:
+            return True
+        node_type, value = node["type"], node["value"]
+        if node_type == "and":
+            return all(
+                self._matches(child, document, chunk, mentions) for child in value
+            )
+        if node_type == "or":
+            return any(
+                self._matches(child, document, chunk, mentions) for child in value
+            )
+        if node_type == "not":
+            return not self._matches(value, document, chunk, mentions)
+        if node_type == "entity":
+            return any(key in value for key, _, _ in mentions)
+        if node_type == "reporting_entities":
+            return self._backend.corpus.chunks[document][0][1][0][0] in value
+        if node_type == "similarity":
+            rate = self._backend.corpus.config.similarity_rate
+            return all(_score(sentence, document, chunk) < rate for sentence in value)
+        # Keywords, sources and other filters do not restrict the synthetic corpus
+        return True
+
+    def _relevance(self, document: int, chunks: List[int]) -> float:
+        """Deterministic relevance of a matched document."""
+        return max(_score("relevance", document, chunk) for chunk in chunks)
+
+
+class FakeSearchService:
+    """Stand-in of `Bigdata.search`."""
+
+    def __init__(self, backend: "FakeBigdata"):
+        self._backend = backend
+
+    def new(
+        self,
+        query: QueryComponent,
+        date_range: Union[AbsoluteDateRange, RollingDateRange, None] = None,
+        sortby: SortBy = SortBy.RELEVANCE,
+        scope: DocumentType = DocumentType.ALL,
+        rerank_threshold: Optional[float] = None,
+        **kwargs,
+    ) -> FakeSearch:
+        """Create a search, like `Bigdata.search.new`."""
+        return FakeSearch(self._backend, query, date_range, sortby, scope)
+
+
+class FakeKnowledgeGraph:
+    """Stand-in of `Bigdata.knowledge_graph`, knowing only the corpus companies."""
+
+    def __init__(self, backend: "FakeBigdata"):
+        self._backend = backend
+
+    def get_entities(self, keys: List[str]) -> List[Optional[Company]]:
+        """Look up entities by key; unknown keys give None."""
+        self._backend._serve_lookup()
+        return [self._backend.corpus.company_by_key.get(key) for key in keys]
+
+    def find_companies(self, value: str, limit: int = 20) -> List[Company]:
+        """Find the company with a key, or the companies whose name or ticker contains a value."""
+        self._backend._serve_lookup()
+        company = self._backend.corpus.company_by_key.get(value)
+        if company is not None:
+            return [company]
+        value = value.lower()
+        return [
+            company
+            for company in self._backend.corpus.companies
+            if value in company.name.lower() or value == (company.ticker or "").lower()
+        ][:limit]
+
+    def _find_nothing(self, value: str, limit: int = 20) -> list:
+        """The synthetic knowledge graph only holds companies."""
+        self._backend._serve_lookup()
+        return []
+
+    find_places = find_products = find_people = _find_nothing
+    find_organizations = find_topics = find_concepts = _find_nothing
+
+
+class _FakeApi:
+    """Stand-in of the private API of the client, used to send traces."""
+
+    def __init__(self, backend: "FakeBigdata"):
+        self._backend = backend
+
+    def send_tracking_event(self, event) -> None:
+        with self._backend._lock:
+            self._backend.stats.traces += 1
+
+
+class FakeBigdata:
+    """
+    Stand-in of a `Bigdata` client backed by a synthetic corpus.
+
+    The client is thread-safe and can be shared by every search manager of
+    a process. `stats` counts the requests served and failed.
+    """
+
+    def __init__(
+        self,
+        corpus: Union[FakeCorpus, FakeCorpusConfig, None] = None,
+        backend_config: Optional[FakeBackendConfig] = None,
+    ):
+        """
+        Create the client.
+
+        Args:
+            corpus (Union[FakeCorpus, FakeCorpusConfig, None]): The corpus, or its
+                configuration. Generating a corpus takes time, so one corpus can be
+                shared by several clients. Defaults to `FakeCorpusConfig()`.
+            backend_config (Optional[FakeBackendConfig]): Latencies and failure
+                rates. Defaults to instant, always successful requests.
+        """
+        if not isinstance(corpus, FakeCorpus):
+            corpus = FakeCorpus(corpus or FakeCorpusConfig())
+        self.corpus = corpus
+        self.backend_config = backend_config or FakeBackendConfig()
+        self.stats = FakeBackendStats()
+        self.search = FakeSearchService(self)
+        self.knowledge_graph = FakeKnowledgeGraph(self)
+        self._api = _FakeApi(self)
+        self._lock = threading.Lock()
+        self._random = random.Random(self.backend_config.seed)
+        self._recent_searches: Deque[float] = deque()
+
+    def _serve_search(self) -> None:
+        """Wait for the latency of a search, then throttle or fail it."""
+        config = self.backend_config
+        with self._lock:
+            latency = self._latency(config.search_latency, config.search_latency_sigma)
+            draw = self._random.random()
+            now = time.monotonic()
+            while self._recent_searches and self._recent_searches[0] <= now - 60:
+                self._recent_searches.popleft()
+            over_limit = (
+                config.rpm is not None and len(self._recent_searches) >= config.rpm
+            )
+            if not over_limit:
+                self._recent_searches.append(now)
+        time.sleep(latency)
+
+        with self._lock:
+            if over_limit or draw < config.throttle_rate:
+                self.stats.throttled += 1
+                raise BigdataClientRateLimitError("Too many requests (fake backend)")
+            if draw < config.throttle_rate + config.error_rate:
+                self.stats.errors += 1
+                raise requests.ConnectionError("Connection dropped (fake backend)")
+            self.stats.searches += 1
+
+    def _serve_lookup(self) -> None:
+        """Wait for the latency of a knowledge graph lookup, then maybe fail it."""
+        config = self.backend_config
+        with self._lock:
+            latency = self._latency(config.kg_latency, config.kg_latency_sigma)
+            failed = self._random.random() < config.kg_error_rate
+        time.sleep(latency)
+        with self._lock:
+            if failed:
+                self.stats.kg_errors += 1
+                raise requests.ConnectionError("Connection dropped (fake backend)")
+            self.stats.kg_lookups += 1
+
+    def _latency(self, median: float, sigma: float) -> float:
+        """Draw a log-normal latency. Called under the lock."""
+        if median <= 0:
+            return 0.0
+        if sigma <= 0:
+            return median
+        return self._random.lognormvariate(math.log(median), sigma)
+
+
+def use_fake_bigdata(client: Optional[FakeBigdata] = None, **kwargs) -> FakeBigdata:
+    """
+    Make `bigdata_connection` return a fake client, for every set of credentials.
+
+    Call `set_bigdata_client_factory(None)` to go back to the real client.
+    The shared entity resolver is reset, so that names resolved by another
+    client are looked up again.
+
+    Args:
+        client (Optional[FakeBigdata]): The client to install. Defaults to
+            `FakeBigdata(**kwargs)`.
+        kwargs (dict): Arguments of `FakeBigdata` when no client is given.
+    Returns:
+        FakeBigdata: The installed client.
+    """
+    client = client or FakeBigdata(**kwargs)
+    set_bigdata_client_factory(lambda user, password: client)
+    set_entity_resolver(None)
+    return client
+
+
+def _required_entities(node: Optional[dict]) -> Optional[set]:
+    """
+    Entity keys one of which every match must mention, or None if the query
+    does not restrict the entities.
+    """
+    if node is None:
+        return None
+    if node["type"] == "entity":
+        return set(node["value"])
+    if node["type"] == "and":
+        for child in node["value"]:
+            keys = _required_entities(child)
+            if keys is not None:
+                return keys
+    return None
+
+
+def _score(sentence: str, document: int, chunk: int) -> float:
+    """Deterministic pseudo-random score in [0, 1) of a sentence for a chunk."""
+    return zlib.crc32(f"{sentence}\0{document}\0{chunk}".encode("utf-8")) / 2**32
@@ -1,19 +1,91 @@
 from bigdata_research_tools.search.narrative_search import search_narratives
-from bigdata_research_tools.search.screener_search import search_by_companies
-from bigdata_research_tools.search.query_builder import build_batched_query, create_date_ranges
+from bigdata_research_tools.search.screener_search import (
+    merge_company_search_shards,
+    search_by_companies,
+    search_by_companies_shard,
+)
+from bigdata_research_tools.search.query_builder import (
+    batch_entities,
+    build_batched_query,
+    create_date_ranges,
+    iter_batched_query,
+)
 
+from bigdata_research_tools.search.cache import SearchCache
+from bigdata_research_tools.search.chunk_table import ChunkTable, ChunkTableBuilder
+from bigdata_research_tools.search.concurrency import (
+    AdaptiveConcurrency,
+    ConcurrencyReport,
+)
+from bigdata_research_tools.search.entity_index import EntityIndex
+from bigdata_research_tools.search.entity_resolver import (
+    EntityCache,
+    EntityResolver,
+    set_entity_resolver,
+)
+from bigdata_research_tools.search.journal import SearchJournal
+from bigdata_research_tools.search.query_planner import QueryPlan, plan_batched_query
+from bigdata_research_tools.search.rate_limiter import (
+    FileRateLimiter,
+    RateLimiter,
+    RateLimiterStats,
+    set_shared_rate_limiter,
+)
+from bigdata_research_tools.search.retry import FailedQuery, RetryPolicy
+from bigdata_research_tools.search.screener_tables import ScreenerTables
 from bigdata_research_tools.search.search import (
     SEARCH_QUERY_RESULTS_TYPE,
+    AsyncSearchManager,
     SearchManager,
+    aiter_search,
+    arun_search,
+    iter_search,
+    replay_failed_queries,
     run_search,
 )
+from bigdata_research_tools.search.sharding import (
+    merge_shards,
+    run_search_shard,
+    shard_cells,
+)
 
 __all__ = [
     "SearchManager",
+    "AsyncSearchManager",
+    "RateLimiter",
+    "FileRateLimiter",
+    "SearchCache",
+    "SearchJournal",
+    "EntityIndex",
+    "EntityResolver",
+    "EntityCache",
+    "set_entity_resolver",
+    "QueryPlan",
+    "plan_batched_query",
+    "ChunkTable",
+    "ChunkTableBuilder",
+    "RateLimiterStats",
+    "set_shared_rate_limiter",
+    "RetryPolicy",
+    "FailedQuery",
+    "AdaptiveConcurrency",
+    "ConcurrencyReport",
     "SEARCH_QUERY_RESULTS_TYPE",
     "run_search",
+    "arun_search",
+    "iter_search",
+    "aiter_search",
+    "replay_failed_queries",
+    "shard_cells",
+    "run_search_shard",
+    "merge_shards",
     "search_narratives",
     "search_by_companies",
+    "ScreenerTables",
+    "search_by_companies_shard",
+    "merge_company_search_shards",
     "build_batched_query",
+    "batch_entities",
+    "iter_batched_query",
     "create_date_ranges",
 ]
@@ -0,0 +1,211 @@
+"""
+Module for caching search results on disk.
+
+This module defines a `SearchCache` class that stores the documents returned
+by each Bigdata search in a local SQLite database, keyed by a fingerprint of
+the search parameters, so that re-running a workflow over the same universe
+and date window does not re-issue (and pay for) the same queries.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from logging import Logger, getLogger
+from typing import List, Optional
+
+from bigdata_client.document import Document
+
+from bigdata_research_tools.search.fingerprint import search_fingerprint
+
+logger: Logger = getLogger(__name__)
+
+DEFAULT_CACHE_TTL = 7 * 24 * 60 * 60  # One week, in seconds
+DEFAULT_CACHE_MAX_SIZE = 1024**3  # 1 GiB of compressed documents
+# Environment variable pointing to the database of the default search cache
+SEARCH_CACHE_PATH_ENV = "BIGDATA_SEARCH_CACHE_PATH"
+
+
+def serialize_documents(documents: List[Document]) -> bytes:
+    """
+    Serialize a list of documents into compressed JSON.
+
+    Args:
+        documents (List[Document]): The documents to serialize.
+    Returns:
+        bytes: The zlib-compressed JSON representation.
+    """
+    payload = [document.model_dump(mode="json") for document in documents]
+    return zlib.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+
+
+def deserialize_documents(data: bytes) -> List[Document]:
+    """
+    Rebuild the documents serialized by `serialize_documents`.
+
+    The documents are detached from any Bigdata connection, so methods that
+    call the API (e.g. `download_annotated_dict`) are not available on them.
+
+    Args:
+        data (bytes): The output of `serialize_documents`.
+    Returns:
+        List[Document]: The documents.
+    """
+    payload = json.loads(zlib.decompress(data).decode("utf-8"))
+    return [Document.model_validate(document) for document in payload]
+
+
+class SearchCache:
+    """
+    Persistent cache of search results, backed by SQLite.
+
+    Entries expire `ttl` seconds after being written and, once the total
+    size of the stored documents exceeds `max_size`, the least recently
+    used entries are evicted. The cache is safe to share between threads
+    and between processes using the same file.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: Optional[float] = DEFAULT_CACHE_TTL,
+        max_size: Optional[int] = DEFAULT_CACHE_MAX_SIZE,
+    ):
+        """
+        Initialize the search cache.
+
+        Args:
+            path (str): Path of the SQLite database file. Created if missing.
+            ttl (Optional[float]): Time to live of each entry, in seconds.
+                None disables expiration. Defaults to one week.
+            max_size (Optional[int]): Maximum total size of the stored
+                (compressed) documents, in bytes. None disables eviction.
+                Defaults to 1 GiB.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS search_results ("
+                "key TEXT PRIMARY KEY, "
+                "documents BLOB NOT NULL, "
+                "size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, "
+                "accessed_at REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS search_results_accessed_at "
+                "ON search_results (accessed_at)"
+            )
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._connection.close()
+
+    def get(self, key: str) -> Optional[List[Document]]:
+        """
+        Look up the documents stored for a search fingerprint.
+
+        Args:
+            key (str): The fingerprint, see `search_fingerprint`.
+        Returns:
+            Optional[List[Document]]: The cached documents, or None on a miss
+                (including expired entries).
+        """
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT documents, created_at FROM search_results WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                with self._connection:
+                    self._connection.execute(
+                        "DELETE FROM search_results WHERE key = ?", (key,)
+                    )
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            with self._connection:
+                self._connection.execute(
+                    "UPDATE search_results SET accessed_at = ? WHERE key = ?",
+                    (now, key),
+                )
+            self.hits += 1
+        return deserialize_documents(row[0])
+
+    def set(self, key: str, documents: List[Document]) -> None:
+        """
+        Store the documents returned by a search.
+
+        Args:
+            key (str): The fingerprint, see `search_fingerprint`.
+            documents (List[Document]): The documents to store.
+        """
+        data = serialize_documents(documents)
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO search_results "
+                "(key, documents, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data), now, now),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop the least recently used entries until the size bound holds."""
+        if self.max_size is None:
+            return
+        total_size = self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM search_results"
+        ).fetchone()[0]
+        if total_size <= self.max_size:
+            return
+
+        excess = total_size - self.max_size
+        evicted = []
+        for key, size in self._connection.execute(
+            "SELECT key, size FROM search_results ORDER BY accessed_at ASC"
+        ):
+            if excess <= 0:
+                break
+            evicted.append((key,))
+            excess -= size
+        self._connection.executemany(
+            "DELETE FROM search_results WHERE key = ?", evicted
+        )
+        logger.debug(f"Evicted {len(evicted)} entries from the search cache")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM search_results"
+            ).fetchone()[0]
+
+
+def create_search_cache() -> Optional[SearchCache]:
+    """
+    Create the default search cache for a search manager.
+
+    Caching is opt-in: a `SearchCache` is only returned when the environment
+    variable `BIGDATA_SEARCH_CACHE_PATH` is set, which also enables it for
+    workflows such as `ThematicScreener` and `RiskAnalyzer`.
+
+    Returns:
+        Optional[SearchCache]: The search cache, or None if caching is off.
+    """
+    path = os.environ.get(SEARCH_CACHE_PATH_ENV)
+    return SearchCache(path) if path else None
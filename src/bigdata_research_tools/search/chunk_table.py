@@ -0,0 +1,467 @@
+"""
+Module for storing search results in a compact columnar table.
+
+Full `Document` objects carry pydantic models for every chunk, sentence
+and entity mention, and keeping them alive until the post-processing is
+done dominates the peak memory of large screens. A `ChunkTable` keeps only
+the fields the post-processors use, as NumPy arrays: one row per document,
+one row per chunk and one row per entity mention. `ChunkTableBuilder`
+ingests each batch of documents as soon as its search completes, so the
+documents can be discarded right away.
+"""
+
+from array import array
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from bigdata_client.document import Document
+from bigdata_client.models.advanced_search_query import QueryComponent
+from bigdata_client.query_type import QueryType
+
+
+class ChunkTable:
+    """
+    Columnar table of the chunks of a set of search results.
+
+    Documents, chunks and entity mentions are stored in separate columns,
+    linked by offsets: the chunks of document `d` are the rows
+    `document_offsets[d]:document_offsets[d + 1]` and the mentions of chunk
+    `c` are the rows `mention_offsets[c]:mention_offsets[c + 1]`. Entity keys
+    are interned in `entity_keys` and referenced by `mention_entity`.
+
+    Attributes:
+        document_ids (np.ndarray): Document ids (object).
+        timestamps (np.ndarray): Document timestamps (object, as returned by the API).
+        headlines (np.ndarray): Document headlines (object).
+        reporting_entities (np.ndarray): Tuples of reporting entity keys (object).
+        document_offsets (np.ndarray): First chunk of each document (int64).
+        chunk_document (np.ndarray): Document of each chunk (int32).
+        chunk_index (np.ndarray): Index of each chunk in its document (int32).
+        texts (np.ndarray): Text of each chunk (object).
+        mention_offsets (np.ndarray): First mention of each chunk (int64).
+        mention_entity (np.ndarray): Entity of each mention, into `entity_keys` (int32).
+        mention_start (np.ndarray): Start offset of each mention in the text (int32).
+        mention_end (np.ndarray): End offset of each mention in the text (int32).
+        mention_is_entity (np.ndarray): Whether each mention is of query type
+            ENTITY, i.e. can be looked up in the Knowledge Graph (bool).
+        entity_keys (np.ndarray): The distinct entity keys (object).
+        match_offsets (np.ndarray): First match of each chunk (int64).
+        match_query (np.ndarray): Query of each match, into `queries` (int32).
+        queries (np.ndarray): The distinct queries that matched a chunk (object).
+    """
+
+    def __init__(
+        self,
+        document_ids: np.ndarray,
+        timestamps: np.ndarray,
+        headlines: np.ndarray,
+        reporting_entities: np.ndarray,
+        document_offsets: np.ndarray,
+        chunk_index: np.ndarray,
+        texts: np.ndarray,
+        mention_offsets: np.ndarray,
+        mention_entity: np.ndarray,
+        mention_start: np.ndarray,
+        mention_end: np.ndarray,
+        mention_is_entity: np.ndarray,
+        entity_keys: np.ndarray,
+        match_offsets: Optional[np.ndarray] = None,
+        match_query: Optional[np.ndarray] = None,
+        queries: Optional[np.ndarray] = None,
+    ):
+        self.document_ids = document_ids
+        self.timestamps = timestamps
+        self.headlines = headlines
+        self.reporting_entities = reporting_entities
+        self.document_offsets = document_offsets
+        self.chunk_document = np.repeat(
+            np.arange(len(document_ids), dtype=np.int32), np.diff(document_offsets)
+        )
+        self.chunk_index = chunk_index
+        self.texts = texts
+        self.mention_offsets = mention_offsets
+        self.mention_entity = mention_entity
+        self.mention_start = mention_start
+        self.mention_end = mention_end
+        self.mention_is_entity = mention_is_entity
+        self.entity_keys = entity_keys
+        self.match_offsets = (
+            match_offsets
+            if match_offsets is not None
+            else np.zeros(len(texts) + 1, dtype=np.int64)
+        )
+        self.match_query = (
+            match_query if match_query is not None else np.empty(0, dtype=np.int32)
+        )
+        self.queries = queries if queries is not None else np.empty(0, dtype=object)
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[Document]) -> "ChunkTable":
+        """
+        Build a table from a flat list of documents.
+
+        Args:
+            documents (Iterable[Document]): The documents.
+        Returns:
+            ChunkTable: The table, with the documents in the same order.
+        """
+        builder = ChunkTableBuilder()
+        builder.add(documents)
+        return builder.build()
+
+    def __len__(self) -> int:
+        """The number of chunks."""
+        return len(self.texts)
+
+    @property
+    def document_count(self) -> int:
+        """The number of documents."""
+        return len(self.document_ids)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the numeric columns, in bytes."""
+        return sum(
+            column.nbytes
+            for column in vars(self).values()
+            if isinstance(column, np.ndarray)
+        )
+
+    def document_chunks(self, document: int) -> range:
+        """The rows of the chunks of a document."""
+        return range(
+            self.document_offsets[document], self.document_offsets[document + 1]
+        )
+
+    def chunk_mentions(self, chunk: int) -> List[Tuple[str, int, int]]:
+        """
+        The entity mentions of a chunk.
+
+        Args:
+            chunk (int): The row of the chunk.
+        Returns:
+            List[Tuple[str, int, int]]: The key, start and end of each mention,
+                in the order of the original document.
+        """
+        mentions = slice(self.mention_offsets[chunk], self.mention_offsets[chunk + 1])
+        return list(
+            zip(
+                self.entity_keys[self.mention_entity[mentions]].tolist(),
+                self.mention_start[mentions].tolist(),
+                self.mention_end[mentions].tolist(),
+            )
+        )
+
+    def iter_chunks(self) -> Iterator[Tuple[int, int, str, List[Tuple[str, int, int]]]]:
+        """
+        Iterate over the chunks in table order.
+
+        Yields:
+            Tuple[int, int, str, List[Tuple[str, int, int]]]: The row of the
+                document of the chunk, the index of the chunk in the document,
+                its text and its entity mentions (see `chunk_mentions`).
+        """
+        entity_keys = self.entity_keys.tolist()
+        mention_keys = [entity_keys[code] for code in self.mention_entity.tolist()]
+        mention_start = self.mention_start.tolist()
+        mention_end = self.mention_end.tolist()
+        mention_offsets = self.mention_offsets.tolist()
+        for row, (document, chunk_index, text) in enumerate(
+            zip(
+                self.chunk_document.tolist(),
+                self.chunk_index.tolist(),
+                self.texts.tolist(),
+            )
+        ):
+            first, last = mention_offsets[row], mention_offsets[row + 1]
+            yield document, chunk_index, text, list(
+                zip(
+                    mention_keys[first:last],
+                    mention_start[first:last],
+                    mention_end[first:last],
+                )
+            )
+
+    def chunk_queries(self, chunk: int) -> List[QueryComponent]:
+        """
+        The queries that matched a chunk.
+
+        Args:
+            chunk (int): The row of the chunk.
+        Returns:
+            List[QueryComponent]: The distinct queries whose searches returned
+                the chunk, empty if the table was built without queries.
+        """
+        matches = slice(self.match_offsets[chunk], self.match_offsets[chunk + 1])
+        return self.queries[self.match_query[matches]].tolist()
+
+    def chunk_sentences(self, chunk: int) -> List[str]:
+        """
+        The similarity sentences of the queries that matched a chunk.
+
+        Args:
+            chunk (int): The row of the chunk.
+        Returns:
+            List[str]: The distinct sentences, in the order of `chunk_queries`.
+        """
+        sentences = {}
+        for query in self.chunk_queries(chunk):
+            for sentence in _similarity_sentences(query.to_dict()):
+                sentences.setdefault(sentence)
+        return list(sentences)
+
+    def collect_entity_keys(self) -> List[str]:
+        """The distinct keys of the mentions of query type ENTITY."""
+        return self.entity_keys[
+            np.unique(self.mention_entity[self.mention_is_entity])
+        ].tolist()
+
+
+class ChunkTableBuilder:
+    """
+    Incrementally build a `ChunkTable` from batches of documents.
+
+    Each batch is converted to arrays as soon as it is added, so the
+    documents need not be kept. Batches can be added in any order (e.g. as
+    concurrent searches complete) and are laid out in the order of their
+    `position` in the final table, which keeps the table deterministic.
+
+    Chunks are de-duplicated on ingestion by document id and chunk index:
+    a chunk returned by several searches (e.g. for several sentences or
+    overlapping entity batches) is only stored once, in the batch with the
+    lowest position, and the queries that matched it are kept as its
+    provenance (see `ChunkTable.chunk_queries`).
+    """
+
+    def __init__(self):
+        self._batches: List[dict] = []
+        self._entity_codes: Dict[str, int] = {}
+        self._query_codes: Dict[QueryComponent, int] = {}
+        self._chunk_codes: Dict[Tuple[str, int], int] = {}
+        # Batch and row of the stored copy of each chunk, by chunk code
+        self._owners: List[Tuple[int, int]] = []
+        # Pairs of chunk code and query code, one per match
+        self._match_chunks = array("q")
+        self._match_queries = array("i")
+        self.failed = 0
+        self.duplicates = 0
+
+    def add(
+        self,
+        documents: Optional[Iterable[Document]],
+        position: Hashable = None,
+        query: Optional[QueryComponent] = None,
+    ) -> None:
+        """
+        Ingest a batch of documents.
+
+        Args:
+            documents (Optional[Iterable[Document]]): The documents returned by
+                a search, or None if the search failed, which is only counted.
+            position (Hashable): Sortable position of the batch in the table,
+                e.g. the position of its search in the query x date range grid.
+                Either every batch or none has a position; batches without a
+                position keep the order in which they were added.
+            query (Optional[QueryComponent]): The query of the search, recorded
+                as a match of every chunk of the batch.
+        """
+        if documents is None:
+            self.failed += 1
+            return
+
+        number = len(self._batches)
+        order = (position, number) if position is not None else (number,)
+        # Only register the query once it matches a chunk, so that queries
+        # drawn lazily and returning nothing are not retained
+        query_code = None
+
+        document_ids, timestamps, headlines, reporting_entities = [], [], [], []
+        chunk_document, chunk_codes, chunk_index, texts = [], [], [], []
+        mention_counts, mention_entity, mention_start, mention_end = [], [], [], []
+        mention_is_entity = []
+        for document in documents:
+            stored = False
+            if query is not None and query_code is None and document.chunks:
+                query_code = self._query_codes.setdefault(query, len(self._query_codes))
+            for chunk in document.chunks:
+                key = (document.id, chunk.chunk)
+                chunk_code = self._chunk_codes.get(key)
+                if chunk_code is None:
+                    chunk_code = self._chunk_codes[key] = len(self._owners)
+                    self._owners.append((number, len(texts)))
+                elif not self._take_ownership(chunk_code, order, len(texts)):
+                    self.duplicates += 1
+                    self._record_match(chunk_code, query_code)
+                    continue
+                self._record_match(chunk_code, query_code)
+
+                if not stored:
+                    document_ids.append(document.id)
+                    timestamps.append(document.timestamp)
+                    headlines.append(document.headline)
+                    reporting_entities.append(tuple(document.reporting_entities or ()))
+                    stored = True
+                chunk_document.append(len(document_ids) - 1)
+                chunk_codes.append(chunk_code)
+                chunk_index.append(chunk.chunk)
+                texts.append(chunk.text)
+                mention_counts.append(len(chunk.entities))
+                for entity in chunk.entities:
+                    mention_entity.append(
+                        self._entity_codes.setdefault(
+                            entity.key, len(self._entity_codes)
+                        )
+                    )
+                    mention_start.append(entity.start)
+                    mention_end.append(entity.end)
+                    mention_is_entity.append(entity.query_type == QueryType.ENTITY)
+
+        self._batches.append(
+            {
+                "order": order,
+                "document_ids": _object_array(document_ids),
+                "timestamps": _object_array(timestamps),
+                "headlines": _object_array(headlines),
+                "reporting_entities": _object_array(reporting_entities),
+                "chunk_document": np.asarray(chunk_document, dtype=np.int64),
+                "chunk_codes": np.asarray(chunk_codes, dtype=np.int64),
+                "chunk_alive": np.ones(len(texts), dtype=bool),
+                "chunk_index": np.asarray(chunk_index, dtype=np.int32),
+                "texts": _object_array(texts),
+                "mention_counts": np.asarray(mention_counts, dtype=np.int64),
+                "mention_entity": np.asarray(mention_entity, dtype=np.int32),
+                "mention_start": np.asarray(mention_start, dtype=np.int32),
+                "mention_end": np.asarray(mention_end, dtype=np.int32),
+                "mention_is_entity": np.asarray(mention_is_entity, dtype=bool),
+            }
+        )
+
+    def _take_ownership(self, chunk_code: int, order: tuple, row: int) -> bool:
+        """
+        Decide whether a batch stores a chunk already stored by another batch.
+
+        The batch with the lowest position keeps the chunk, whatever the order
+        in which batches are added; the copy of a higher batch is dropped.
+        """
+        number, owner_row = self._owners[chunk_code]
+        if number >= len(self._batches) or order >= self._batches[number]["order"]:
+            # Stored earlier in the same batch, or by a lower batch
+            return False
+        self._batches[number]["chunk_alive"][owner_row] = False
+        self._owners[chunk_code] = (len(self._batches), row)
+        self.duplicates += 1
+        return True
+
+    def _record_match(self, chunk_code: int, query_code: Optional[int]) -> None:
+        """Record that a query matched a chunk."""
+        if query_code is not None:
+            self._match_chunks.append(chunk_code)
+            self._match_queries.append(query_code)
+
+    def build(self) -> ChunkTable:
+        """
+        Lay out the batches added so far into a table.
+
+        Returns:
+            ChunkTable: The table.
+        """
+        batches = [
+            _drop_dead_chunks(batch)
+            for batch in sorted(self._batches, key=lambda batch: batch["order"])
+        ]
+
+        def concatenate(column: str, dtype) -> np.ndarray:
+            arrays = [batch[column] for batch in batches]
+            return np.concatenate(arrays) if arrays else np.empty(0, dtype=dtype)
+
+        entity_keys = _object_array(list(self._entity_codes))
+        queries = _object_array(list(self._query_codes))
+        match_offsets, match_query = self._build_matches(
+            concatenate("chunk_codes", np.int64)
+        )
+
+        return ChunkTable(
+            document_ids=concatenate("document_ids", object),
+            timestamps=concatenate("timestamps", object),
+            headlines=concatenate("headlines", object),
+            reporting_entities=concatenate("reporting_entities", object),
+            document_offsets=_offsets(concatenate("chunk_counts", np.int64)),
+            chunk_index=concatenate("chunk_index", np.int32),
+            texts=concatenate("texts", object),
+            mention_offsets=_offsets(concatenate("mention_counts", np.int64)),
+            mention_entity=concatenate("mention_entity", np.int32),
+            mention_start=concatenate("mention_start", np.int32),
+            mention_end=concatenate("mention_end", np.int32),
+            mention_is_entity=concatenate("mention_is_entity", bool),
+            entity_keys=entity_keys,
+            match_offsets=match_offsets,
+            match_query=match_query,
+            queries=queries,
+        )
+
+    def _build_matches(self, chunk_codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Lay out the distinct queries matching each chunk of the table."""
+        match_chunks = np.frombuffer(self._match_chunks, dtype=np.int64)
+        match_queries = np.frombuffer(self._match_queries, dtype=np.int32)
+        # Distinct (chunk, query) pairs, sorted by chunk then query
+        pairs = np.unique(match_chunks * max(len(self._query_codes), 1) + match_queries)
+        pair_chunks = pairs // max(len(self._query_codes), 1)
+        pair_queries = (pairs % max(len(self._query_codes), 1)).astype(np.int32)
+
+        chunk_offsets = _offsets(np.bincount(pair_chunks, minlength=len(self._owners)))
+        starts = chunk_offsets[chunk_codes]
+        counts = chunk_offsets[chunk_codes + 1] - starts
+        match_offsets = _offsets(counts)
+        rows = np.repeat(starts - match_offsets[:-1], counts) + np.arange(
+            match_offsets[-1]
+        )
+        return match_offsets, pair_queries[rows]
+
+
+def _drop_dead_chunks(batch: dict) -> dict:
+    """Remove the chunks of a batch that were stored by a lower batch."""
+    alive = batch["chunk_alive"]
+    document_alive = np.zeros(len(batch["document_ids"]), dtype=bool)
+    document_alive[batch["chunk_document"][alive]] = True
+    mention_alive = np.repeat(alive, batch["mention_counts"])
+    return {
+        "document_ids": batch["document_ids"][document_alive],
+        "timestamps": batch["timestamps"][document_alive],
+        "headlines": batch["headlines"][document_alive],
+        "reporting_entities": batch["reporting_entities"][document_alive],
+        "chunk_counts": np.bincount(
+            batch["chunk_document"][alive], minlength=len(document_alive)
+        )[document_alive],
+        "chunk_codes": batch["chunk_codes"][alive],
+        "chunk_index": batch["chunk_index"][alive],
+        "texts": batch["texts"][alive],
+        "mention_counts": batch["mention_counts"][alive],
+        "mention_entity": batch["mention_entity"][mention_alive],
+        "mention_start": batch["mention_start"][mention_alive],
+        "mention_end": batch["mention_end"][mention_alive],
+        "mention_is_entity": batch["mention_is_entity"][mention_alive],
+    }
+
+
+def _similarity_sentences(node: dict) -> Iterator[str]:
+    """Walk a serialized query for the values of its similarity nodes."""
+    if node.get("type") == "similarity":
+        yield from node["value"]
+        return
+    for child in node.get("value", ()):
+        if isinstance(child, dict):
+            yield from _similarity_sentences(child)
+
+
+def _object_array(values: list) -> np.ndarray:
+    """Build a 1-D object array, even from a list of tuples."""
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def _offsets(counts: np.ndarray) -> np.ndarray:
+    """Turn per-row counts into offsets, starting at 0."""
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return offsets
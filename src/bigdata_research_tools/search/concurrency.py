@@ -0,0 +1,192 @@
+"""
+Module for adapting the number of concurrent searches.
+
+This module defines an `AdaptiveConcurrency` controller that tunes the
+number of searches in flight with additive increase / multiplicative
+decrease (AIMD): it adds a slot while throughput keeps rising and latency
+holds steady, and halves the number of slots when requests are throttled
+or fail with transient errors. The best concurrency depends on server
+latency, which varies widely with the scope and the rerank settings, so
+it is learned during the run instead of being fixed up front.
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+MAX_ADAPTIVE_WORKERS = 32
+
+
+@dataclass
+class ConcurrencyReport:
+    """
+    Summary of the concurrency chosen by an `AdaptiveConcurrency` during a run.
+
+    Args:
+        initial (int): Number of slots at the start of the run.
+        final (int): Number of slots at the end of the run.
+        peak (int): Largest number of slots reached.
+        mean (float): Number of slots averaged over the completed searches.
+        increases (int): Number of additive increases.
+        decreases (int): Number of multiplicative decreases.
+        searches (int): Number of searches completed (successfully or not).
+        requests_per_minute (float): Average rate of completed searches.
+    """
+
+    initial: int
+    final: int
+    peak: int
+    mean: float
+    increases: int
+    decreases: int
+    searches: int
+    requests_per_minute: float
+
+
+class AdaptiveConcurrency:
+    """
+    Thread-safe AIMD controller of the number of searches in flight.
+
+    The controller works in rounds of `limit` completed searches. At the end
+    of a round, the limit grows by `increase` if the mean latency of the
+    round stayed within `latency_tolerance` times the lowest latency seen so
+    far and the throughput rose by at least half of the gain expected from
+    the last extra slot. If latency rose, or throughput stalled (e.g. because
+    the rate limiter is the bottleneck), the limit is kept. A throttled or
+    transiently failed request multiplies the limit by `decrease`, at most
+    once per round, so a burst of errors from the same window of requests
+    only backs off once.
+    """
+
+    def __init__(
+        self,
+        initial: int = 4,
+        min_concurrency: int = 1,
+        max_concurrency: int = MAX_ADAPTIVE_WORKERS,
+        increase: int = 1,
+        decrease: float = 0.5,
+        latency_tolerance: float = 1.5,
+    ):
+        """
+        Initialize the controller.
+
+        Args:
+            initial (int): Number of searches in flight at the start. Defaults to 4.
+            min_concurrency (int): Lower bound of the limit. Defaults to 1.
+            max_concurrency (int): Upper bound of the limit. Defaults to 32.
+            increase (int): Slots added after a healthy round. Defaults to 1.
+            decrease (float): Factor applied to the limit on throttling or
+                errors, between 0 and 1. Defaults to 0.5.
+            latency_tolerance (float): How much the mean latency of a round
+                may exceed the lowest latency seen before growth stops.
+                Defaults to 1.5.
+        """
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+
+        self._limit = max(min_concurrency, min(initial, max_concurrency))
+        self._initial = self._limit
+        self._peak = self._limit
+        self._lock = threading.Lock()
+        self._started_at: Optional[float] = None
+        self._searches = 0
+        self._limit_sum = 0
+        self._increases = 0
+        self._decreases = 0
+        self._base_latency: Optional[float] = None
+        self._last_throughput: Optional[float] = None
+        self._since_decrease = 0
+        self._start_round(time.monotonic())
+
+    @property
+    def limit(self) -> int:
+        """The number of searches currently allowed in flight."""
+        with self._lock:
+            return self._limit
+
+    @property
+    def report(self) -> ConcurrencyReport:
+        """A summary of the concurrency chosen so far."""
+        with self._lock:
+            elapsed = time.monotonic() - (self._started_at or time.monotonic())
+            return ConcurrencyReport(
+                initial=self._initial,
+                final=self._limit,
+                peak=self._peak,
+                mean=self._limit_sum / self._searches if self._searches else 0.0,
+                increases=self._increases,
+                decreases=self._decreases,
+                searches=self._searches,
+                requests_per_minute=60 * self._searches / elapsed if elapsed else 0.0,
+            )
+
+    def record_success(self, latency: float) -> None:
+        """
+        Record a completed request.
+
+        Args:
+            latency (float): Time (in seconds) the request took, excluding
+                the wait for a rate limit token.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._count(now)
+            self._round_latency += latency
+            self._round_successes += 1
+            if self._round_completions >= self._limit:
+                self._end_round(now)
+
+    def record_failure(self) -> None:
+        """Record a request that was throttled or failed with a transient error."""
+        with self._lock:
+            now = time.monotonic()
+            self._count(now)
+            if self._decreases and self._since_decrease < self._limit:
+                return
+            limit = max(self.min_concurrency, int(self._limit * self.decrease))
+            if limit < self._limit:
+                self._limit = limit
+                self._decreases += 1
+            self._since_decrease = 0
+            self._last_throughput = None
+            self._start_round(now)
+
+    def _count(self, now: float) -> None:
+        """Account for a completed request. Called under the lock."""
+        if self._started_at is None:
+            self._started_at = now - 1e-9
+        self._searches += 1
+        self._limit_sum += self._limit
+        self._since_decrease += 1
+        self._round_completions += 1
+
+    def _start_round(self, now: float) -> None:
+        """Reset the metrics of the current round. Called under the lock."""
+        self._round_started_at = now
+        self._round_completions = 0
+        self._round_successes = 0
+        self._round_latency = 0.0
+
+    def _end_round(self, now: float) -> None:
+        """Decide whether to grow the limit. Called under the lock."""
+        latency = self._round_latency / max(self._round_successes, 1)
+        throughput = self._round_completions / max(now - self._round_started_at, 1e-9)
+        if self._base_latency is None or latency < self._base_latency:
+            self._base_latency = latency
+
+        latency_steady = latency <= self._base_latency * self.latency_tolerance
+        expected_gain = self.increase / (2 * self._limit)
+        throughput_rising = (
+            self._last_throughput is None
+            or throughput >= self._last_throughput * (1 + expected_gain)
+        )
+        if latency_steady and throughput_rising and self._limit < self.max_concurrency:
+            self._limit = min(self.max_concurrency, self._limit + self.increase)
+            self._peak = max(self._peak, self._limit)
+            self._increases += 1
+        self._last_throughput = throughput
+        self._start_round(now)
@@ -0,0 +1,229 @@
+"""
+Module for sizing the date windows of each entity batch before a run.
+
+`create_date_ranges` splits the period with one frequency for every query:
+batches of popular entities saturate `document_limit` in a few days, while
+batches of rarely mentioned entities return nothing for months. Before the
+run, `probe_density` searches every query and entity batch over a coarse grid
+of date ranges with a low limit, sorted by date, and estimates the number of
+matching documents of each probe from the time span of the documents it
+returned. `DensityProfile.schedule` then splits the dense date ranges and
+merges the sparse ones of each batch, into a `SearchSchedule` that
+`SearchSchedule.grid` turns into the queries and date ranges of `run_search`,
+and that `search_by_companies(density_probe=True)` builds and runs directly.
+"""
+
+import itertools
+import logging
+import math
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+from bigdata_client.document import Document
+from bigdata_client.models.advanced_search_query import QueryComponent
+from bigdata_client.models.search import DocumentType, SortBy
+
+from bigdata_research_tools.search.planner import (
+    SearchCell,
+    SearchSchedule,
+    bisect_date_range,
+    cell_key,
+    run_cells,
+)
+from bigdata_research_tools.search.query_builder import create_date_ranges
+from bigdata_research_tools.search.search import (
+    SearchManager,
+    normalize_date_range,
+    split_manager_kwargs,
+)
+
+# Shortest time span over which the documents of a saturated probe are
+# assumed to spread, to bound the estimate of a burst of documents
+MIN_PROBE_SPAN = pd.Timedelta(hours=1)
+
+
+@dataclass
+class DensityProfile:
+    """
+    Estimated number of matching documents of each query and entity batch
+    over each date range of the probe grid.
+
+    Args:
+        date_ranges (List[Tuple[str, str]]): The start and end of each date
+            range of the probe grid, in chronological order.
+        volumes (Dict[str, List[Optional[float]]]): The estimated number of
+            documents in each date range, for each cell key (see
+            `SearchCell.key`), None where the probe failed.
+        searches (int): Number of probes issued.
+        saturated (int): Number of probes that hit the probe limit, whose
+            volume is extrapolated.
+    """
+
+    date_ranges: List[Tuple[str, str]]
+    volumes: Dict[str, List[Optional[float]]] = field(default_factory=dict)
+    searches: int = 0
+    saturated: int = 0
+
+    def schedule(
+        self,
+        document_limit: int,
+        target_fill: float = 0.5,
+        min_window: str = "1D",
+    ) -> SearchSchedule:
+        """
+        Size the date ranges of each query and entity batch to its density.
+
+        A probe date range expected to hold more than `target_fill` x
+        `document_limit` documents is bisected, down to `min_window`, until
+        every part is expected to hold fewer; adjacent date ranges are merged
+        while they are expected to hold fewer together. Date ranges whose
+        probe failed are kept as they are.
+
+        Args:
+            document_limit (int): The maximum number of documents per search of the run.
+            target_fill (float): The expected share of `document_limit` filled
+                by a search. Defaults to 0.5, leaving room for the variance of
+                the estimates.
+            min_window (str): The shortest date range, as a pandas offset
+                alias. Defaults to '1D'.
+        Returns:
+            SearchSchedule: The date ranges of each cell key.
+        """
+        if not 0 < target_fill <= 1:
+            raise ValueError(f"`target_fill` must be in (0, 1], got {target_fill}")
+        target = target_fill * document_limit
+        min_window = pd.Timedelta(min_window)
+
+        schedule = SearchSchedule()
+        for key, volumes in self.volumes.items():
+            windows = []
+            for date_range, volume in zip(self.date_ranges, volumes):
+                if volume is None:
+                    windows.append((date_range, None))
+                    continue
+                parts = _divide_date_range(
+                    date_range, math.ceil(volume / target), min_window
+                )
+                windows.extend((part, volume / len(parts)) for part in parts)
+
+            merged = []
+            for window, volume in windows:
+                previous = merged[-1][1] if merged else None
+                if None not in (previous, volume) and previous + volume <= target:
+                    merged[-1] = ((merged[-1][0][0], window[1]), previous + volume)
+                else:
+                    merged.append((window, volume))
+            schedule.windows[key] = [window for window, _ in merged]
+        return schedule
+
+
+def probe_density(
+    queries: List[Optional[QueryComponent]],
+    entity_batches: Optional[List[List[QueryComponent]]],
+    start_date: str,
+    end_date: str,
+    freq: str = "Y",
+    probe_limit: int = 10,
+    scope: DocumentType = DocumentType.ALL,
+    rerank_threshold: Optional[float] = None,
+    **kwargs,
+) -> DensityProfile:
+    """
+    Estimate the number of documents of every query and entity batch over a
+    coarse grid of date ranges, with one cheap search per cell.
+
+    Each probe returns at most `probe_limit` documents, most recent first. A
+    probe that returns fewer found all its documents; a saturated probe is
+    extrapolated from the time span of its documents: `probe_limit` documents
+    published over a tenth of the date range suggest ten times as many over
+    the whole of it.
+
+    Args:
+        queries (List[Optional[QueryComponent]]): The queries, without entities,
+            e.g. as built by `build_batched_query` with `entities=None`.
+        entity_batches (Optional[List[List[QueryComponent]]]): Batches of entity
+            query components to combine with every query. None to probe the
+            queries on their own.
+        start_date (str): The start date of the period.
+        end_date (str): The end date of the period.
+        freq (str): The frequency of the probe grid. Defaults to 'Y'.
+        probe_limit (int): The maximum number of documents per probe. Defaults to 10.
+        scope (DocumentType): The scope of the documents to include.
+        rerank_threshold (Optional[float]): The threshold for reranking the
+            search results, as in the run.
+        kwargs (dict): Additional arguments for `SearchManager` and its
+            `iter_cells` method, such as `rpm`, `max_workers` or `current_trace`.
+    Returns:
+        DensityProfile: The estimated volumes, to size the date ranges of the
+            run with `DensityProfile.schedule`.
+    """
+    date_ranges = normalize_date_range(create_date_ranges(start_date, end_date, freq))
+    profile = DensityProfile(date_ranges=date_ranges)
+
+    cells = []
+    for query, batch in itertools.product(queries or [None], entity_batches or [[]]):
+        key = cell_key(query, batch)
+        profile.volumes[key] = [None] * len(date_ranges)
+        cells.extend(
+            SearchCell(query, tuple(batch), date_range, key)
+            for date_range in date_ranges
+        )
+    position = {date_range: i for i, date_range in enumerate(date_ranges)}
+
+    manager_kwargs, kwargs = split_manager_kwargs(kwargs)
+    manager = SearchManager(**manager_kwargs)
+    for cell, documents in run_cells(
+        manager, cells, SortBy.DATE, scope, probe_limit, rerank_threshold, kwargs
+    ):
+        profile.searches += 1
+        if documents is None:
+            continue
+        if len(documents) >= probe_limit:
+            profile.saturated += 1
+        profile.volumes[cell.key][position[cell.date_range]] = _estimate_volume(
+            documents, cell.date_range, probe_limit
+        )
+
+    logging.info(
+        f"Probed {profile.searches} searches over {len(date_ranges)} date ranges: "
+        f"{profile.saturated} saturated the probe limit of {probe_limit}"
+    )
+    return profile
+
+
+def _estimate_volume(
+    documents: List[Document], date_range: Tuple[str, str], probe_limit: int
+) -> float:
+    """Extrapolate the documents of a probe, most recent first, to its date range."""
+    if len(documents) < probe_limit:
+        return float(len(documents))
+    start, end = pd.Timestamp(date_range[0]), pd.Timestamp(date_range[1])
+    timestamps = [_naive(document.timestamp) for document in documents]
+    # The gaps between the documents, rather than up to the end of the date
+    # range, which may not have been published yet
+    span = max(max(timestamps) - min(timestamps), MIN_PROBE_SPAN)
+    return max((len(documents) - 1) * ((end - start) / span), float(len(documents)))
+
+
+def _naive(timestamp) -> pd.Timestamp:
+    """Drop the time zone of a timestamp, as the date ranges have none."""
+    timestamp = pd.Timestamp(timestamp)
+    return timestamp.tz_convert(None) if timestamp.tzinfo is not None else timestamp
+
+
+def _divide_date_range(
+    date_range: Tuple[str, str], parts: int, min_window: pd.Timedelta
+) -> List[Tuple[str, str]]:
+    """Bisect a date range into at least `parts` parts, as far as `min_window` allows."""
+    windows = [date_range]
+    while len(windows) < parts:
+        halves = [bisect_date_range(window, min_window) for window in windows]
+        if all(half is None for half in halves):
+            break
+        windows = [
+            part
+            for window, half in zip(windows, halves)
+            for part in (half if half is not None else (window,))
+        ]
+    return windows
@@ -0,0 +1,223 @@
+"""
+Module for joining the entity mentions of search results to their entities.
+
+The post-processors turn every entity mention of the search results into the
+name, ticker, sector, ... of its Knowledge Graph entity. An `EntityIndex` is
+built once per run from the looked-up entities: it holds their attributes as
+columns, aligned with their keys, and maps each key to its row. Joining a
+`ChunkTable` to it looks up each distinct key of the table once and maps the
+mentions to index rows with NumPy indexing, instead of looking up every
+mention in a dictionary and reading every attribute with `getattr`.
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from bigdata_client.models.advanced_search_query import ListQueryComponent
+
+from bigdata_research_tools.search.chunk_table import ChunkTable
+
+# The entity attributes kept as columns, None for entities without them
+ENTITY_ATTRIBUTES = (
+    "name",
+    "ticker",
+    "sector",
+    "industry",
+    "country",
+    "country_code",
+    "entity_type",
+)
+# The attributes of the entities of a chunk, as built by `build_chunk_entities`
+CHUNK_ENTITY_ATTRIBUTES = ("name", "ticker", "country", "country_code", "entity_type")
+
+
+class EntityIndex:
+    """
+    Columnar index of entities by key.
+
+    Entities are keyed by their `id`; when several entities share an id, the
+    last one is kept, as with a dictionary of the entities by id.
+
+    Args:
+        entities (Iterable[ListQueryComponent]): The entities, e.g. as looked
+            up by `filter_search_results`.
+
+    Attributes:
+        entities (List[ListQueryComponent]): The distinct entities, one per row.
+        keys (np.ndarray): The key of each row (object).
+        columns (Dict[str, np.ndarray]): The attributes of `ENTITY_ATTRIBUTES`
+            of each row (object).
+    """
+
+    def __init__(self, entities: Iterable[ListQueryComponent]):
+        self._rows: Dict[str, int] = {}
+        self.entities: List[ListQueryComponent] = []
+        for entity in entities:
+            row = self._rows.setdefault(entity.id, len(self.entities))
+            if row == len(self.entities):
+                self.entities.append(entity)
+            else:
+                self.entities[row] = entity
+
+        self.keys = _object_column(list(self._rows))
+        self.columns = {
+            attribute: _object_column(
+                [getattr(entity, attribute, None) for entity in self.entities]
+            )
+            for attribute in ENTITY_ATTRIBUTES
+        }
+
+    def __len__(self) -> int:
+        """The number of distinct entities."""
+        return len(self.entities)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+    def get(self, key: str) -> Optional[ListQueryComponent]:
+        """The entity of a key, or None if it is not indexed."""
+        row = self._rows.get(key)
+        return self.entities[row] if row is not None else None
+
+    def lookup(self, keys: Sequence[str]) -> np.ndarray:
+        """
+        Look up the rows of a sequence of keys.
+
+        Args:
+            keys (Sequence[str]): The keys.
+        Returns:
+            np.ndarray: The row of each key, -1 for keys that are not indexed (int64).
+        """
+        return np.fromiter(
+            (self._rows.get(key, -1) for key in keys), dtype=np.int64, count=len(keys)
+        )
+
+    def join(self, table: ChunkTable) -> "EntityJoin":
+        """
+        Join the entity mentions of a table to the index.
+
+        Each distinct key of the table is looked up once; mentions of keys
+        that are not indexed are dropped.
+
+        Args:
+            table (ChunkTable): The search results.
+        Returns:
+            EntityJoin: The indexed mentions of each chunk of the table.
+        """
+        rows = self.lookup(table.entity_keys)[table.mention_entity]
+        found = rows >= 0
+        # Number of indexed mentions before each mention, to offset the chunks
+        kept = np.zeros(len(found) + 1, dtype=np.int64)
+        np.cumsum(found, out=kept[1:])
+        return EntityJoin(
+            self,
+            kept[table.mention_offsets],
+            rows[found],
+            table.mention_start[found],
+            table.mention_end[found],
+        )
+
+    def mention_entities(
+        self,
+        mentions: List[Tuple[str, int, int]],
+        attributes: Sequence[str] = CHUNK_ENTITY_ATTRIBUTES,
+    ) -> List[dict]:
+        """
+        Build the list of entities present in a chunk from its entity mentions.
+
+        Args:
+            mentions (List[Tuple[str, int, int]]): The key, start and end of each
+                mention, e.g. from `ChunkTable.chunk_mentions`.
+            attributes (Sequence[str]): The attributes of the entities to
+                include. Defaults to `CHUNK_ENTITY_ATTRIBUTES`.
+        Returns:
+            List[dict]: The key, the attributes, the start and the end of each
+                mention of an indexed entity, in the order of the mentions.
+        """
+        keys = [key for key, _, _ in mentions]
+        rows = self.lookup(keys)
+        found = rows >= 0
+        joined = EntityJoin(
+            self,
+            np.array([0, np.count_nonzero(found)], dtype=np.int64),
+            rows[found],
+            np.array([start for _, start, _ in mentions], dtype=np.int64)[found],
+            np.array([end for _, _, end in mentions], dtype=np.int64)[found],
+        )
+        return joined.records(attributes)
+
+
+class EntityJoin:
+    """
+    The entity mentions of a `ChunkTable` joined to an `EntityIndex`.
+
+    Only the mentions of indexed entities are kept, in table order: the
+    mentions of chunk `c` are the rows `chunk_offsets[c]:chunk_offsets[c + 1]`.
+
+    Attributes:
+        index (EntityIndex): The index joined to.
+        chunk_offsets (np.ndarray): First joined mention of each chunk (int64).
+        rows (np.ndarray): Index row of each joined mention (int64).
+        start (np.ndarray): Start offset of each joined mention in the text.
+        end (np.ndarray): End offset of each joined mention in the text.
+    """
+
+    def __init__(
+        self,
+        index: EntityIndex,
+        chunk_offsets: np.ndarray,
+        rows: np.ndarray,
+        start: np.ndarray,
+        end: np.ndarray,
+    ):
+        self.index = index
+        self.chunk_offsets = chunk_offsets
+        self.rows = rows
+        self.start = start
+        self.end = end
+
+    def __len__(self) -> int:
+        """The number of joined mentions."""
+        return len(self.rows)
+
+    def column(self, attribute: str) -> np.ndarray:
+        """
+        An attribute of the entity of each joined mention.
+
+        Args:
+            attribute (str): 'key' or one of `ENTITY_ATTRIBUTES`.
+        Returns:
+            np.ndarray: The attribute of each joined mention (object).
+        """
+        if attribute == "key":
+            return self.index.keys[self.rows]
+        return self.index.columns[attribute][self.rows]
+
+    def records(self, attributes: Sequence[str] = ENTITY_ATTRIBUTES) -> List[dict]:
+        """
+        The joined mentions as dictionaries.
+
+        Args:
+            attributes (Sequence[str]): The attributes of the entities to
+                include. Defaults to `ENTITY_ATTRIBUTES`.
+        Returns:
+            List[dict]: The key, the attributes, the start and the end of each
+                joined mention; slice it with `chunk_offsets` for a chunk.
+        """
+        columns = [self.column(attribute).tolist() for attribute in attributes]
+        return [
+            {"key": key, **dict(zip(attributes, values)), "start": start, "end": end}
+            for key, start, end, *values in zip(
+                self.column("key").tolist(),
+                self.start.tolist(),
+                self.end.tolist(),
+                *columns,
+            )
+        ]
+
+
+def _object_column(values: list) -> np.ndarray:
+    """Store a list of scalars in an object array, element by element."""
+    column = np.empty(len(values), dtype=object)
+    column[:] = values
+    return column
@@ -0,0 +1,612 @@
+"""
+Module for resolving entity names and keys to Knowledge Graph entities.
+
+Queries are built from the names of companies, people, places and other
+entities, which must first be looked up with the `find_*` methods of the
+Bigdata Knowledge Graph, and the entities mentioned in search results are
+only known by their keys, which must be looked up with `get_entities`.
+This module defines an `EntityResolver` that runs those lookups concurrently
+under a rate limit and remembers their results in an in-process LRU and,
+optionally, in an `EntityCache` on disk keyed by entity type and name (or
+key), so that re-building the queries or post-processing the results of a
+large universe does not repeat one round-trip per name or batch of keys.
+"""
+
+import importlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from json import JSONDecodeError
+from logging import Logger, getLogger
+from re import findall
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+)
+
+from bigdata_client.connection import RequestMaxLimitExceeds
+from bigdata_client.models.entities import (
+    Concept,
+    Organization,
+    Person,
+    Place,
+    Product,
+)
+from bigdata_client.models.search import DocumentType
+from bigdata_client.query import Entity, ReportingEntity, Topic
+from pydantic import ValidationError
+
+from bigdata_research_tools.client import bigdata_connection
+from bigdata_research_tools.search.rate_limiter import (
+    RateLimiter,
+    get_shared_rate_limiter,
+)
+from bigdata_research_tools.search.retry import RetryPolicy, is_retryable_error
+
+logger: Logger = getLogger(__name__)
+
+DEFAULT_ENTITY_CACHE_TTL = 30 * 24 * 60 * 60  # 30 days, in seconds
+DEFAULT_NEGATIVE_TTL = 24 * 60 * 60  # Names without a match, one day
+DEFAULT_LRU_SIZE = 100_000
+MAX_LOOKUP_WORKERS = 8
+DEFAULT_KEY_BATCH_SIZE = 50
+# Cache kind of the lookups of entity keys, as opposed to entity names
+ENTITY_KEY_KIND = "key"
+# Keys of non-entities (e.g. sources or topics) reported in the validation
+# error of a lookup of entity keys
+NON_ENTITY_KEY_PATTERN = r"'key':\s*'([A-Z0-9]{6})'.+?'entityType':\s*'[A-Z]+'"
+# Environment variable pointing to the database of the default entity cache
+ENTITY_CACHE_PATH_ENV = "BIGDATA_ENTITY_CACHE_PATH"
+
+# Knowledge Graph method resolving the names of each entity type. Companies
+# share a lookup whether they are searched as entities or reporting entities.
+_LOOKUPS: Dict[Type, Tuple[str, str]] = {
+    Place: ("place", "find_places"),
+    Product: ("product", "find_products"),
+    Person: ("person", "find_people"),
+    Organization: ("organization", "find_organizations"),
+    Topic: ("topic", "find_topics"),
+    Concept: ("concept", "find_concepts"),
+    Entity: ("company", "find_companies"),
+    ReportingEntity: ("company", "find_companies"),
+}
+
+
+class EntityCache:
+    """
+    Persistent cache of entity lookups, backed by SQLite.
+
+    Each entry holds the first Knowledge Graph match of an entity name, or
+    no match. Matches expire `ttl` seconds after being written and names
+    without a match after `negative_ttl` seconds, so that entities added to
+    the Knowledge Graph are eventually found. The cache is safe to share
+    between threads and between processes using the same file.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: Optional[float] = DEFAULT_ENTITY_CACHE_TTL,
+        negative_ttl: Optional[float] = DEFAULT_NEGATIVE_TTL,
+    ):
+        """
+        Initialize the entity cache.
+
+        Args:
+            path (str): Path of the SQLite database file. Created if missing.
+            ttl (Optional[float]): Time to live of each match, in seconds.
+                None disables expiration. Defaults to 30 days.
+            negative_ttl (Optional[float]): Time to live of the names without
+                a match, in seconds. None disables expiration. Defaults to one day.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS entities ("
+                "kind TEXT NOT NULL, "
+                "name TEXT NOT NULL, "
+                "entity TEXT, "
+                "created_at REAL NOT NULL, "
+                "PRIMARY KEY (kind, name))"
+            )
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._connection.close()
+
+    def get_many(self, kind: str, names: Sequence[str]) -> Dict[str, Optional[Any]]:
+        """
+        Look up the stored matches of several names of an entity type.
+
+        Args:
+            kind (str): The entity type, e.g. 'company' or 'person'.
+            names (Sequence[str]): The entity names.
+        Returns:
+            Dict[str, Optional[Any]]: The match of each name found in the
+                cache, None for names stored without a match. Names missing
+                from the cache or expired are left out.
+        """
+        now = time.time()
+        rows = []
+        with self._lock:
+            # Stay below the default limit of 999 parameters of SQLite
+            for start in range(0, len(names), 500):
+                batch = list(names[start : start + 500])
+                rows.extend(
+                    self._connection.execute(
+                        "SELECT name, entity, created_at FROM entities "
+                        f"WHERE kind = ? AND name IN ({', '.join('?' * len(batch))})",
+                        [kind, *batch],
+                    )
+                )
+
+        found = {}
+        for name, entity, created_at in rows:
+            ttl = self.ttl if entity is not None else self.negative_ttl
+            if ttl is not None and now - created_at > ttl:
+                continue
+            found[name] = _deserialize_entity(entity) if entity is not None else None
+        return found
+
+    def set_many(self, kind: str, entities: Dict[str, Optional[Any]]) -> None:
+        """
+        Store the matches of several names of an entity type.
+
+        Args:
+            kind (str): The entity type, e.g. 'company' or 'person'.
+            entities (Dict[str, Optional[Any]]): The first match of each
+                name, or None if the name has no match.
+        """
+        now = time.time()
+        rows = [
+            (
+                kind,
+                name,
+                _serialize_entity(entity) if entity is not None else None,
+                now,
+            )
+            for name, entity in entities.items()
+        ]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO entities (kind, name, entity, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            row = self._connection.execute("SELECT COUNT(*) FROM entities").fetchone()
+        return row[0]
+
+
+class EntityResolver:
+    """
+    Resolve entity names with concurrent and cached Knowledge Graph lookups.
+
+    A name resolves to its first match in the Knowledge Graph and names
+    without a match are skipped; an entity key resolves to its entity and
+    keys of non-entities are skipped. Names and keys are looked up in the
+    in-process LRU first, then in the `EntityCache`, and only the remaining
+    ones are sent to the Knowledge Graph, from `max_workers` threads, each
+    taking a token from the rate limiter per request; transient errors are
+    retried with the `retry_policy`. Names and keys without a match are
+    remembered as well, names and keys whose lookup failed are not.
+    """
+
+    def __init__(
+        self,
+        cache: Optional[EntityCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        max_workers: int = MAX_LOOKUP_WORKERS,
+        lru_size: int = DEFAULT_LRU_SIZE,
+        retry_policy: Optional[RetryPolicy] = None,
+    ):
+        """
+        Initialize the entity resolver.
+
+        Args:
+            cache (Optional[EntityCache]): Persistent cache of the lookups.
+                Defaults to `create_entity_cache()`, i.e. no persistent cache
+                unless `BIGDATA_ENTITY_CACHE_PATH` is set.
+            rate_limiter (Optional[RateLimiter]): Rate limiter of the lookups.
+                Defaults to `get_shared_rate_limiter()`, the budget shared
+                with the search managers of the process.
+            max_workers (int): The maximum number of concurrent lookups.
+                Defaults to MAX_LOOKUP_WORKERS.
+            lru_size (int): The number of names and keys remembered in
+                memory. Defaults to DEFAULT_LRU_SIZE.
+            retry_policy (Optional[RetryPolicy]): How lookups failing with a
+                transient error are retried. Defaults to `RetryPolicy()`.
+        """
+        self.cache = cache if cache is not None else create_entity_cache()
+        self.rate_limiter = rate_limiter or get_shared_rate_limiter()
+        self.max_workers = max_workers
+        self.lru_size = lru_size
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.lookups = 0
+        self.lru_hits = 0
+        self.cache_hits = 0
+        self._lru: "OrderedDict[Tuple[str, str], Optional[Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resolve(self, names: List[str], entity_type: Type) -> List[Any]:
+        """
+        Resolve entity names of a single type.
+
+        Args:
+            names (List[str]): The entity names, e.g. company names or ids.
+            entity_type (Type): The query component type, e.g. `Entity`,
+                `ReportingEntity`, `Person` or `Topic`.
+        Returns:
+            List[Any]: The query components of the names with a match, in
+                the order of `names`. Companies are returned as `entity_type`.
+        """
+        return self.resolve_many([(names, entity_type)])[0]
+
+    def resolve_many(
+        self, requests: Iterable[Tuple[List[str], Type]]
+    ) -> List[List[Any]]:
+        """
+        Resolve the entity names of several types in one concurrent pass.
+
+        Args:
+            requests (Iterable[Tuple[List[str], Type]]): Pairs of entity names
+                and query component type, as the arguments of `resolve`.
+        Returns:
+            List[List[Any]]: The result of `resolve` for each request.
+        """
+        requests = [(names or [], entity_type) for names, entity_type in requests]
+        names_by_kind: Dict[str, List[str]] = {}
+        for names, entity_type in requests:
+            if entity_type not in _LOOKUPS:
+                continue
+            kind_names = names_by_kind.setdefault(_LOOKUPS[entity_type][0], [])
+            kind_names.extend(names)
+
+        resolved = {}
+        for kind, names in names_by_kind.items():
+            resolved.update(
+                ((kind, name), entity)
+                for name, entity in self._resolve_kind(
+                    kind, list(dict.fromkeys(names))
+                ).items()
+            )
+
+        results = []
+        for names, entity_type in requests:
+            kind = _LOOKUPS.get(entity_type, (None,))[0]
+            entities = []
+            for name in names:
+                entity = resolved.get((kind, name))
+                if entity is None:
+                    continue
+                if entity_type in (Entity, ReportingEntity):
+                    entity = entity_type(entity.id)
+                entities.append(entity)
+            results.append(entities)
+        return results
+
+    def look_up_keys(
+        self, keys: Sequence[str], max_batch_size: int = DEFAULT_KEY_BATCH_SIZE
+    ) -> List[Any]:
+        """
+        Look up the entities of entity keys, e.g. those mentioned in search results.
+
+        The keys missing from the caches are sent to the Knowledge Graph in
+        batches of `max_batch_size`, concurrently. Keys of non-entities are
+        dropped from a batch and remembered without a match; batches over
+        the request limit are halved. Batches failing with a transient error
+        are retried with the `retry_policy`, and their keys are left out,
+        and looked up again on the next call, if they still fail.
+
+        Args:
+            keys (Sequence[str]): The entity keys.
+            max_batch_size (int): The maximum number of keys per request.
+                Defaults to DEFAULT_KEY_BATCH_SIZE.
+        Returns:
+            List[Any]: The distinct entities of the keys with a match, in
+                the order of `keys`.
+        """
+        resolved = self._resolve_kind(
+            ENTITY_KEY_KIND,
+            list(dict.fromkeys(keys)),
+            lambda kind, missing: self._look_up_keys(missing, max_batch_size),
+        )
+        entities = {}
+        for entity in resolved.values():
+            if entity is not None and hasattr(entity, "id"):
+                entities.setdefault(entity.id, entity)
+        return list(entities.values())
+
+    def _resolve_kind(
+        self,
+        kind: str,
+        names: List[str],
+        look_up: Optional[Callable[[str, List[str]], Dict[str, Optional[Any]]]] = None,
+    ) -> Dict[str, Optional[Any]]:
+        """
+        Resolve distinct names of one entity type through the caches, looking
+        up the missing ones with `look_up` (defaults to `_look_up`).
+        """
+        look_up = look_up or self._look_up
+        resolved = {}
+        with self._lock:
+            for name in names:
+                if (kind, name) in self._lru:
+                    self._lru.move_to_end((kind, name))
+                    resolved[name] = self._lru[(kind, name)]
+            self.lru_hits += len(resolved)
+
+        missing = [name for name in names if name not in resolved]
+        if missing and self.cache is not None:
+            try:
+                cached = self.cache.get_many(kind, missing)
+            except Exception as e:
+                logger.warning(f"Entity cache error: {e}")
+                cached = {}
+            self.cache_hits += len(cached)
+            resolved.update(cached)
+            self._remember(kind, cached)
+            missing = [name for name in missing if name not in cached]
+
+        if missing:
+            looked_up = look_up(kind, missing)
+            if self.cache is not None:
+                try:
+                    self.cache.set_many(kind, looked_up)
+                except Exception as e:
+                    logger.warning(f"Entity cache error: {e}")
+            resolved.update(looked_up)
+            self._remember(kind, looked_up)
+        return resolved
+
+    def _look_up(self, kind: str, names: List[str]) -> Dict[str, Optional[Any]]:
+        """
+        Query the Knowledge Graph for the first match of each name. Lookups
+        failing with a transient error are retried with the `retry_policy`;
+        names whose lookup still fails are left out, and looked up again on
+        the next call.
+        """
+        method = next(method for k, method in _LOOKUPS.values() if k == kind)
+        lookup_func = getattr(bigdata_connection().knowledge_graph, method)
+
+        def look_up(name: str) -> Tuple[bool, Optional[Any]]:
+            attempt = 0
+            while True:
+                self.rate_limiter.acquire()
+                try:
+                    return True, next(iter(lookup_func(name)), None)
+                except Exception as e:
+                    if (
+                        is_retryable_error(e)
+                        and attempt < self.retry_policy.max_retries
+                    ):
+                        time.sleep(self.retry_policy.get_delay(attempt))
+                        attempt += 1
+                        continue
+                    logger.error(
+                        f"Failed to look up {kind} name {name!r}: "
+                        f"{e.__class__.__module__}.{e.__class__.__name__}: {e}"
+                    )
+                    return False, None
+
+        logger.debug(f"Looking up {len(names)} {kind} names")
+        self.lookups += len(names)
+        with ThreadPoolExecutor(
+            max_workers=min(self.max_workers, len(names))
+        ) as executor:
+            return {
+                name: entity
+                for name, (found, entity) in zip(names, executor.map(look_up, names))
+                if found
+            }
+
+    def _look_up_keys(
+        self, keys: List[str], max_batch_size: int
+    ) -> Dict[str, Optional[Any]]:
+        """Query the Knowledge Graph for the entity of each key, batches in parallel."""
+        knowledge_graph = bigdata_connection().knowledge_graph
+        batches = [
+            keys[start : start + max_batch_size]
+            for start in range(0, len(keys), max_batch_size)
+        ]
+
+        logger.debug(f"Looking up {len(keys)} entity keys in {len(batches)} batches")
+        self.lookups += len(keys)
+        looked_up = {}
+        with ThreadPoolExecutor(
+            max_workers=min(self.max_workers, len(batches))
+        ) as executor:
+            for found in executor.map(
+                lambda batch: self._look_up_key_batch(knowledge_graph, batch), batches
+            ):
+                looked_up.update(found)
+        return looked_up
+
+    def _look_up_key_batch(
+        self, knowledge_graph: Any, batch: List[str]
+    ) -> Dict[str, Optional[Any]]:
+        """
+        Look up a batch of entity keys, splitting it until every key is
+        resolved, known not to be an entity, or failed for good.
+        """
+        found = {}
+        # Sub-batches still to look up, with the number of retries so far;
+        # every split makes progress, so the loop ends
+        pending = [(batch, 0)]
+        while pending:
+            keys, attempt = pending.pop()
+            self.rate_limiter.acquire()
+            try:
+                entities = knowledge_graph.get_entities(keys)
+            except ValidationError as e:
+                non_entities = set(findall(NON_ENTITY_KEY_PATTERN, str(e)))
+                non_entities.intersection_update(keys)
+                if not non_entities:
+                    pending.extend(_halve(keys, attempt, found))
+                    continue
+                found.update(dict.fromkeys(non_entities))
+                remaining = [key for key in keys if key not in non_entities]
+                if remaining:
+                    pending.append((remaining, attempt))
+                continue
+            except (JSONDecodeError, RequestMaxLimitExceeds):
+                pending.extend(_halve(keys, attempt, found))
+                continue
+            except Exception as e:
+                if is_retryable_error(e) and attempt < self.retry_policy.max_retries:
+                    time.sleep(self.retry_policy.get_delay(attempt))
+                    pending.append((keys, attempt + 1))
+                else:
+                    logger.error(
+                        f"Failed to look up {len(keys)} entity keys: "
+                        f"{e.__class__.__module__}.{e.__class__.__name__}: {e}"
+                    )
+                continue
+
+            if len(entities) == len(keys):
+                found.update(zip(keys, entities))
+            else:
+                by_id = {
+                    entity.id: entity for entity in entities if hasattr(entity, "id")
+                }
+                found.update((key, by_id.get(key)) for key in keys)
+        return found
+
+    def _remember(self, kind: str, entities: Dict[str, Optional[Any]]) -> None:
+        """Add lookups to the LRU, evicting the least recently used names."""
+        with self._lock:
+            for name, entity in entities.items():
+                self._lru[(kind, name)] = entity
+                self._lru.move_to_end((kind, name))
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def prefetch(
+        self, configs: Iterable[Any], scope: DocumentType = DocumentType.ALL
+    ) -> None:
+        """
+        Resolve every name of several `EntitiesToSearch` configs in one
+        concurrent pass, so that building their queries only hits the LRU.
+
+        Args:
+            configs (Iterable[EntitiesToSearch]): The configs, None entries
+                are skipped.
+            scope (DocumentType): The document type scope, which decides
+                whether companies are searched as reporting entities.
+        """
+        company_type = (
+            ReportingEntity
+            if scope in (DocumentType.TRANSCRIPTS, DocumentType.FILINGS)
+            else Entity
+        )
+        requests = []
+        for config in configs:
+            if config is None:
+                continue
+            for attr_name, entity_class in config.get_entity_type_map().items():
+                names = getattr(config, attr_name, None)
+                if names:
+                    entity_type = (
+                        company_type if entity_class is Entity else entity_class
+                    )
+                    requests.append((names, entity_type))
+        self.resolve_many(requests)
+
+
+def _halve(
+    keys: List[str], attempt: int, found: Dict[str, Optional[Any]]
+) -> List[Tuple[List[str], int]]:
+    """Split a batch of keys in two, or record a single key without a match."""
+    if len(keys) == 1:
+        found[keys[0]] = None
+        return []
+    middle = len(keys) // 2
+    return [(keys[:middle], attempt), (keys[middle:], attempt)]
+
+
+def _serialize_entity(entity: Any) -> str:
+    """Serialize a Knowledge Graph entity along with its model class."""
+    entity_class = type(entity)
+    return json.dumps(
+        {
+            "class": f"{entity_class.__module__}:{entity_class.__qualname__}",
+            "data": entity.model_dump(mode="json"),
+        },
+        separators=(",", ":"),
+    )
+
+
+def _deserialize_entity(data: str) -> Any:
+    """Rebuild an entity serialized by `_serialize_entity`."""
+    payload = json.loads(data)
+    module_name, class_name = payload["class"].split(":")
+    entity_class = getattr(importlib.import_module(module_name), class_name)
+    return entity_class.model_validate(payload["data"])
+
+
+def create_entity_cache() -> Optional[EntityCache]:
+    """
+    Create the default entity cache of an entity resolver.
+
+    Caching on disk is opt-in: an `EntityCache` is only returned when the
+    environment variable `BIGDATA_ENTITY_CACHE_PATH` is set.
+
+    Returns:
+        Optional[EntityCache]: The entity cache, or None if caching is off.
+    """
+    path = os.environ.get(ENTITY_CACHE_PATH_ENV)
+    return EntityCache(path) if path else None
+
+
+_entity_resolver: Optional[EntityResolver] = None
+_entity_resolver_lock = threading.Lock()
+
+
+def get_entity_resolver() -> EntityResolver:
+    """
+    Get the entity resolver shared by the query builders of the process,
+    creating it on first use.
+
+    Returns:
+        EntityResolver: The shared entity resolver.
+    """
+    global _entity_resolver
+    with _entity_resolver_lock:
+        if _entity_resolver is None:
+            _entity_resolver = EntityResolver()
+        return _entity_resolver
+
+
+def set_entity_resolver(resolver: Optional[EntityResolver]) -> None:
+    """
+    Replace the entity resolver shared by the query builders, e.g. to share
+    a rate limiter with the searches or to use another cache. None creates
+    a new default resolver on next use, with an empty LRU.
+
+    Args:
+        resolver (Optional[EntityResolver]): The entity resolver.
+    """
+    global _entity_resolver
+    with _entity_resolver_lock:
+        _entity_resolver = resolver
@@ -0,0 +1,181 @@
+"""
+Module for fingerprinting queries and searches.
+
+Caching, journaling, de-duplication and sharding all identify a search by
+its parameters: the query tree, the date range, the scope, the sorting,
+the document limit and the reranking threshold. This module defines the
+canonical serialization of those parameters, identical across processes
+and runs, and SHA-256 fingerprints of it. The serialization of a query is
+memoized per query object, so fingerprinting every cell of a large grid
+only serializes each query once.
+"""
+
+import hashlib
+import json
+import threading
+import weakref
+from functools import lru_cache
+from typing import Hashable, Optional, Tuple, Union
+
+from bigdata_client.daterange import AbsoluteDateRange, RollingDateRange
+from bigdata_client.models.advanced_search_query import QueryComponent
+from bigdata_client.models.search import DocumentType, SortBy
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Canonical serialization of each query object, released with the object.
+# Queries must not be mutated once they have been fingerprinted.
+_canonical_queries: "weakref.WeakKeyDictionary[QueryComponent, str]" = (
+    weakref.WeakKeyDictionary()
+)
+_canonical_queries_lock = threading.Lock()
+
+
+def _dumps(value) -> str:
+    """Serialize a value to compact JSON with sorted keys."""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+
+def _digest(serialized: str) -> str:
+    """Hexadecimal SHA-256 digest of a serialization."""
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def canonical_query(query: Optional[QueryComponent]) -> str:
+    """
+    Serialize a query tree to canonical JSON.
+
+    Args:
+        query (Optional[QueryComponent]): The query, or None for no query.
+    Returns:
+        str: The JSON of `query.to_dict()` with sorted keys and no spaces,
+            memoized for the lifetime of the query object.
+    """
+    if query is None:
+        return "null"
+    with _canonical_queries_lock:
+        serialized = _canonical_queries.get(query)
+    if serialized is None:
+        serialized = _dumps(query.to_dict())
+        with _canonical_queries_lock:
+            _canonical_queries[query] = serialized
+    return serialized
+
+
+def query_fingerprint(query: Optional[QueryComponent]) -> str:
+    """
+    Compute a stable fingerprint of a query tree, to use as a hashable key
+    of a query instead of the query object, which hashes by identity.
+
+    Args:
+        query (Optional[QueryComponent]): The query.
+    Returns:
+        str: A hexadecimal SHA-256 digest, equal for equal query trees.
+    """
+    return _digest(canonical_query(query))
+
+
+def date_range_key(
+    date_range: Union[AbsoluteDateRange, RollingDateRange, tuple, None],
+) -> Hashable:
+    """
+    Convert a date range into a hashable value, equal for equal date ranges.
+
+    Args:
+        date_range (Union[AbsoluteDateRange, RollingDateRange, tuple, None]):
+            The date range, either as an object or as a tuple of start and
+            end date strings.
+    Returns:
+        Hashable: The tuple of start and end date strings of an absolute
+            date range, or the rolling date range itself.
+    """
+    if isinstance(date_range, AbsoluteDateRange):
+        return (
+            date_range.start_dt.strftime(DATE_FORMAT),
+            date_range.end_dt.strftime(DATE_FORMAT),
+        )
+    return date_range
+
+
+def canonical_date_range(
+    date_range: Union[AbsoluteDateRange, RollingDateRange, tuple, None],
+) -> str:
+    """
+    Serialize a date range to canonical JSON.
+
+    Args:
+        date_range (Union[AbsoluteDateRange, RollingDateRange, tuple, None]):
+            The date range, either as an object or as a tuple of start and
+            end date strings.
+    Returns:
+        str: The JSON list of the start and end of an absolute date range,
+            or the JSON string of the value of a rolling date range.
+    """
+    if isinstance(date_range, AbsoluteDateRange):
+        date_range = list(date_range.to_string_tuple())
+        return _dumps(date_range)
+    return _canonical_hashable_date_range(date_range)
+
+
+@lru_cache(maxsize=4096)
+def _canonical_hashable_date_range(
+    date_range: Union[RollingDateRange, Tuple[str, str], None],
+) -> str:
+    """Serialize a hashable date range, memoized as grids repeat them."""
+    if isinstance(date_range, tuple):
+        date_range = list(AbsoluteDateRange(*date_range).to_string_tuple())
+    elif isinstance(date_range, RollingDateRange):
+        date_range = date_range.value
+    return _dumps(date_range)
+
+
+def search_fingerprint(
+    query: QueryComponent,
+    date_range: Union[AbsoluteDateRange, RollingDateRange, tuple, None],
+    scope: DocumentType,
+    sortby: SortBy,
+    limit: int,
+    rerank_threshold: Optional[float],
+) -> str:
+    """
+    Compute a stable fingerprint of the parameters of a single search.
+
+    The fingerprint is the digest of the canonical JSON of the parameters,
+    assembled from the memoized serializations of the query and date range.
+
+    Args:
+        query (QueryComponent): The search query.
+        date_range (Union[AbsoluteDateRange, RollingDateRange, tuple, None]):
+            The date range filter, either as an object or as a tuple of
+            start and end date strings.
+        scope (DocumentType): The scope of the documents to include.
+        sortby (SortBy): The sorting criterion for the search results.
+        limit (int): The maximum number of documents to return.
+        rerank_threshold (Optional[float]): The reranking threshold.
+    Returns:
+        str: A hexadecimal SHA-256 digest, identical across processes for
+            the same search parameters.
+    """
+    limit, suffix = _canonical_parameters(scope, sortby, limit, rerank_threshold)
+    # Same text as json.dumps of the parameters with sorted keys
+    serialized = (
+        f'{{"date_range":{canonical_date_range(date_range)},"limit":{limit},'
+        f'"query":{canonical_query(query)},{suffix}}}'
+    )
+    return _digest(serialized)
+
+
+@lru_cache(maxsize=256)
+def _canonical_parameters(
+    scope: DocumentType,
+    sortby: SortBy,
+    limit: int,
+    rerank_threshold: Optional[float],
+) -> Tuple[str, str]:
+    """Serialize the scalar parameters of a search, memoized as grids repeat them."""
+    suffix = (
+        f'"rerank_threshold":{_dumps(rerank_threshold)},'
+        f'"scope":{_dumps(getattr(scope, "value", scope))},'
+        f'"sortby":{_dumps(getattr(sortby, "value", sortby))}'
+    )
+    return _dumps(limit), suffix
@@ -0,0 +1,140 @@
+"""
+Module for checkpointing long search runs.
+
+This module defines a `SearchJournal` class that appends the documents of
+every completed search to a file, one JSON line per search, keyed by the
+fingerprint of the search parameters. A run restarted with the same
+journal skips the searches already in it, so an interrupted run only has
+to issue the searches that had not completed.
+"""
+
+import json
+import os
+import threading
+from logging import Logger, getLogger
+from typing import Dict, List, Optional, Tuple
+
+from bigdata_client.document import Document
+
+logger: Logger = getLogger(__name__)
+
+
+class SearchJournal:
+    """
+    Append-only journal of completed searches.
+
+    Each line of the file holds the fingerprint of a search (see
+    `search_fingerprint`) and its documents. Lines are only ever appended
+    and flushed one at a time, so a process killed mid-run leaves at most
+    one truncated line, which is ignored when the journal is reopened.
+    Failed searches are not journaled and are issued again on resume.
+    Only the position of each line is kept in memory; documents are read
+    back from the file when a search is looked up.
+
+    Unlike `SearchCache`, entries never expire: the journal belongs to one
+    run and can be deleted once the run has completed.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open the journal, loading the searches completed by previous runs.
+
+        Args:
+            path (str): Path of the journal file. Created if missing.
+        """
+        self.path = path
+        self.hits = 0
+        self._lock = threading.Lock()
+        # Offset and length of the line of each completed search
+        self._entries: Dict[str, Tuple[int, int]] = {}
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a+b")
+        self._load()
+
+    def _load(self) -> None:
+        """Index the completed searches, skipping a truncated last line."""
+        self._file.seek(0)
+        offset = 0
+        line = b""
+        for line_number, line in enumerate(self._file, start=1):
+            try:
+                key = json.loads(line)["key"]
+            except (ValueError, KeyError, TypeError):
+                logger.warning(
+                    f"Skipping corrupted line {line_number} of journal {self.path}"
+                )
+            else:
+                self._entries[key] = (offset, len(line))
+            offset += len(line)
+        if line and not line.endswith(b"\n"):
+            # Terminate the truncated line so that appends start on a new one
+            self._file.write(b"\n")
+            self._file.flush()
+        if self._entries:
+            logger.info(
+                f"Loaded {len(self._entries)} completed searches from {self.path}"
+            )
+
+    def get(self, key: str) -> Optional[List[Document]]:
+        """
+        Look up the documents of a completed search.
+
+        Args:
+            key (str): The fingerprint, see `search_fingerprint`.
+        Returns:
+            Optional[List[Document]]: The journaled documents, or None if the
+                search has not completed yet.
+        """
+        with self._lock:
+            if key not in self._entries:
+                return None
+            offset, length = self._entries[key]
+            self._file.seek(offset)
+            line = self._file.read(length)
+            self.hits += 1
+        return [
+            Document.model_validate(document)
+            for document in json.loads(line)["documents"]
+        ]
+
+    def append(self, key: str, documents: List[Document]) -> None:
+        """
+        Record a completed search.
+
+        Args:
+            key (str): The fingerprint, see `search_fingerprint`.
+            documents (List[Document]): The documents returned by the search.
+        """
+        line = json.dumps(
+            {
+                "key": key,
+                "documents": [
+                    document.model_dump(mode="json") for document in documents
+                ],
+            },
+            separators=(",", ":"),
+        )
+        data = (line + "\n").encode("utf-8")
+        with self._lock:
+            if key in self._entries:
+                return
+            self._file.seek(0, os.SEEK_END)
+            offset = self._file.tell()
+            self._file.write(data)
+            self._file.flush()
+            self._entries[key] = (offset, len(data))
+
+    def close(self) -> None:
+        """Close the journal file."""
+        with self._lock:
+            self._file.close()
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,216 @@
+"""
+Module for masking the entities mentioned in the texts of the screener rows.
+
+Each row of the screening DataFrame replaces the mentions of its target
+entity with the target placeholder, and the mentions of the other entities
+with a placeholder numbered after the entity, e.g. 'Other Company_3'; an
+entity keeps its number across all the rows. `mask_texts` masks a whole
+batch of texts from flat arrays of their mentions: the mentions to mask and
+the numbers of the entities are worked out with NumPy for the whole batch,
+then each masked text is built in a single pass over its mentions, across a
+pool of processes for very large batches.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from bigdata_research_tools.prompts.labeler import (
+    get_other_entity_placeholder,
+    get_target_entity_placeholder,
+)
+
+# Batches of fewer texts are masked in the calling process
+PROCESS_POOL_MIN_TEXTS = 200_000
+# Number of texts sent to a worker process at once
+PROCESS_POOL_BATCH_SIZE = 50_000
+
+
+def mask_texts(
+    texts: Sequence[str],
+    offsets: np.ndarray,
+    starts: np.ndarray,
+    ends: np.ndarray,
+    keys: np.ndarray,
+    targets: np.ndarray,
+    names: np.ndarray,
+    target_placeholder: Optional[str] = None,
+    other_placeholder: Optional[str] = None,
+    max_workers: Optional[int] = None,
+) -> Tuple[List[str], List[Optional[List[Tuple[int, str]]]]]:
+    """
+    Mask the target and other entities mentioned in a batch of texts.
+
+    The mentions of each text are `offsets[i]:offsets[i + 1]`, and are masked
+    from the last to the first. Mentions of the target entity are always
+    masked; mentions of other entities are masked unless they start where a
+    mention of the target starts, or end where one ends. Other entities are
+    numbered from 1 in the order their first masked mention is met, over
+    the texts in order.
+
+    Args:
+        texts (Sequence[str]): The texts.
+        offsets (np.ndarray): The first mention of each text, and the number of
+            mentions last.
+        starts (np.ndarray): The start offset of each mention in its text.
+        ends (np.ndarray): The end offset of each mention in its text.
+        keys (np.ndarray): The entity key of each mention.
+        targets (np.ndarray): Whether each mention is of the target entity of its text.
+        names (np.ndarray): The entity name of each mention.
+        target_placeholder (Optional[str]): The mask of the target entity.
+            Defaults to `get_target_entity_placeholder()`.
+        other_placeholder (Optional[str]): The prefix of the masks of the other
+            entities. Defaults to `get_other_entity_placeholder()`.
+        max_workers (Optional[int]): The number of processes to mask batches
+            of at least `PROCESS_POOL_MIN_TEXTS` texts. Defaults to the number
+            of CPUs; 1 to mask in the calling process. The processes are
+            spawned, so scripts must guard their entry point with
+            `if __name__ == "__main__":`.
+    Returns:
+        Tuple[List[str], List[Optional[List[Tuple[int, str]]]]]: The masked
+            texts, and the number and name of each masked mention of another
+            entity of each text, in masking order, or None for texts without.
+    """
+    if target_placeholder is None:
+        target_placeholder = get_target_entity_placeholder()
+    if other_placeholder is None:
+        other_placeholder = get_other_entity_placeholder()
+
+    offsets = np.asarray(offsets, dtype=np.int64)
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    targets = np.asarray(targets, dtype=bool)
+    text_of = np.repeat(np.arange(len(texts), dtype=np.int64), np.diff(offsets))
+
+    # Masking order: by text, then from the last start to the first, keeping
+    # the mention order of equal starts
+    order = np.lexsort((-starts, text_of))
+
+    # Mentions of other entities sharing a start or an end with a mention of
+    # the target of their text are left as they are
+    start_positions = _text_positions(text_of, starts)
+    end_positions = _text_positions(text_of, ends)
+    shared = np.isin(start_positions, start_positions[targets]) | np.isin(
+        end_positions, end_positions[targets]
+    )
+    masked = order[(targets | ~shared)[order]]
+    others = masked[~targets[masked]]
+
+    # Number the other entities over all the texts at once
+    numbering = {}
+    numbers = [
+        numbering.setdefault(key, len(numbering) + 1)
+        for key in np.asarray(keys, dtype=object)[others].tolist()
+    ]
+    replacements = np.full(len(starts), target_placeholder, dtype=object)
+    replacements[others] = [f"{other_placeholder}_{number}" for number in numbers]
+
+    entity_maps = list(zip(numbers, np.asarray(names, dtype=object)[others].tolist()))
+    map_offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(text_of[others], minlength=len(texts)), out=map_offsets[1:])
+    map_offsets = map_offsets.tolist()
+    other_entities_map = [
+        entity_maps[first:last] or None
+        for first, last in zip(map_offsets[:-1], map_offsets[1:])
+    ]
+
+    masked_offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+    np.cumsum(
+        np.bincount(text_of[masked], minlength=len(texts)), out=masked_offsets[1:]
+    )
+    batch = (
+        list(texts),
+        masked_offsets.tolist(),
+        starts[masked].tolist(),
+        ends[masked].tolist(),
+        replacements[masked].tolist(),
+    )
+    workers = max_workers or os.cpu_count() or 1
+    if workers == 1 or len(texts) < PROCESS_POOL_MIN_TEXTS:
+        return _mask_batch(*batch), other_entities_map
+
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        masked_texts = [
+            text
+            for texts in executor.map(
+                _mask_batch, *zip(*_split_batch(*batch, PROCESS_POOL_BATCH_SIZE))
+            )
+            for text in texts
+        ]
+    return masked_texts, other_entities_map
+
+
+def _text_positions(text_of: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """Combine the text and the position of each mention into a single integer."""
+    if not len(positions):
+        return positions
+    low = min(int(positions.min()), 0)
+    return text_of * (int(positions.max()) - low + 1) + (positions - low)
+
+
+def _split_batch(
+    texts: List[str],
+    offsets: List[int],
+    starts: List[int],
+    ends: List[int],
+    replacements: List[str],
+    size: int,
+) -> List[Tuple[list, list, list, list, list]]:
+    """Split a batch of texts and their masked mentions into batches of `size` texts."""
+    batches = []
+    for first in range(0, len(texts), size):
+        last = min(first + size, len(texts))
+        mentions = slice(offsets[first], offsets[last])
+        batches.append(
+            (
+                texts[first:last],
+                [offset - offsets[first] for offset in offsets[first : last + 1]],
+                starts[mentions],
+                ends[mentions],
+                replacements[mentions],
+            )
+        )
+    return batches
+
+
+def _mask_batch(
+    texts: List[str],
+    offsets: List[int],
+    starts: List[int],
+    ends: List[int],
+    replacements: List[str],
+) -> List[str]:
+    """
+    Replace the masked mentions of each text, given from the last to the first.
+
+    A text whose mentions do not overlap is rebuilt in one pass; otherwise
+    each mention is replaced in turn in the text masked so far.
+    """
+    masked_texts = []
+    for i, text in enumerate(texts):
+        first, last = offsets[i], offsets[i + 1]
+        mentions = list(
+            zip(starts[first:last], ends[first:last], replacements[first:last])
+        )
+        pieces = []
+        cursor = len(text)
+        for start, end, replacement in mentions:
+            if not 0 <= start <= end <= cursor:
+                break
+            pieces.append(text[end:cursor])
+            pieces.append(replacement)
+            cursor = start
+        else:
+            pieces.append(text[:cursor])
+            masked_texts.append("".join(reversed(pieces)))
+            continue
+
+        for start, end, replacement in mentions:
+            text = f"{text[:start]}{replacement}{text[end:]}"
+        masked_texts.append(text)
+    return masked_texts
@@ -1,5 +1,5 @@
 from logging import Logger, getLogger
-from typing import List, Optional
+from typing import List, Optional, Union
 
 from bigdata_client.document import Document
 from bigdata_client.models.advanced_search_query import ListQueryComponent
@@ -7,16 +7,16 @@ from bigdata_client.models.search import DocumentType, SortBy
 from pandas import DataFrame
 from tqdm import tqdm
 
+from bigdata_research_tools.search.chunk_table import ChunkTable
+from bigdata_research_tools.search.entity_index import EntityIndex
+from bigdata_research_tools.search.planner import adaptive_search
 from bigdata_research_tools.search.query_builder import (
     EntitiesToSearch,
     build_batched_query,
     create_date_ranges,
 )
 from bigdata_research_tools.search.search import run_search
-from bigdata_research_tools.search.search_utils import (
-    build_chunk_entities, 
-    filter_search_results,
-)
+from bigdata_research_tools.search.search_utils import filter_search_results
 
 logger: Logger = getLogger(__name__)
 
@@ -35,6 +35,7 @@ def search_narratives(
     rerank_threshold: Optional[float] = None,
     document_limit: int = 50,
     batch_size: int = 10,
+    adaptive_splitting: bool = False,
     **kwargs,
 ) -> DataFrame:
     """
@@ -60,6 +61,12 @@ def search_narratives(
             See https://sdk.bigdata.com/en/latest/how_to_guides/rerank_search.html
         document_limit (int): The maximum number of documents to return per Bigdata query.
         batch_size (int): The number of entities to include in each batched query.
+        adaptive_splitting (bool): If True, search `freq` date ranges and bisect the date
+            range of every search that returns `document_limit` documents, instead of
+            searching a fixed grid. Use a coarse `freq` (e.g. 'Y').
+            See `bigdata_research_tools.search.planner.adaptive_search`. Defaults to False.
+        kwargs (dict): Additional arguments forwarded to `run_search`. For example,
+            `use_async=True` runs the searches from a single event loop.
 
     Returns:
         DataFrame: The DataFrame with the screening results. Schema:
@@ -90,25 +97,40 @@ def search_narratives(
         fiscal_year=fiscal_year,
     )
 
-    # Create list of date ranges
-    date_ranges = create_date_ranges(start_date, end_date, freq)
-
-    no_queries = len(batched_query)
-    no_dates = len(date_ranges)
-    total_no = no_dates * no_queries
-
-    logger.info(f"About to run {total_no} queries")
-    logger.debug("Example Query:", batched_query[0])
-    # Run concurrent search
-    results = run_search(
-        batched_query,
-        date_ranges=date_ranges,
-        limit=document_limit,
-        scope=scope,
-        sortby=sort_by,
-        rerank_threshold=rerank_threshold,
-        **kwargs,
-    )
+    if adaptive_splitting:
+        results, _, _ = adaptive_search(
+            batched_query,
+            None,
+            start_date=start_date,
+            end_date=end_date,
+            freq=freq,
+            sortby=sort_by,
+            scope=scope,
+            document_limit=document_limit,
+            rerank_threshold=rerank_threshold,
+            **kwargs,
+        )
+    else:
+        # Create list of date ranges
+        date_ranges = create_date_ranges(start_date, end_date, freq)
+
+        no_queries = len(batched_query)
+        no_dates = len(date_ranges)
+        total_no = no_dates * no_queries
+
+        logger.info(f"About to run {total_no} queries")
+        logger.debug("Example Query:", batched_query[0])
+        # Run concurrent search
+        results = run_search(
+            batched_query,
+            date_ranges=date_ranges,
+            limit=document_limit,
+            scope=scope,
+            sortby=sort_by,
+            rerank_threshold=rerank_threshold,
+            as_chunk_table=True,
+            **kwargs,
+        )
 
     results, entities = filter_search_results(results)
     results = _process_narrative_search(results, entities)
@@ -117,15 +139,17 @@ def search_narratives(
 
 
 def _process_narrative_search(
-    results: List[Document],
-    entities: List[ListQueryComponent],
+    results: Union[List[Document], ChunkTable],
+    entities: Union[List[ListQueryComponent], EntityIndex],
 ) -> DataFrame:
     """
     Build a dataframe for when no companies are specified.
 
     Args:
-        results (List[Document]): A list of Bigdata search results.
-        entities (List[ListQueryComponent]): A list of entities found in the search results.
+        results (Union[List[Document], ChunkTable]): A list of Bigdata search results,
+            or a `ChunkTable` of them.
+        entities (Union[List[ListQueryComponent], EntityIndex]): A list of entities
+            found in the search results, or an `EntityIndex` of them.
     Returns:
         DataFrame: Screening DataFrame. Schema:
         - Index: int
@@ -139,28 +163,49 @@ def _process_narrative_search(
             - country_code: str
             - entity_type: str
     """
+    if not isinstance(results, ChunkTable):
+        results = ChunkTable.from_documents(results)
+    if not isinstance(entities, EntityIndex):
+        entities = EntityIndex(entities)
+    document_ids = results.document_ids.tolist()
+
+    # Join the mentions of all the chunks to their entities at once
+    mentions = entities.join(results)
+    offsets = mentions.chunk_offsets.tolist()
+    names = mentions.column("name").tolist()
+    countries = mentions.column("country").tolist()
+    entity_types = mentions.column("entity_type").tolist()
+
     rows = []
-    for result in tqdm(results, desc="Processing screening results..."):
-        for chunk in result.chunks:
-            # Build a list of entities present in the chunk
-            chunk_entities = build_chunk_entities(chunk, entities)
-
-            if not chunk_entities:
-                continue 
-
-            # Collect all necessary information in the row
-            rows.append(
-                {
-                    "timestamp_utc": result.timestamp,
-                    "document_id": result.id,
-                    "sentence_id": f"{result.id}-{chunk.chunk}",
-                    "headline": result.headline,
-                    "text": chunk.text,
-                    "entity": [entity["name"] for entity in chunk_entities], 
-                    "country_code": [entity["country"] for entity in chunk_entities],
-                    "entity_type": [entity["entity_type"] for entity in chunk_entities], 
-                }
-            ) 
+    for chunk, (document, chunk_index, text) in tqdm(
+        enumerate(
+            zip(
+                results.chunk_document.tolist(),
+                results.chunk_index.tolist(),
+                results.texts.tolist(),
+            )
+        ),
+        total=len(results),
+        desc="Processing screening results...",
+    ):
+        first, last = offsets[chunk], offsets[chunk + 1]
+        # Skip chunks without entities
+        if first == last:
+            continue
+
+        # Collect all necessary information in the row
+        rows.append(
+            {
+                "timestamp_utc": results.timestamps[document],
+                "document_id": document_ids[document],
+                "sentence_id": f"{document_ids[document]}-{chunk_index}",
+                "headline": results.headlines[document],
+                "text": text,
+                "entity": names[first:last],
+                "country_code": countries[first:last],
+                "entity_type": entity_types[first:last],
+            }
+        ) 
 
     if not rows:
         raise ValueError("No rows to process")
@@ -0,0 +1,408 @@
+"""
+Module for planning searches adaptively from how saturated they are.
+
+A search that returns exactly `document_limit` documents was saturated:
+relevant chunks beyond the limit were cut off. A search that returns
+nothing was wasted. Instead of querying a fixed fine-grained grid of date
+ranges, `adaptive_search` starts from coarse date ranges, bisects the date
+range of every saturated search (and, once the date range cannot be split
+further, its batch of entities) and re-queries the halves. The resulting
+`SearchSchedule` merges adjacent empty date ranges, so a later pass over
+the same period starts from the windows that actually hold documents.
+"""
+
+import hashlib
+import itertools
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import pandas as pd
+from bigdata_client.document import Document
+from bigdata_client.models.advanced_search_query import QueryComponent
+from bigdata_client.models.search import DocumentType, SortBy
+from bigdata_client.query import Any
+
+from bigdata_research_tools.search.fingerprint import canonical_query
+from bigdata_research_tools.search.query_builder import create_date_ranges
+from bigdata_research_tools.search.search import (
+    SearchManager,
+    normalize_date_range,
+    split_manager_kwargs,
+)
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+@dataclass
+class SearchCell:
+    """
+    A single search of the plan.
+
+    Args:
+        query (Optional[QueryComponent]): The query without the entity batch.
+        entities (Tuple[QueryComponent, ...]): The batch of entities to
+            search for, empty if the query is not batched by entity.
+        date_range (Tuple[str, str]): The start and end of the date range.
+        key (str): Identifies the original query and entity batch the cell
+            was split from, stable across runs.
+        depth (int): Number of splits since the original cell.
+        split (Tuple[int, ...]): The half of the entity batch taken at each
+            split by entities, 0 for the first and 1 for the second, which
+            orders the cells split from the same batch and date range.
+    """
+
+    query: Optional[QueryComponent]
+    entities: Tuple[QueryComponent, ...]
+    date_range: Tuple[str, str]
+    key: str
+    depth: int = 0
+    split: Tuple[int, ...] = ()
+
+    def build_query(self) -> QueryComponent:
+        """Combine the query with the batch of entities."""
+        if not self.entities:
+            return self.query
+        batch = Any(list(self.entities))
+        return self.query & batch if self.query is not None else batch
+
+
+@dataclass
+class SearchSchedule:
+    """
+    Date ranges to search for each original query and entity batch.
+
+    Args:
+        windows (Dict[str, List[Tuple[str, str]]]): The date ranges, in
+            chronological order, for each cell key (see `SearchCell.key`).
+    """
+
+    windows: Dict[str, List[Tuple[str, str]]] = field(default_factory=dict)
+
+    def save(self, path: str) -> None:
+        """Write the schedule to a JSON file."""
+        with open(path, "w") as schedule_file:
+            json.dump(self.windows, schedule_file, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "SearchSchedule":
+        """Read a schedule written by `save`."""
+        with open(path) as schedule_file:
+            windows = json.load(schedule_file)
+        return cls(
+            windows={
+                key: [tuple(window) for window in key_windows]
+                for key, key_windows in windows.items()
+            }
+        )
+
+    def grid(
+        self,
+        queries: List[Optional[QueryComponent]],
+        entity_batches: Optional[List[List[QueryComponent]]],
+    ) -> List[Tuple[List[QueryComponent], List[Tuple[str, str]]]]:
+        """
+        Group the queries combined with their entity batch by date ranges.
+
+        Each group is the queries and date ranges of one `run_search` call:
+        `for queries, date_ranges in schedule.grid(...): run_search(queries,
+        date_ranges, ...)` runs the whole schedule.
+
+        Args:
+            queries (List[Optional[QueryComponent]]): The queries, without
+                entities, the schedule was planned for.
+            entity_batches (Optional[List[List[QueryComponent]]]): The
+                batches of entities the schedule was planned for.
+        Returns:
+            List[Tuple[List[QueryComponent], List[Tuple[str, str]]]]: The
+                queries sharing the same date ranges, and those date ranges,
+                in the order of the queries and entity batches.
+        Raises:
+            ValueError: If a query and entity batch is not in the schedule.
+        """
+        groups: Dict[Tuple[Tuple[str, str], ...], List[QueryComponent]] = {}
+        for query, batch in itertools.product(
+            queries or [None], entity_batches or [[]]
+        ):
+            key = cell_key(query, batch)
+            if key not in self.windows:
+                raise ValueError(f"No date ranges scheduled for cell {key}")
+            windows = tuple(tuple(window) for window in self.windows[key])
+            cell = SearchCell(query, tuple(batch), windows[0], key)
+            groups.setdefault(windows, []).append(cell.build_query())
+        return [(group, list(windows)) for windows, group in groups.items()]
+
+
+@dataclass
+class PlannerStats:
+    """
+    Summary of an adaptive search.
+
+    Args:
+        searches (int): Number of searches issued.
+        saturated (int): Number of searches that hit the document limit.
+        date_splits (int): Number of saturated searches split by date range.
+        entity_splits (int): Number of saturated searches split by entity batch.
+        merged_windows (int): Number of empty date ranges merged into a
+            neighbour in the schedule.
+    """
+
+    searches: int = 0
+    saturated: int = 0
+    date_splits: int = 0
+    entity_splits: int = 0
+    merged_windows: int = 0
+
+
+def adaptive_search(
+    queries: List[Optional[QueryComponent]],
+    entity_batches: Optional[List[List[QueryComponent]]],
+    start_date: str,
+    end_date: str,
+    freq: str = "Y",
+    sortby: SortBy = SortBy.RELEVANCE,
+    scope: DocumentType = DocumentType.ALL,
+    document_limit: int = 50,
+    rerank_threshold: Optional[float] = None,
+    min_window: str = "1D",
+    max_depth: int = 8,
+    schedule: Optional[SearchSchedule] = None,
+    **kwargs,
+) -> Tuple[List[Optional[List[Document]]], SearchSchedule, PlannerStats]:
+    """
+    Search every query and entity batch over a period, splitting saturated
+    searches until they return fewer than `document_limit` documents.
+
+    Saturated date ranges are bisected until they are shorter than twice
+    `min_window`; saturated searches that cannot be split by date any more
+    have their entity batch halved instead. A search is not split more than
+    `max_depth` times.
+
+    Args:
+        queries (List[Optional[QueryComponent]]): The queries, without entities,
+            e.g. as built by `build_batched_query` with `entities=None`.
+        entity_batches (Optional[List[List[QueryComponent]]]): Batches of entity
+            query components to combine with every query. None to search the
+            queries on their own.
+        start_date (str): The start date of the period.
+        end_date (str): The end date of the period.
+        freq (str): The frequency of the initial date ranges. Defaults to 'Y'.
+        sortby (SortBy): The sorting criterion for the search results.
+        scope (DocumentType): The scope of the documents to include.
+        document_limit (int): The maximum number of documents to return per search.
+        rerank_threshold (Optional[float]): The threshold for reranking the search results.
+        min_window (str): The shortest date range, as a pandas offset alias,
+            obtained by bisection. Defaults to '1D'.
+        max_depth (int): The maximum number of splits of an initial search.
+        schedule (Optional[SearchSchedule]): Initial date ranges from a
+            previous pass over the same period. Queries and entity batches
+            missing from it start from `freq`.
+        kwargs (dict): Additional arguments for `SearchManager` and its
+            `iter_cells` method, such as `rpm`, `max_workers` or `current_trace`.
+    Returns:
+        Tuple[List[Optional[List[Document]]], SearchSchedule, PlannerStats]:
+            The documents of every final search (None if it failed) ordered by
+            query, entity batch and date, the schedule for a later pass and a
+            summary of the splits.
+    """
+    min_window = pd.Timedelta(min_window)
+    date_ranges = normalize_date_range(create_date_ranges(start_date, end_date, freq))
+    schedule = schedule or SearchSchedule()
+    stats = PlannerStats()
+
+    cells = []
+    for query, batch in itertools.product(queries or [None], entity_batches or [[]]):
+        key = cell_key(query, batch)
+        windows = schedule.windows.get(key)
+        if not _covers(windows, date_ranges):
+            windows = date_ranges
+        cells.extend(
+            SearchCell(query, tuple(batch), tuple(window), key) for window in windows
+        )
+    order = {cell.key: i for i, cell in reversed(list(enumerate(cells)))}
+
+    manager_kwargs, kwargs = split_manager_kwargs(kwargs)
+    manager = SearchManager(**manager_kwargs)
+    completed = []
+    while cells:
+        next_cells = []
+        for cell, documents in run_cells(
+            manager, cells, sortby, scope, document_limit, rerank_threshold, kwargs
+        ):
+            stats.searches += 1
+            saturated = documents is not None and len(documents) >= document_limit
+            if saturated:
+                stats.saturated += 1
+                children = _split_cell(cell, min_window, max_depth, stats)
+                if children:
+                    next_cells.extend(children)
+                    continue
+            completed.append((cell, documents))
+        cells = next_cells
+
+    completed.sort(
+        key=lambda item: (order[item[0].key], item[0].date_range, item[0].split)
+    )
+    new_schedule = _build_schedule(completed, stats)
+    logging.info(
+        f"Adaptive search issued {stats.searches} searches: {stats.saturated} "
+        f"saturated, {stats.date_splits} split by date and "
+        f"{stats.entity_splits} by entities"
+    )
+    return [documents for _, documents in completed], new_schedule, stats
+
+
+def _covers(
+    windows: Optional[List[Tuple[str, str]]], date_ranges: List[Tuple[str, str]]
+) -> bool:
+    """Check that scheduled windows span the same period as the date ranges."""
+    return bool(windows) and (
+        tuple(windows[0])[0] == date_ranges[0][0]
+        and tuple(windows[-1])[1] == date_ranges[-1][1]
+    )
+
+
+def cell_key(query: Optional[QueryComponent], batch: Sequence[QueryComponent]) -> str:
+    """
+    Get the stable identifier of a query and entity batch, which keys
+    `SearchSchedule.windows` and `DensityProfile.volumes`.
+
+    Args:
+        query (Optional[QueryComponent]): The query without the entity batch.
+        batch (Sequence[QueryComponent]): The batch of entities.
+    Returns:
+        str: The identifier, the same across runs and processes.
+    """
+    # Same text as json.dumps of the query and entities with sorted keys
+    entities = ",".join(canonical_query(entity) for entity in batch)
+    serialized = f'{{"entities":[{entities}],"query":{canonical_query(query)}}}'
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def run_cells(
+    manager: SearchManager,
+    cells: List[SearchCell],
+    sortby: SortBy,
+    scope: DocumentType,
+    limit: int,
+    rerank_threshold: Optional[float],
+    kwargs: dict,
+) -> Iterator[Tuple[SearchCell, Optional[List[Document]]]]:
+    """
+    Run the searches of a list of cells, yielding each cell with its documents.
+
+    Args:
+        manager (SearchManager): The manager running the searches.
+        cells (List[SearchCell]): The cells to search.
+        sortby (SortBy): The sorting criterion for the search results.
+        scope (DocumentType): The scope of the documents to include.
+        limit (int): The maximum number of documents to return per search.
+        rerank_threshold (Optional[float]): The threshold for reranking the search results.
+        kwargs (dict): Additional arguments for `SearchManager.iter_cells`,
+            such as `max_workers` or `current_trace`.
+    Yields:
+        Tuple[SearchCell, Optional[List[Document]]]: Each cell and its documents
+            (None if the search failed), in completion order.
+    """
+    by_search = {}
+    for cell in cells:
+        by_search[(cell.build_query(), cell.date_range)] = cell
+    for query, date_range, documents in manager.iter_cells(
+        list(by_search),
+        sortby=sortby,
+        scope=scope,
+        limit=limit,
+        rerank_threshold=rerank_threshold,
+        **kwargs,
+    ):
+        yield by_search[(query, date_range)], documents
+
+
+def bisect_date_range(
+    date_range: Tuple[str, str], min_window: pd.Timedelta
+) -> Optional[Tuple[Tuple[str, str], Tuple[str, str]]]:
+    """
+    Split a date range in two halves at midnight, if both are long enough.
+
+    Args:
+        date_range (Tuple[str, str]): The start and end of the date range.
+        min_window (pd.Timedelta): The shortest half.
+    Returns:
+        Optional[Tuple[Tuple[str, str], Tuple[str, str]]]: The two halves, or
+            None if one of them would be shorter than `min_window`.
+    """
+    start, end = pd.Timestamp(date_range[0]), pd.Timestamp(date_range[1])
+    middle = (start + (end - start) / 2).normalize()
+    second = pd.Timedelta(seconds=1)
+    if middle - start < min_window or end + second - middle < min_window:
+        return None
+    first = (start.strftime(DATE_FORMAT), (middle - second).strftime(DATE_FORMAT))
+    second = (middle.strftime(DATE_FORMAT), end.strftime(DATE_FORMAT))
+    return first, second
+
+
+def _split_cell(
+    cell: SearchCell, min_window: pd.Timedelta, max_depth: int, stats: PlannerStats
+) -> Optional[List[SearchCell]]:
+    """Split a saturated cell by date range or, failing that, by entity batch."""
+    if cell.depth >= max_depth:
+        return None
+
+    halves = bisect_date_range(cell.date_range, min_window)
+    if halves is not None:
+        stats.date_splits += 1
+        return [
+            SearchCell(
+                cell.query, cell.entities, half, cell.key, cell.depth + 1, cell.split
+            )
+            for half in halves
+        ]
+
+    if len(cell.entities) > 1:
+        stats.entity_splits += 1
+        middle = len(cell.entities) // 2
+        return [
+            SearchCell(
+                cell.query,
+                entities,
+                cell.date_range,
+                cell.key,
+                cell.depth + 1,
+                cell.split + (half,),
+            )
+            for half, entities in enumerate(
+                (cell.entities[:middle], cell.entities[middle:])
+            )
+        ]
+    return None
+
+
+def _build_schedule(
+    completed: List[Tuple[SearchCell, Optional[List[Document]]]],
+    stats: PlannerStats,
+) -> SearchSchedule:
+    """Collect the final date ranges of each key, merging adjacent empty ones."""
+    # Entity splits happen below the shortest date range, so the date ranges
+    # of a key partition the period; a range is empty if all its searches are
+    empty_by_window: Dict[str, Dict[Tuple[str, str], bool]] = {}
+    for cell, documents in completed:
+        windows = empty_by_window.setdefault(cell.key, {})
+        windows[cell.date_range] = windows.get(cell.date_range, True) and (
+            documents == []
+        )
+
+    schedule = SearchSchedule()
+    for key, windows in empty_by_window.items():
+        merged = []
+        previous_empty = False
+        for window in sorted(windows):
+            empty = windows[window]
+            if empty and previous_empty:
+                merged[-1] = (merged[-1][0], window[1])
+                stats.merged_windows += 1
+            else:
+                merged.append(window)
+            previous_empty = empty
+        schedule.windows[key] = merged
+    return schedule
@@ -5,7 +5,7 @@ Author: Alessandro Bouchs (abouchs@ravenpack.com), Jelena Starovic (jstarovic@ra
 
 from dataclasses import dataclass
 from itertools import chain,zip_longest
-from typing import List, Optional, Tuple, Type, Dict  
+from typing import Iterable, Iterator, List, Optional, Tuple, Type, Dict  
 import pandas as pd
 from bigdata_client.daterange import AbsoluteDateRange
 from bigdata_client.models.advanced_search_query import QueryComponent
@@ -29,7 +29,7 @@ from bigdata_client.query import (
     Topic
 )
 
-from bigdata_research_tools.client import bigdata_connection
+from bigdata_research_tools.search.entity_resolver import get_entity_resolver
 
 @dataclass
 class EntitiesToSearch:
@@ -117,6 +117,44 @@ def build_batched_query(
     Returns:
         List[QueryComponent]: List of expanded query components.    
     """
+    return list(iter_batched_query(
+        sentences=sentences,
+        keywords=keywords,
+        entities=entities,
+        control_entities=control_entities,
+        sources=sources,
+        batch_size=batch_size,
+        fiscal_year=fiscal_year,
+        scope=scope,
+        custom_batches=custom_batches,
+    ))
+
+def iter_batched_query(
+    sentences: List[str], 
+    keywords: Optional[List[str]],
+    entities: Optional[EntitiesToSearch],
+    control_entities: Optional[EntitiesToSearch],
+    sources: Optional[List[str]],
+    batch_size: int,
+    fiscal_year: Optional[int],
+    scope: DocumentType,
+    custom_batches: Optional[List[EntitiesToSearch]],
+) -> Iterator[QueryComponent]:
+    """
+    Lazily builds the batched query objects of `build_batched_query`, in the same order.
+
+    The parameters are validated and the entity names are resolved upfront, but the
+    entity batches and their combinations with the sentences are only built as the
+    queries are drawn. Passing the generator to `run_search(as_chunk_table=True)` or
+    `iter_search` starts searching as soon as the first query is built and never holds
+    the whole expansion in memory, whatever the size of the universe.
+
+    Args:
+        See `build_batched_query`.
+
+    Returns:
+        Iterator[QueryComponent]: Generator of expanded query components.
+    """
 
     # Early validation: ensure only one of entities or custom_batches is used
     if entities and custom_batches:
@@ -124,17 +162,22 @@ def build_batched_query(
 
     _validate_parameters(document_scope=scope, fiscal_year=fiscal_year)
 
+    # Resolve the names of all the entities in one concurrent pass
+    get_entity_resolver().prefetch(
+        [entities, control_entities, *(custom_batches or [])], scope=scope
+    )
+
     # Step 1: Build base queries (similarity, keyword, source)
     base_queries, keyword_query, source_query = _build_base_queries(sentences, keywords, sources)
     
     # Step 2: Build control entity query
     control_query = _build_control_entity_query(control_entities, scope=scope) if control_entities else None
     
-    # Step 3: Build entity batch queries
-    entity_batch_queries = _build_entity_batch_queries(entities, custom_batches, batch_size, scope)
+    # Step 3: Build entity batch queries, lazily
+    entity_batch_queries = _iter_entity_batch_queries(entities, custom_batches, batch_size, scope)
     
-    # Step 4: Combine everything into expanded queries
-    queries_expanded = _expand_queries(
+    # Step 4: Combine everything into expanded queries, lazily
+    queries_expanded = _iter_expanded_queries(
         (base_queries, keyword_query, source_query), 
         entity_batch_queries, 
         control_query,
@@ -189,33 +232,11 @@ def _get_entity_ids(
         entity_names: List[str],
         entity_type: Type,  
 ) -> list[Type]:
-    bigdata = bigdata_connection()
-    entity_ids = []
-
-    lookup_map = {
-        Place: bigdata.knowledge_graph.find_places,
-        Product: bigdata.knowledge_graph.find_products,
-        Person: bigdata.knowledge_graph.find_people,
-        Organization: bigdata.knowledge_graph.find_organizations,
-        Topic: bigdata.knowledge_graph.find_topics,
-        Concept: bigdata.knowledge_graph.find_concepts, 
-        Entity: bigdata.knowledge_graph.find_companies,  
-        ReportingEntity: bigdata.knowledge_graph.find_companies, 
-    }
-
-    lookup_func = lookup_map.get(entity_type)
-    if not lookup_func:
-        return []
-
-    for name in entity_names:
-        entity = next(iter(lookup_func(name)), None)
-        if entity is not None:
-            if entity_type in (Entity, ReportingEntity):
-                entity = entity_type(entity.id)
-
-            entity_ids.append(entity)
-
-    return entity_ids
+    """
+    Resolve entity names to query components with the shared `EntityResolver`,
+    skipping the names without a match in the Knowledge Graph.
+    """
+    return get_entity_resolver().resolve(entity_names, entity_type)
 
 def _build_control_entity_query(
     control_entities: EntitiesToSearch,
@@ -271,17 +292,26 @@ def _build_entity_batch_queries(
     scope: DocumentType,
 ) -> List[Optional[QueryComponent]]:
     """Build entity batch queries from either custom batches or auto-batched entities."""
+    return list(_iter_entity_batch_queries(entities, custom_batches, batch_size, scope))
+
+def _iter_entity_batch_queries(
+    entities: EntitiesToSearch, 
+    custom_batches: List[EntitiesToSearch],
+    batch_size: int,
+    scope: DocumentType,
+) -> Iterator[Optional[QueryComponent]]:
+    """Lazily build the entity batch queries of `_build_entity_batch_queries`."""
 
     # If no entities specified, return a single None to ensure at least one iteration
     if not entities and not custom_batches:
-        return [None]
+        return iter([None])
     
     # If using custom batches, process them
     if custom_batches:
-        return _build_custom_batch_queries(custom_batches, scope)
+        return _iter_custom_batch_queries(custom_batches, scope)
     
     # Otherwise, auto-batch the entities
-    return _auto_batch_entities(entities, batch_size, scope)
+    return (Any(batch) for batch in _iter_entity_batches(entities, batch_size, scope))
 
 def _get_entity_type(scope: DocumentType) -> type:
     """Determine the entity type based on document scope."""
@@ -296,6 +326,13 @@ def _build_custom_batch_queries(
     scope: DocumentType
 ) -> List[QueryComponent]:
     """Build entity queries from a list of EntitiesToSearch objects."""
+    return list(_iter_custom_batch_queries(custom_batches, scope))
+
+def _iter_custom_batch_queries(
+    custom_batches: List[EntitiesToSearch],
+    scope: DocumentType
+) -> Iterator[Optional[QueryComponent]]:
+    """Lazily build the entity queries of `_build_custom_batch_queries`."""
     entity_type_map = EntitiesToSearch.get_entity_type_map()
     
     def get_entity_ids_for_attr(entity_config: EntitiesToSearch, attr_name: str, entity_class) -> List[int]:
@@ -307,7 +344,7 @@ def _build_custom_batch_queries(
         entity_type = _get_entity_type(scope) if entity_class == Entity else entity_class
         return _get_entity_ids(entity_names, entity_type)
     
-    batch_queries = []
+    found = False
     for entity_config in custom_batches:
         # Use chain to flatten all entity IDs from all attributes
         all_entities = list(chain.from_iterable(
@@ -316,9 +353,11 @@ def _build_custom_batch_queries(
         ))
         
         if all_entities:
-            batch_queries.append(Any(all_entities))
+            found = True
+            yield Any(all_entities)
     
-    return batch_queries if batch_queries else [None]
+    if not found:
+        yield None
 
 def _auto_batch_entities(
     entities: EntitiesToSearch,
@@ -326,6 +365,38 @@ def _auto_batch_entities(
     scope: DocumentType = DocumentType.ALL,
 ) -> List[QueryComponent]:
     """Auto-batch entities by type using the specified batch size."""
+    return [Any(batch) for batch in batch_entities(entities, batch_size, scope)]
+
+def batch_entities(
+    entities: EntitiesToSearch,
+    batch_size: int,
+    scope: DocumentType = DocumentType.ALL,
+) -> List[List[QueryComponent]]:
+    """
+    Split the entities into batches of entity query components, by type, as
+    `build_batched_query` does without custom batches.
+
+    Args:
+        entities (EntitiesToSearch): The entities to batch. Their names are
+            resolved with the shared `EntityResolver`; names without a match
+            are skipped.
+        batch_size (int): The maximum number of entities per batch.
+        scope (DocumentType): The document type scope, which decides whether
+            companies are searched as reporting entities.
+    Returns:
+        List[List[QueryComponent]]: The batches of entity query components.
+    """
+    return list(_iter_entity_batches(entities, batch_size, scope))
+
+def _iter_entity_batches(
+    entities: EntitiesToSearch,
+    batch_size: int,
+    scope: DocumentType = DocumentType.ALL,
+) -> Iterator[List[QueryComponent]]:
+    """
+    Lazily split the entities into batches of `batch_entities`. The names are
+    resolved upfront, the batches are only sliced as they are drawn.
+    """
     
     # Create batches for each entity type
     all_entity_batches = []
@@ -341,18 +412,15 @@ def _auto_batch_entities(
         
         # Split into batches and add to collection
         if entity_ids:
-            batches = [entity_ids[i:i + batch_size] for i in range(0, len(entity_ids), batch_size)]
+            batches = (entity_ids[i:i + batch_size] for i in range(0, len(entity_ids), batch_size))
             all_entity_batches.append(batches)
     
-    if not all_entity_batches:
-        return []
-    
     # Combine batches across entity types using zip_longest
-    return [
-        Any([entity for batch in batch_group for entity in batch])
+    return (
+        [entity for batch in batch_group for entity in batch]
         for batch_group in zip_longest(*all_entity_batches, fillvalue=[])
         if any(batch for batch in batch_group)  # Skip empty batch groups
-    ]
+    )
 
 def _expand_queries(
     base_queries_tuple: Tuple[List[QueryComponent], Optional[QueryComponent], Optional[QueryComponent]],
@@ -362,10 +430,24 @@ def _expand_queries(
     fiscal_year: Optional[int] = None
 ) -> List[QueryComponent]:
     """Expand all query components into the final list of queries."""
+    return list(_iter_expanded_queries(
+        base_queries_tuple, entity_batch_queries, control_query, source_query, fiscal_year
+    ))
+
+def _iter_expanded_queries(
+    base_queries_tuple: Tuple[List[QueryComponent], Optional[QueryComponent], Optional[QueryComponent]],
+    entity_batch_queries: Optional[Iterable[Optional[QueryComponent]]] = None,  
+    control_query: Optional[QueryComponent] = None,
+    source_query: Optional[QueryComponent] = None,
+    fiscal_year: Optional[int] = None
+) -> Iterator[QueryComponent]:
+    """Lazily expand all query components, one entity batch at a time."""
     base_queries, keyword_query, source_query = base_queries_tuple
-    queries_expanded = []
+    entity_batch_queries = iter(entity_batch_queries or [None])
+    # Without any entity batch, expand the base queries once, as for [None]
+    first_entity_batch_query = next(entity_batch_queries, None)
 
-    for entity_batch_query in entity_batch_queries or [None]:
+    for entity_batch_query in chain([first_entity_batch_query], entity_batch_queries):
         for base_query in base_queries or [None]:
             expanded_query = base_query or None
             # Add entity batch
@@ -396,10 +478,7 @@ def _expand_queries(
                     expanded_query & FiscalYear(fiscal_year) if expanded_query else None
                 )
 
-            # Append the expanded query to the final list
-            queries_expanded.append(expanded_query)
-
-    return queries_expanded
+            yield expanded_query
     
 def create_date_intervals(
     start_date: str, end_date: str, freq: str
@@ -0,0 +1,424 @@
+"""
+Module for planning the batched queries of a search before running it.
+
+`build_batched_query` searches every sentence for every batch of
+`batch_size` entities, and every query over every date range, whatever the
+number of documents each search is expected to return. A search returns at
+most `document_limit` documents: batches of rarely mentioned entities and
+fine date ranges waste queries on searches far below the limit, while
+batches of popular entities are cut off by it.
+
+`plan_batched_query` picks the entity batches and the date windows from the
+expected number of documents of each entity, so that the grid has as few
+searches as possible while the searches are expected to return a target
+share of the matching documents (the coverage), within an optional budget.
+`QueryPlan.explain` describes the plan and `QueryPlan.build_queries` builds
+its queries.
+"""
+
+import math
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from bigdata_client.models.advanced_search_query import QueryComponent
+from bigdata_client.models.search import DocumentType
+
+from bigdata_research_tools.search.query_builder import (
+    EntitiesToSearch,
+    build_batched_query,
+)
+from bigdata_research_tools.search.search import DATE_RANGE_TYPE, normalize_date_range
+
+MAX_PLANNED_BATCH_SIZE = 100
+DEFAULT_ENTITY_YIELD = 1.0
+# Candidate capacities of a batch, as a multiple of the document limit
+CAPACITY_FACTORS = (0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 4.0, 8.0)
+# Candidate numbers of consecutive date ranges merged into a window
+WINDOW_SIZES = (1, 2, 3, 4, 6, 12)
+
+
+@dataclass
+class QueryPlan:
+    """
+    The searches chosen by `plan_batched_query`.
+
+    Args:
+        sentences (List[str]): The sentences, one query each.
+        entity_batches (List[EntitiesToSearch]): The batches of entity names.
+        date_ranges (List[Tuple[str, str]]): The start and end of each date
+            window, in chronological order.
+        document_limit (int): The maximum number of documents per search.
+        target_coverage (float): The coverage the plan was asked to reach.
+        coverage (float): The expected share of the matching documents
+            returned by the searches of the plan.
+        expected_documents (float): The expected number of matching documents.
+        budget (Optional[int]): The maximum number of searches, if any.
+        rpm (Optional[int]): Requests per minute used to estimate the duration.
+        baseline_queries (int): The number of searches of the default grid.
+        baseline_coverage (float): The expected coverage of the default grid.
+        baseline_batch_size (int): The batch size of the default grid.
+        batch_sizes (List[int]): The number of entities of each batch.
+        probe_queries (int): The searches spent before the plan to estimate the
+            expected documents, counted against the budget.
+    """
+
+    sentences: List[str]
+    entity_batches: List[EntitiesToSearch]
+    date_ranges: List[Tuple[str, str]]
+    document_limit: int
+    target_coverage: float
+    coverage: float
+    expected_documents: float
+    budget: Optional[int] = None
+    rpm: Optional[int] = None
+    baseline_queries: int = 0
+    baseline_coverage: float = 1.0
+    baseline_batch_size: int = 10
+    batch_sizes: List[int] = field(default_factory=list)
+    probe_queries: int = 0
+
+    @property
+    def total_queries(self) -> int:
+        """The number of searches of the plan."""
+        return (
+            max(len(self.sentences), 1)
+            * max(len(self.entity_batches), 1)
+            * len(self.date_ranges)
+        )
+
+    def explain(self) -> str:
+        """
+        Describe the plan, to review it before running the searches.
+
+        Returns:
+            str: A multi-line summary of the grid, its expected coverage and
+                its cost compared with the default grid.
+        """
+        lines = [
+            f"Query plan: {self.total_queries} searches = "
+            f"{max(len(self.sentences), 1)} sentences x "
+            f"{max(len(self.entity_batches), 1)} entity batches x "
+            f"{len(self.date_ranges)} date windows",
+            f"  Expected coverage {self.coverage:.1%} (target "
+            f"{self.target_coverage:.1%}) of {self.expected_documents:.0f} "
+            f"matching documents, with {self.document_limit} documents per search",
+        ]
+        if self.probe_queries:
+            lines.append(
+                f"  Plus {self.probe_queries} probe searches to estimate the "
+                f"expected documents: {self.total_queries + self.probe_queries} "
+                f"searches in all"
+            )
+        if self.batch_sizes:
+            lines.append(
+                f"  Entity batches of {min(self.batch_sizes)} to "
+                f"{max(self.batch_sizes)} entities "
+                f"(mean {sum(self.batch_sizes) / len(self.batch_sizes):.1f})"
+            )
+        if self.date_ranges:
+            lines.append(
+                f"  Date windows from {self.date_ranges[0][0]} to "
+                f"{self.date_ranges[-1][1]}"
+            )
+        lines.append(
+            f"  Default grid (batch_size={self.baseline_batch_size}): "
+            f"{self.baseline_queries} searches, expected coverage "
+            f"{self.baseline_coverage:.1%}"
+        )
+        searches = self.total_queries + self.probe_queries
+        if self.rpm:
+            lines.append(
+                f"  Estimated {searches / self.rpm:.1f} minutes at "
+                f"{self.rpm} requests per minute"
+            )
+        if self.budget is not None:
+            status = "within" if searches <= self.budget else "over"
+            lines.append(
+                f"  {status.capitalize()} the budget of {self.budget} searches"
+                + (", including the probes" if self.probe_queries else "")
+            )
+            if self.coverage < self.target_coverage:
+                lines.append(
+                    "  The target coverage cannot be reached within the budget"
+                )
+        return "\n".join(lines)
+
+    def build_queries(
+        self,
+        keywords: Optional[List[str]] = None,
+        control_entities: Optional[EntitiesToSearch] = None,
+        sources: Optional[List[str]] = None,
+        fiscal_year: Optional[int] = None,
+        scope: DocumentType = DocumentType.ALL,
+    ) -> List[QueryComponent]:
+        """
+        Build the queries of the plan, to search over `date_ranges`.
+        See `build_batched_query` for the arguments.
+
+        Returns:
+            List[QueryComponent]: The queries, by entity batch and sentence.
+        """
+        return build_batched_query(
+            sentences=self.sentences,
+            keywords=keywords,
+            entities=None,
+            control_entities=control_entities,
+            sources=sources,
+            batch_size=MAX_PLANNED_BATCH_SIZE,
+            fiscal_year=fiscal_year,
+            scope=scope,
+            custom_batches=self.entity_batches or None,
+        )
+
+
+def plan_batched_query(
+    sentences: List[str],
+    entities: Optional[EntitiesToSearch],
+    date_ranges: DATE_RANGE_TYPE,
+    document_limit: int,
+    target_coverage: float = 0.9,
+    expected_documents: Optional[Dict[str, float]] = None,
+    default_yield: float = DEFAULT_ENTITY_YIELD,
+    max_batch_size: int = MAX_PLANNED_BATCH_SIZE,
+    merge_date_ranges: bool = True,
+    max_queries: Optional[int] = None,
+    rpm: Optional[int] = None,
+    max_minutes: Optional[float] = None,
+    max_query_units: Optional[float] = None,
+    units_per_query: float = 1.0,
+    baseline_batch_size: int = 10,
+    probe_queries: int = 0,
+) -> QueryPlan:
+    """
+    Choose the entity batches and date windows of a search with the fewest
+    searches that are expected to reach a target coverage.
+
+    The cost model expects every entity to be mentioned by
+    `expected_documents[name]` matching documents per date range and
+    sentence, and a search to return all the matching documents of its
+    batch and window up to `document_limit`. The coverage of a plan is the
+    expected share of the matching documents its searches return. Entities
+    are packed, most mentioned first, into batches of bounded expected
+    documents, and consecutive date ranges can be merged into windows when
+    they are expected to hold few documents. Among the candidate plans, the
+    one with the fewest searches reaching `target_coverage` within the
+    budget is chosen or, if none does, the one with the highest coverage
+    within the budget.
+
+    Sentences are kept in separate queries: the Bigdata API does not support
+    OR between similarity sentences, and combining them with AND would
+    change which chunks match.
+
+    Args:
+        sentences (List[str]): The sentences to search for.
+        entities (Optional[EntitiesToSearch]): The entity names to batch.
+        date_ranges (DATE_RANGE_TYPE): The date ranges to cover.
+        document_limit (int): The maximum number of documents per search.
+        target_coverage (float): The expected share of the matching documents
+            to return, between 0 and 1. Defaults to 0.9.
+        expected_documents (Optional[Dict[str, float]]): The expected number of
+            matching documents per date range and sentence of each entity name,
+            e.g. measured by a previous run. Defaults to `default_yield` for all.
+        default_yield (float): The expected number of documents of the names
+            missing from `expected_documents`. Defaults to 1.
+        max_batch_size (int): The largest number of entities per query.
+        merge_date_ranges (bool): If True, consecutive date ranges can be
+            merged into a single window. Defaults to True.
+        max_queries (Optional[int]): The maximum number of searches.
+        rpm (Optional[int]): Requests per minute, to estimate the duration and,
+            with `max_minutes`, to bound the number of searches.
+        max_minutes (Optional[float]): The maximum duration of the searches.
+        max_query_units (Optional[float]): The maximum number of query units.
+        units_per_query (float): The query units of a search. Defaults to 1.
+        baseline_batch_size (int): The batch size of the default grid the
+            plan is compared with. Defaults to 10.
+        probe_queries (int): The searches already spent to estimate
+            `expected_documents`, e.g. by `probe_density`. They are subtracted
+            from the budget and reported by `QueryPlan.explain`. Defaults to 0.
+    Returns:
+        QueryPlan: The chosen plan.
+    """
+    if not 0 < target_coverage <= 1:
+        raise ValueError(
+            f"The target coverage must be in (0, 1], got {target_coverage}"
+        )
+    date_ranges = normalize_date_range(list(date_ranges))
+    date_ranges.sort(key=lambda x: x[0])
+    expected_documents = expected_documents or {}
+
+    budget = _budget(max_queries, rpm, max_minutes, max_query_units, units_per_query)
+    items = _entity_items(entities)
+    yields = [expected_documents.get(name, default_yield) for _, name in items]
+    n_sentences = max(len(sentences or []), 1)
+
+    window_sizes = [1]
+    if merge_date_ranges:
+        window_sizes = [size for size in WINDOW_SIZES if size <= len(date_ranges)]
+
+    candidates = []
+    for window_size in window_sizes:
+        windows = _window_lengths(len(date_ranges), window_size)
+        if items:
+            packings = {
+                tuple(
+                    map(
+                        tuple,
+                        _pack(
+                            yields,
+                            factor * document_limit / window_size,
+                            max_batch_size,
+                        ),
+                    )
+                )
+                for factor in CAPACITY_FACTORS
+            }
+        else:
+            packings = {()}
+        for batches in packings:
+            coverage, total = _coverage(batches, yields, windows, document_limit)
+            queries = n_sentences * max(len(batches), 1) * len(windows)
+            candidates.append((queries, coverage, total, window_size, batches))
+
+    within_budget = [
+        c for c in candidates if budget is None or c[0] + probe_queries <= budget
+    ]
+    reaching = [c for c in within_budget if c[1] >= target_coverage]
+    if reaching:
+        chosen = min(reaching, key=lambda c: (c[0], -c[1], c[3]))
+    elif within_budget:
+        chosen = max(within_budget, key=lambda c: (c[1], -c[0]))
+    else:
+        chosen = min(candidates, key=lambda c: (c[0], -c[1]))
+    _, coverage, total, window_size, batches = chosen
+
+    baseline = [
+        list(range(start, min(start + baseline_batch_size, len(items))))
+        for start in range(0, len(items), baseline_batch_size)
+    ]
+    baseline_coverage, _ = _coverage(
+        baseline, yields, [1] * len(date_ranges), document_limit
+    )
+    return QueryPlan(
+        sentences=list(sentences or []),
+        entity_batches=[_batch_config(items, batch) for batch in batches],
+        date_ranges=_merge_windows(date_ranges, window_size),
+        document_limit=document_limit,
+        target_coverage=target_coverage,
+        coverage=coverage,
+        expected_documents=total * n_sentences,
+        budget=budget,
+        rpm=rpm,
+        baseline_queries=n_sentences * max(len(baseline), 1) * len(date_ranges),
+        baseline_coverage=baseline_coverage,
+        baseline_batch_size=baseline_batch_size,
+        batch_sizes=[len(batch) for batch in batches],
+        probe_queries=probe_queries,
+    )
+
+
+def _budget(
+    max_queries: Optional[int],
+    rpm: Optional[int],
+    max_minutes: Optional[float],
+    max_query_units: Optional[float],
+    units_per_query: float,
+) -> Optional[int]:
+    """The tightest of the budgets, as a number of searches."""
+    budgets = []
+    if max_queries is not None:
+        budgets.append(max_queries)
+    if rpm is not None and max_minutes is not None:
+        budgets.append(math.floor(rpm * max_minutes))
+    if max_query_units is not None:
+        budgets.append(math.floor(max_query_units / units_per_query))
+    return min(budgets) if budgets else None
+
+
+def _entity_items(entities: Optional[EntitiesToSearch]) -> List[Tuple[str, str]]:
+    """The attribute and name of every entity of a config."""
+    if entities is None:
+        return []
+    return [
+        (attr_name, name)
+        for attr_name in EntitiesToSearch.get_entity_type_map()
+        for name in getattr(entities, attr_name, None) or []
+    ]
+
+
+def _pack(
+    yields: Sequence[float], capacity: float, max_batch_size: int
+) -> List[List[int]]:
+    """
+    Pack entities, most mentioned first, into batches whose expected documents
+    stay below `capacity`. An entity above the capacity gets its own batch.
+    """
+    order = sorted(range(len(yields)), key=lambda i: -yields[i])
+    batches = []
+    batch, batch_yield = [], 0.0
+    for i in order:
+        if batch and (
+            batch_yield + yields[i] > capacity or len(batch) >= max_batch_size
+        ):
+            batches.append(sorted(batch))
+            batch, batch_yield = [], 0.0
+        batch.append(i)
+        batch_yield += yields[i]
+    if batch:
+        batches.append(sorted(batch))
+    return sorted(batches)
+
+
+def _coverage(
+    batches: Sequence[Sequence[int]],
+    yields: Sequence[float],
+    windows: Sequence[int],
+    document_limit: int,
+) -> Tuple[float, float]:
+    """
+    The expected coverage of a grid and its expected number of matching
+    documents per sentence.
+    """
+    if not batches:
+        return 1.0, 0.0
+    batch_yields = [sum(yields[i] for i in batch) for batch in batches]
+    total = sum(batch_yields) * sum(windows)
+    if total == 0:
+        return 1.0, 0.0
+    returned = sum(
+        min(document_limit, batch_yield * window)
+        for batch_yield in batch_yields
+        for window in windows
+    )
+    return returned / total, total
+
+
+def _window_lengths(n_date_ranges: int, window_size: int) -> List[int]:
+    """The number of date ranges of each window."""
+    return [
+        min(window_size, n_date_ranges - start)
+        for start in range(0, n_date_ranges, window_size)
+    ]
+
+
+def _merge_windows(
+    date_ranges: List[Tuple[str, str]], window_size: int
+) -> List[Tuple[str, str]]:
+    """Merge every `window_size` consecutive date ranges."""
+    return [
+        (
+            date_ranges[start][0],
+            date_ranges[min(start + window_size, len(date_ranges)) - 1][1],
+        )
+        for start in range(0, len(date_ranges), window_size)
+    ]
+
+
+def _batch_config(
+    items: List[Tuple[str, str]], batch: Sequence[int]
+) -> EntitiesToSearch:
+    """Build the config of a batch of entities, keeping their attributes."""
+    names: Dict[str, List[str]] = {}
+    for i in batch:
+        attr_name, name = items[i]
+        names.setdefault(attr_name, []).append(name)
+    return EntitiesToSearch(**names)
@@ -0,0 +1,385 @@
+"""
+Module for rate limiting requests to the Bigdata API.
+
+This module defines a `RateLimiter` class implementing a token bucket with
+fractional refill. Instead of polling, every caller reserves its token up
+front and sleeps exactly until that token is due, which keeps the full
+request-per-minute (RPM) budget available without adding latency.
+
+`FileRateLimiter` keeps the bucket in a small file guarded by a file lock,
+so that several processes on the same machine share one RPM budget.
+"""
+
+import asyncio
+import os
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from typing import BinaryIO, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+REQUESTS_PER_MINUTE_LIMIT = 300
+# Environment variable pointing to the state file of a shared rate limiter
+RATE_LIMITER_PATH_ENV = "BIGDATA_RATE_LIMITER_PATH"
+# Seconds between two attempts to lock the state file on Windows
+LOCK_RETRY_DELAY = 0.01
+
+
+@dataclass
+class RateLimiterStats:
+    """
+    Snapshot of the usage of a `RateLimiter`.
+
+    Args:
+        tokens_consumed (int): Number of tokens handed out.
+        timeouts (int): Number of acquisitions that gave up because the token
+            would not be available within their timeout.
+        total_wait (float): Total time (in seconds) spent waiting for tokens.
+        max_wait (float): Longest single wait (in seconds) for a token.
+    """
+
+    tokens_consumed: int = 0
+    timeouts: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    @property
+    def average_wait(self) -> float:
+        """Average wait (in seconds) per consumed token."""
+        if not self.tokens_consumed:
+            return 0.0
+        return self.total_wait / self.tokens_consumed
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket rate limiter.
+
+    Tokens accrue continuously at `rpm / 60` per second, measured with
+    `time.monotonic`, up to `bucket_size`. When the bucket is empty, a caller
+    takes the next token on credit (the bucket goes negative) and sleeps until
+    it is due, so waiters are served in arrival order and never poll.
+
+    The same instance can be shared by several `SearchManager` and
+    `AsyncSearchManager` objects to enforce a single budget across them.
+    """
+
+    def __init__(
+        self,
+        rpm: int = REQUESTS_PER_MINUTE_LIMIT,
+        bucket_size: Optional[int] = None,
+    ):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            rpm (int): Requests per minute limit. Defaults to 300.
+            bucket_size (Optional[int]): Size of the token bucket, i.e. the
+                largest burst allowed. Defaults to the value of `rpm`.
+        """
+        self.rpm = rpm
+        self.bucket_size = bucket_size or rpm
+        self._rate = rpm / 60.0
+        self._tokens = float(self.bucket_size)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+        self._stats = RateLimiterStats()
+
+    @property
+    def tokens(self) -> float:
+        """Tokens currently available. Negative while tokens are owed."""
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+    @property
+    def stats(self) -> RateLimiterStats:
+        """A copy of the usage metrics collected so far."""
+        with self._lock:
+            return RateLimiterStats(**vars(self._stats))
+
+    def _refill(self, now: float) -> None:
+        """Accrue the (fractional) tokens earned since the last refill."""
+        elapsed = now - self._last_refill
+        self._tokens = min(self.bucket_size, self._tokens + elapsed * self._rate)
+        self._last_refill = now
+
+    def _take_token(self, timeout: Optional[float] = None) -> Optional[float]:
+        """
+        Take the next token from the (already refilled) bucket.
+
+        Args:
+            timeout (Optional[float]): Maximum time (in seconds) the caller is
+                willing to wait. Defaults to no timeout.
+        Returns:
+            Optional[float]: The time (in seconds) until the token is due, or
+                None if it would not be due within `timeout`.
+        """
+        wait = max(0.0, (1.0 - self._tokens) / self._rate)
+        if timeout is not None and wait > timeout:
+            return None
+        self._tokens -= 1.0
+        return wait
+
+    def _update_bucket(self, timeout: Optional[float] = None) -> Optional[float]:
+        """Refill the bucket and take a token from it. Called under the lock."""
+        self._refill(time.monotonic())
+        return self._take_token(timeout)
+
+    def _return_to_bucket(self) -> None:
+        """Refill the bucket and put an unused token back. Called under the lock."""
+        self._refill(time.monotonic())
+        self._tokens = min(self.bucket_size, self._tokens + 1.0)
+
+    def _release(self) -> None:
+        """Give back a token reserved by a waiter that gave up before it was due."""
+        with self._lock:
+            self._return_to_bucket()
+            self._stats.tokens_consumed -= 1
+
+    def _reserve(self, timeout: Optional[float] = None) -> Optional[float]:
+        """
+        Reserve the next token.
+
+        Args:
+            timeout (Optional[float]): Maximum time (in seconds) the caller is
+                willing to wait. Defaults to no timeout.
+        Returns:
+            Optional[float]: The time (in seconds) until the reserved token is
+                due, or None if it would not be due within `timeout`.
+        """
+        with self._lock:
+            wait = self._update_bucket(timeout)
+            if wait is None:
+                self._stats.timeouts += 1
+                return None
+            self._stats.tokens_consumed += 1
+            self._stats.total_wait += wait
+            self._stats.max_wait = max(self._stats.max_wait, wait)
+            return wait
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until a token is available.
+
+        Args:
+            timeout (Optional[float]): Maximum time (in seconds) to wait for a
+                token. Defaults to no timeout.
+        Returns:
+            bool: True if a token is acquired, False if timed out.
+        """
+        wait = self._reserve(timeout)
+        if wait is None:
+            return False
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    async def acquire_async(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait, without blocking the event loop, until a token is available.
+
+        Args:
+            timeout (Optional[float]): Maximum time (in seconds) to wait for a
+                token. Defaults to no timeout.
+        Returns:
+            bool: True if a token is acquired, False if timed out.
+        """
+        wait = self._reserve(timeout)
+        if wait is None:
+            return False
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                # The token is owed by this waiter; the next one can have it
+                self._release()
+                raise
+        return True
+
+
+class FileRateLimiter(RateLimiter):
+    """
+    Token bucket shared by every process on this machine that uses the
+    same state file.
+
+    The bucket level and the time of its last refill are stored in `path`
+    and only read or written while holding an exclusive lock on that file,
+    so N worker processes together consume a single RPM budget. Refills are
+    measured with `time.monotonic`, which is system-wide, hence the limiter
+    is meant for processes on one host (e.g. a `multiprocessing` pool or
+    several screeners launched side by side).
+
+    Usage metrics in `stats` only cover the calls made by this instance.
+    """
+
+    _STATE_FORMAT = "<dd"
+
+    def __init__(
+        self,
+        path: str,
+        rpm: int = REQUESTS_PER_MINUTE_LIMIT,
+        bucket_size: Optional[int] = None,
+    ):
+        """
+        Initialize the shared rate limiter.
+
+        Args:
+            path (str): Path of the state file. All processes sharing the
+                budget must use the same path and the same `rpm`.
+            rpm (int): Requests per minute limit. Defaults to 300.
+            bucket_size (Optional[int]): Size of the token bucket, i.e. the
+                largest burst allowed. Defaults to the value of `rpm`.
+        """
+        super().__init__(rpm=rpm, bucket_size=bucket_size)
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def tokens(self) -> float:
+        """Tokens currently available. Negative while tokens are owed."""
+        with self._lock, open(self.path, "a+b") as state_file:
+            _lock_file(state_file)
+            try:
+                self._read_state(state_file)
+                self._refill(time.monotonic())
+                return self._tokens
+            finally:
+                _unlock_file(state_file)
+
+    def _read_state(self, state_file: BinaryIO) -> None:
+        """Load the bucket from the state file, starting full if empty."""
+        state_file.seek(0)
+        raw = state_file.read(struct.calcsize(self._STATE_FORMAT))
+        now = time.monotonic()
+        if len(raw) == struct.calcsize(self._STATE_FORMAT):
+            tokens, last_refill = struct.unpack(self._STATE_FORMAT, raw)
+            # A refill time in the future means the clock was reset (reboot)
+            if last_refill <= now:
+                self._tokens, self._last_refill = tokens, last_refill
+                return
+        self._tokens, self._last_refill = float(self.bucket_size), now
+
+    def _write_state(self, state_file: BinaryIO) -> None:
+        """Persist the bucket into the state file."""
+        state_file.seek(0)
+        state_file.truncate()
+        state_file.write(
+            struct.pack(self._STATE_FORMAT, self._tokens, self._last_refill)
+        )
+        state_file.flush()
+
+    def _update_bucket(self, timeout: Optional[float] = None) -> Optional[float]:
+        """Refill the shared bucket and take a token from it."""
+        with open(self.path, "a+b") as state_file:
+            _lock_file(state_file)
+            try:
+                self._read_state(state_file)
+                self._refill(time.monotonic())
+                wait = self._take_token(timeout)
+                self._write_state(state_file)
+            finally:
+                _unlock_file(state_file)
+        return wait
+
+    def _return_to_bucket(self) -> None:
+        """Refill the shared bucket and put an unused token back."""
+        with open(self.path, "a+b") as state_file:
+            _lock_file(state_file)
+            try:
+                self._read_state(state_file)
+                super()._return_to_bucket()
+                self._write_state(state_file)
+            finally:
+                _unlock_file(state_file)
+
+
+def _lock_file(file: BinaryIO) -> None:
+    """Block until an exclusive lock on `file` is held."""
+    if fcntl is not None:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        return
+    # msvcrt has no blocking lock: LK_LOCK gives up after about 10 seconds
+    while True:
+        file.seek(0)
+        try:
+            msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+            return
+        except OSError:
+            time.sleep(LOCK_RETRY_DELAY)
+
+
+def _unlock_file(file: BinaryIO) -> None:
+    """Release the lock taken by `_lock_file`."""
+    if fcntl is not None:
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+    else:
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def create_rate_limiter(
+    rpm: int = REQUESTS_PER_MINUTE_LIMIT,
+    bucket_size: Optional[int] = None,
+) -> RateLimiter:
+    """
+    Create the default rate limiter for a search manager.
+
+    If the environment variable `BIGDATA_RATE_LIMITER_PATH` is set, a
+    `FileRateLimiter` backed by that file is returned, so every process
+    started with the same value shares one budget. Otherwise an in-process
+    `RateLimiter` is returned.
+
+    Args:
+        rpm (int): Requests per minute limit. Defaults to 300.
+        bucket_size (Optional[int]): Size of the token bucket.
+            Defaults to the value of `rpm`.
+    Returns:
+        RateLimiter: The rate limiter.
+    """
+    path = os.environ.get(RATE_LIMITER_PATH_ENV)
+    if path:
+        return FileRateLimiter(path, rpm=rpm, bucket_size=bucket_size)
+    return RateLimiter(rpm=rpm, bucket_size=bucket_size)
+
+
+_shared_rate_limiter: Optional[RateLimiter] = None
+_shared_rate_limiter_lock = threading.Lock()
+
+
+def get_shared_rate_limiter() -> RateLimiter:
+    """
+    Get the rate limiter shared by the search managers and the entity
+    resolver of the process, creating it with `create_rate_limiter()` on
+    first use, so that searches and Knowledge Graph lookups draw from one
+    RPM budget.
+
+    Returns:
+        RateLimiter: The shared rate limiter.
+    """
+    global _shared_rate_limiter
+    with _shared_rate_limiter_lock:
+        if _shared_rate_limiter is None:
+            _shared_rate_limiter = create_rate_limiter()
+        return _shared_rate_limiter
+
+
+def set_shared_rate_limiter(rate_limiter: Optional[RateLimiter]) -> None:
+    """
+    Replace the rate limiter shared by the search managers and the entity
+    resolver, e.g. with a `RateLimiter` of another RPM. None creates a new
+    default rate limiter on next use, with a full bucket.
+
+    Args:
+        rate_limiter (Optional[RateLimiter]): The rate limiter.
+    """
+    global _shared_rate_limiter
+    with _shared_rate_limiter_lock:
+        _shared_rate_limiter = rate_limiter
@@ -0,0 +1,112 @@
+"""
+Module for retrying failed searches.
+
+This module defines the `RetryPolicy` used by the search managers to retry
+transient errors with exponential backoff and jitter, the classification of
+errors into retryable and fatal ones, and the `FailedQuery` records kept for
+the searches that could not be completed, so they can be replayed on their own.
+"""
+
+import random
+from dataclasses import dataclass
+from json import JSONDecodeError
+from typing import Optional, Union
+
+import requests
+from bigdata_client.daterange import AbsoluteDateRange, RollingDateRange
+from bigdata_client.exceptions import BigdataClientRateLimitError
+from bigdata_client.models.advanced_search_query import QueryComponent
+from bigdata_client.models.search import DocumentType, SortBy
+
+# HTTP status codes worth retrying: throttling and server-side errors
+RETRYABLE_STATUS_CODES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+@dataclass
+class RetryPolicy:
+    """
+    How many times, and after how long, a failed search is retried.
+
+    The delay before retry `n` (starting at 0) is
+    `min(max_delay, base_delay * 2 ** n)`, reduced by a random fraction of up
+    to `jitter` so that concurrent workers do not retry in lockstep. Every
+    retry acquires a new token from the rate limiter.
+
+    Args:
+        max_retries (int): Maximum number of retries per search. 0 disables retries.
+        base_delay (float): Delay (in seconds) before the first retry.
+        max_delay (float): Upper bound (in seconds) of the delay between retries.
+        jitter (float): Fraction of the delay, between 0 and 1, that is randomized.
+    """
+
+    max_retries: int = 3
+    base_delay: float = 1.0
+    max_delay: float = 30.0
+    jitter: float = 0.5
+
+    def get_delay(self, attempt: int) -> float:
+        """
+        Get the delay before a retry.
+
+        Args:
+            attempt (int): The number of the retry, starting at 0.
+        Returns:
+            float: The delay in seconds.
+        """
+        delay = min(self.max_delay, self.base_delay * 2**attempt)
+        return delay * (1 - self.jitter * random.random())
+
+
+@dataclass
+class FailedQuery:
+    """
+    A search that could not be completed, with everything needed to replay it.
+
+    Args:
+        query (QueryComponent): The search query.
+        date_range (Union[AbsoluteDateRange, RollingDateRange, tuple, None]): The date range filter.
+        sortby (SortBy): The sorting criterion for the search results.
+        scope (DocumentType): The scope of the documents to include.
+        limit (int): The maximum number of documents to return.
+        rerank_threshold (Optional[float]): The reranking threshold.
+        error (str): Description of the last error.
+        attempts (int): Number of attempts made.
+    """
+
+    query: QueryComponent
+    date_range: Union[AbsoluteDateRange, RollingDateRange, tuple, None]
+    sortby: SortBy
+    scope: DocumentType
+    limit: int
+    rerank_threshold: Optional[float]
+    error: str
+    attempts: int
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """
+    Decide whether a search error is transient and worth retrying.
+
+    Throttling, timeouts, dropped connections, malformed (e.g. truncated)
+    responses and server-side HTTP errors are retryable. Anything else, such
+    as an invalid query or a request over the payload limit, is fatal.
+
+    Args:
+        error (Exception): The error raised by the search.
+    Returns:
+        bool: True if the search should be retried.
+    """
+    if isinstance(error, requests.HTTPError):
+        status_code = getattr(error.response, "status_code", None)
+        return status_code is None or status_code in RETRYABLE_STATUS_CODES
+    return isinstance(
+        error,
+        (
+            BigdataClientRateLimitError,
+            requests.ConnectionError,
+            requests.Timeout,
+            ConnectionError,
+            TimeoutError,
+            JSONDecodeError,
+        ),
+    )
@@ -1,27 +1,46 @@
 from logging import Logger, getLogger
-from typing import List, Optional, Dict
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 
+import numpy as np
 from bigdata_client.document import Document
-from bigdata_client.models.advanced_search_query import ListQueryComponent
+from bigdata_client.models.advanced_search_query import (
+    ListQueryComponent,
+    QueryComponent,
+)
 from bigdata_client.models.entities import Company
 from bigdata_client.models.search import DocumentType, SortBy
-from pandas import DataFrame
-from tqdm import tqdm
+from pandas import DataFrame, Series, Timedelta, Timestamp
 
 from bigdata_research_tools.client import bigdata_connection
 from bigdata_research_tools.prompts.labeler import (
     get_other_entity_placeholder,
     get_target_entity_placeholder,
 )
+from bigdata_research_tools.search.chunk_table import ChunkTable
+from bigdata_research_tools.search.density import probe_density
+from bigdata_research_tools.search.entity_index import EntityIndex
+from bigdata_research_tools.search.masking import mask_texts
+from bigdata_research_tools.search.planner import (
+    SearchSchedule,
+    adaptive_search,
+    cell_key,
+)
 from bigdata_research_tools.search.query_builder import (
-    build_batched_query,
     EntitiesToSearch,
+    batch_entities,
     create_date_ranges,
+    iter_batched_query,
 )
-from bigdata_research_tools.search.search import run_search
-from bigdata_research_tools.tracing import Trace, TraceEventNames, send_trace
+from bigdata_research_tools.search.query_planner import plan_batched_query
+from bigdata_research_tools.search.retry import FailedQuery
+from bigdata_research_tools.search.screener_tables import (
+    ScreenerTables,
+    build_screener_tables,
+)
+from bigdata_research_tools.search.search import normalize_date_range, run_search
 from bigdata_research_tools.search.search_utils import filter_search_results
-
+from bigdata_research_tools.search.sharding import merge_shards, run_search_shard
+from bigdata_research_tools.tracing import Trace, TraceEventNames, send_trace
 
 logger: Logger = getLogger(__name__)
 
@@ -41,8 +60,16 @@ def search_by_companies(
     rerank_threshold: Optional[float] = None,
     document_limit: int = 50,
     batch_size: int = 10,
+    adaptive_splitting: bool = False,
+    target_coverage: Optional[float] = None,
+    expected_documents: Optional[Dict[str, float]] = None,
+    max_queries: Optional[int] = None,
+    max_query_units: Optional[float] = None,
+    density_probe: bool = False,
+    schedule: Optional[SearchSchedule] = None,
+    normalized: bool = False,
     **kwargs,
-) -> DataFrame:
+) -> Union[DataFrame, ScreenerTables]:
     """
     Screen for documents based on the input sentences and other filters.
 
@@ -66,9 +93,42 @@ def search_by_companies(
             See https://sdk.bigdata.com/en/latest/how_to_guides/rerank_search.html
         document_limit (int): The maximum number of documents to return per Bigdata query.
         batch_size (int): The number of entities to include in each batched query.
+        adaptive_splitting (bool): If True, search `freq` date ranges and split the date
+            range, then the batch of companies, of every search that returns `document_limit`
+            documents, instead of searching a fixed grid. Use a coarse `freq` (e.g. 'Y').
+            See `bigdata_research_tools.search.planner.adaptive_search`. Defaults to False.
+        target_coverage (Optional[float]): If set, let a cost-based plan choose the batches
+            of companies and the date windows with the fewest searches expected to return
+            this share of the matching documents, instead of `batch_size` and `freq`. The
+            plan is logged before the searches start.
+            See `bigdata_research_tools.search.query_planner.plan_batched_query`. Defaults to None.
+        expected_documents (Optional[Dict[str, float]]): The expected number of matching
+            documents of each company id per `freq` date range and sentence, which sizes the
+            batches of `target_coverage`. Defaults to an estimate from one density probe per
+            company and query over the whole period, with the same keywords, sources and
+            control entities as the searches. The probes count against the budget of the plan
+            and are reported with it.
+        max_queries (Optional[int]): The maximum number of searches of `target_coverage`,
+            including the probes. Defaults to None.
+        max_query_units (Optional[float]): The maximum number of query units of
+            `target_coverage`, including the probes. Defaults to None.
+        density_probe (bool): If True, first probe the density of every batch of companies over
+            `freq` date ranges, then search each batch over date ranges sized to its density
+            instead of a fixed grid. Use a coarse `freq` (e.g. 'Y').
+            See `bigdata_research_tools.search.density.probe_density`. Defaults to False.
+        schedule (Optional[SearchSchedule]): The date ranges to search for each batch of
+            companies, e.g. from `DensityProfile.schedule` or `adaptive_search` over the same
+            companies, sentences and filters. Batches missing from it are searched over `freq`
+            date ranges. Defaults to None.
+        normalized (bool): If True, return the results as `ScreenerTables`, which store
+            each chunk, entity mention and entity once, instead of the DataFrame, which
+            `ScreenerTables.to_frame` builds. Defaults to False.
+        kwargs (dict): Additional arguments forwarded to `run_search`. For example,
+            `use_async=True` runs the searches from a single event loop.
 
     Returns:
-        DataFrame: The DataFrame with the screening results.
+        Union[DataFrame, ScreenerTables]: The DataFrame with the screening results,
+        or its `ScreenerTables` if `normalized` is True.
         - Index: int
         - Columns:
             - timestamp_utc: datetime64
@@ -95,6 +155,29 @@ def search_by_companies(
             - other_entities_map: List[Tuple[int, str]]
     """
 
+    if adaptive_splitting and target_coverage is not None:
+        raise ValueError(
+            "Only one of `adaptive_splitting` or `target_coverage` should be provided, not both."
+        )
+    if density_probe and schedule is not None:
+        raise ValueError(
+            "Only one of `density_probe` or `schedule` should be provided, not both."
+        )
+    if target_coverage is not None and (density_probe or schedule is not None):
+        raise ValueError(
+            "`target_coverage` plans its own date ranges and cannot be combined "
+            "with `density_probe` or `schedule`."
+        )
+    if target_coverage is None and (
+        expected_documents is not None
+        or max_queries is not None
+        or max_query_units is not None
+    ):
+        raise ValueError(
+            "`expected_documents`, `max_queries` and `max_query_units` size the plan "
+            "of `target_coverage` and require it."
+        )
+
     if not kwargs.get("current_trace"):
         current_trace = Trace(
             event_name=TraceEventNames.COMPANY_SEARCH,
@@ -110,83 +193,417 @@ def search_by_companies(
         kwargs["current_trace"] = current_trace
 
     try:
-        # Extract entities for search querying
-        entity_keys = [entity.id for entity in companies]
+        if adaptive_splitting or density_probe or schedule is not None:
+            # Search the queries without companies and let the planner
+            # combine them with batches of companies, over the date ranges
+            # of the schedule, splitting saturated searches if adaptive
+            base_queries = _build_company_queries(
+                companies=None,
+                sentences=sentences,
+                scope=scope,
+                fiscal_year=fiscal_year,
+                sources=sources,
+                keywords=keywords,
+                control_entities=control_entities,
+                batch_size=batch_size,
+            )
+            entities_config = EntitiesToSearch(
+                companies=[entity.id for entity in companies]
+            )
+            entity_batches = batch_entities(entities_config, batch_size, scope)
+            if density_probe:
+                schedule = probe_density(
+                    base_queries,
+                    entity_batches,
+                    start_date=start_date,
+                    end_date=end_date,
+                    freq=freq,
+                    scope=scope,
+                    rerank_threshold=rerank_threshold,
+                    **kwargs,
+                ).schedule(document_limit)
+            planner_kwargs = (
+                kwargs if adaptive_splitting else {**kwargs, "max_depth": 0}
+            )
+            results, _, _ = adaptive_search(
+                base_queries,
+                entity_batches,
+                start_date=start_date,
+                end_date=end_date,
+                freq=freq,
+                sortby=sort_by,
+                scope=scope,
+                document_limit=document_limit,
+                rerank_threshold=rerank_threshold,
+                schedule=schedule,
+                **planner_kwargs,
+            )
+        elif target_coverage is not None:
+            date_ranges = create_date_ranges(start_date, end_date, freq)
+            probe_queries = 0
+            if expected_documents is None:
+                base_queries = _build_company_queries(
+                    companies=None,
+                    sentences=sentences,
+                    scope=scope,
+                    fiscal_year=fiscal_year,
+                    sources=sources,
+                    keywords=keywords,
+                    control_entities=control_entities,
+                    batch_size=batch_size,
+                )
+                budget = min(
+                    (b for b in (max_queries, max_query_units) if b is not None),
+                    default=None,
+                )
+                probes = len(companies) * max(len(base_queries), 1)
+                if budget is not None and probes >= budget:
+                    raise ValueError(
+                        f"Estimating the expected documents takes {probes} probe "
+                        f"searches, which leaves nothing of the budget of {budget}: "
+                        "pass `expected_documents` instead."
+                    )
+                expected_documents, probe_queries = _expected_company_documents(
+                    companies,
+                    base_queries,
+                    date_ranges,
+                    start_date=start_date,
+                    end_date=end_date,
+                    scope=scope,
+                    rerank_threshold=rerank_threshold,
+                    **kwargs,
+                )
+            plan = plan_batched_query(
+                sentences=sentences,
+                entities=EntitiesToSearch(
+                    companies=[entity.id for entity in companies]
+                ),
+                date_ranges=date_ranges,
+                document_limit=document_limit,
+                target_coverage=target_coverage,
+                expected_documents=expected_documents,
+                max_queries=max_queries,
+                rpm=kwargs.get("rpm"),
+                max_query_units=max_query_units,
+                baseline_batch_size=batch_size,
+                probe_queries=probe_queries,
+            )
+            logger.info(plan.explain())
+            control_entities_config = None
+            if control_entities:
+                control_entities_config = EntitiesToSearch(**control_entities)
+            results = run_search(
+                plan.build_queries(
+                    keywords=keywords,
+                    control_entities=control_entities_config,
+                    sources=sources,
+                    fiscal_year=fiscal_year,
+                    scope=scope,
+                ),
+                date_ranges=plan.date_ranges,
+                limit=document_limit,
+                scope=scope,
+                sortby=sort_by,
+                rerank_threshold=rerank_threshold,
+                as_chunk_table=True,
+                **kwargs,
+            )
+        else:
+            # Build batched queries lazily, as they are searched
+            batched_query = _iter_company_queries(
+                companies=companies,
+                sentences=sentences,
+                scope=scope,
+                fiscal_year=fiscal_year,
+                sources=sources,
+                keywords=keywords,
+                control_entities=control_entities,
+                batch_size=batch_size,
+            )
+
+            # Create list of date ranges
+            date_ranges = create_date_ranges(start_date, end_date, freq)
+
+            logger.info(
+                f"About to run the queries of {len(companies)} companies "
+                f"over {len(date_ranges)} date ranges"
+            )
+            # Run concurrent search
+            results = run_search(
+                batched_query,
+                date_ranges=date_ranges,
+                limit=document_limit,
+                scope=scope,
+                sortby=sort_by,
+                rerank_threshold=rerank_threshold,
+                as_chunk_table=True,
+                **kwargs,
+            )
+
+        df_sentences = _process_company_search_results(
+            results, companies, scope, normalized
+        )
+    except Exception:
+        execution_result = "error"
+        raise
+    else:
+        execution_result = "success"
+    finally:
+        current_trace = kwargs.get("current_trace")
+        if current_trace and current_trace.event_name == TraceEventNames.COMPANY_SEARCH:
+            current_trace.workflow_end_date = Trace.get_time_now()
+            current_trace.result = execution_result  # noqa
+            send_trace(bigdata_connection(), current_trace)
 
-    # Create entity configs
-        entities_config = EntitiesToSearch(companies=entity_keys)
-        
-        # If control_entities are provided, create a control EntityConfig
-        # For this example, assuming control_entities are all company entities
-        control_entities_config = None
-        if control_entities:
-            control_entities_config = EntitiesToSearch(**control_entities)
-
-        # Build batched queries
-        batched_query = build_batched_query(
+    return df_sentences
+
+
+def search_by_companies_shard(
+    companies: List[Company],
+    sentences: List[str],
+    start_date: str,
+    end_date: str,
+    shards: int,
+    shard: int,
+    path: str,
+    scope: DocumentType = DocumentType.ALL,
+    fiscal_year: Optional[int] = None,
+    sources: Optional[List[str]] = None,
+    keywords: Optional[List[str]] = None,
+    control_entities: Optional[Dict] = None,
+    freq: str = "M",
+    sort_by: SortBy = SortBy.RELEVANCE,
+    rerank_threshold: Optional[float] = None,
+    document_limit: int = 50,
+    batch_size: int = 10,
+    by: str = "cell",
+    **kwargs,
+) -> List[FailedQuery]:
+    """
+    Run one shard of the searches of `search_by_companies` and write its
+    results to a file, so that a large screen can be spread over several
+    processes or machines. Once every shard has completed,
+    `merge_company_search_shards` builds the screening DataFrame.
+
+    Every shard must be given the same arguments, except `shard` and `path`.
+    See `search_by_companies` for the search arguments and
+    `bigdata_research_tools.search.sharding.run_search_shard` for the others.
+
+    Args:
+        shards (int): The number of shards of the screen.
+        shard (int): The index of the shard to run, from 0 to `shards` - 1.
+        path (str): Path of the result file of the shard.
+        by (str): 'cell' to split the searches evenly, or 'query' to keep
+            every batch of companies in a single shard. Defaults to 'cell'.
+    Returns:
+        List[FailedQuery]: The searches of the shard that failed after all retries.
+    """
+    batched_query = _build_company_queries(
+        companies=companies,
+        sentences=sentences,
+        scope=scope,
+        fiscal_year=fiscal_year,
+        sources=sources,
+        keywords=keywords,
+        control_entities=control_entities,
+        batch_size=batch_size,
+    )
+    date_ranges = create_date_ranges(start_date, end_date, freq)
+    return run_search_shard(
+        batched_query,
+        date_ranges,
+        shards=shards,
+        shard=shard,
+        path=path,
+        by=by,
+        sortby=sort_by,
+        scope=scope,
+        limit=document_limit,
+        rerank_threshold=rerank_threshold,
+        **kwargs,
+    )
+
+
+def merge_company_search_shards(
+    paths: List[str],
+    companies: List[Company],
+    scope: DocumentType = DocumentType.ALL,
+    normalized: bool = False,
+) -> Union[DataFrame, ScreenerTables]:
+    """
+    Build the screening DataFrame from the result files of all the shards
+    written by `search_by_companies_shard`. The DataFrame is the one
+    `search_by_companies` returns when run in a single process.
+
+    Args:
+        paths (List[str]): The result files of the shards, in any order.
+        companies (List[Company]): The companies of the screen.
+        scope (DocumentType): The document type scope of the screen.
+        normalized (bool): If True, return the results as `ScreenerTables`.
+            Defaults to False.
+    Returns:
+        Union[DataFrame, ScreenerTables]: The DataFrame with the screening results,
+            see `search_by_companies`, or its `ScreenerTables`.
+    """
+    results = merge_shards(paths)
+    return _process_company_search_results(results, companies, scope, normalized)
+
+
+def _expected_company_documents(
+    companies: List[Company],
+    base_queries: List[QueryComponent],
+    date_ranges: List,
+    start_date: str,
+    end_date: str,
+    scope: DocumentType,
+    rerank_threshold: Optional[float],
+    **kwargs,
+) -> Tuple[Dict[str, float], int]:
+    """
+    Estimate the matching documents of each company per date range and query
+    with `probe_density`, probing every query, with its filters, for every
+    company over the whole period. Companies whose probes all failed are left
+    out. Also return the number of probe searches.
+    """
+    period = Timestamp(end_date) - Timestamp(start_date)
+    batches = batch_entities(
+        EntitiesToSearch(companies=[entity.id for entity in companies]), 1, scope
+    )
+    profile = probe_density(
+        base_queries,
+        batches,
+        start_date=start_date,
+        end_date=end_date,
+        freq=f"{period.days + 1}D",
+        scope=scope,
+        rerank_threshold=rerank_threshold,
+        **kwargs,
+    )
+    # The share of the probed period covered by one date range of the run
+    (start, end), *_ = profile.date_ranges
+    share = _mean_duration(date_ranges) / (Timestamp(end) - Timestamp(start))
+
+    expected_documents = {}
+    for batch in batches:
+        volumes = [
+            profile.volumes[cell_key(query, batch)][0]
+            for query in base_queries or [None]
+        ]
+        volumes = [volume for volume in volumes if volume is not None]
+        if volumes:
+            company_id = batch[0].to_dict()["value"][0]
+            expected_documents[company_id] = share * sum(volumes) / len(volumes)
+    return expected_documents, profile.searches
+
+
+def _mean_duration(date_ranges: List) -> Timedelta:
+    durations = [
+        Timestamp(end) - Timestamp(start)
+        for start, end in normalize_date_range(list(date_ranges))
+    ]
+    return sum(durations, Timedelta(0)) / len(durations)
+
+
+def _build_company_queries(
+    companies: Optional[List[Company]],
+    sentences: List[str],
+    scope: DocumentType,
+    fiscal_year: Optional[int],
+    sources: Optional[List[str]],
+    keywords: Optional[List[str]],
+    control_entities: Optional[Dict],
+    batch_size: int,
+) -> List[QueryComponent]:
+    """Build the batched queries of a screen, without companies if None."""
+    return list(
+        _iter_company_queries(
+            companies=companies,
             sentences=sentences,
-            keywords=keywords,
-            entities=entities_config,
-            control_entities=control_entities_config,
-            custom_batches=None,
+            scope=scope,
+            fiscal_year=fiscal_year,
             sources=sources,
+            keywords=keywords,
+            control_entities=control_entities,
             batch_size=batch_size,
-            fiscal_year=fiscal_year,
-            scope=scope,
         )
+    )
 
-        # Create list of date ranges
-        date_ranges = create_date_ranges(start_date, end_date, freq)
-
-        no_queries = len(batched_query)
-        no_dates = len(date_ranges)
-        total_no = no_dates * no_queries
 
-        logger.info(f"About to run {total_no} queries")
-        logger.debug("Example Query:", batched_query[0])
-        # Run concurrent search
-        results = run_search(
-            batched_query,
-            date_ranges=date_ranges,
-            limit=document_limit,
-            scope=scope,
-            sortby=sort_by,
-            rerank_threshold=rerank_threshold,
-            **kwargs,
+def _iter_company_queries(
+    companies: Optional[List[Company]],
+    sentences: List[str],
+    scope: DocumentType,
+    fiscal_year: Optional[int],
+    sources: Optional[List[str]],
+    keywords: Optional[List[str]],
+    control_entities: Optional[Dict],
+    batch_size: int,
+) -> Iterator[QueryComponent]:
+    """Lazily build the batched queries of `_build_company_queries`."""
+    # Create entity configs
+    entities_config = None
+    if companies is not None:
+        entities_config = EntitiesToSearch(
+            companies=[entity.id for entity in companies]
         )
 
-        results, entities = filter_search_results(results)
-        # Filter entities to only include COMPANY entities
-        entities = filter_company_entities(entities)
-        
-        # Determine whether to filter by companies based on document type
-        # For filings and transcripts, we don't need to filter as we use reporting entities
-        # For news, we need to check against our original universe of companies as a news article
-        # may mention other companies we're not interested in
-        needs_company_filtering = scope not in (
-            DocumentType.FILINGS,
-            DocumentType.TRANSCRIPTS,
-        )
+    # If control_entities are provided, create a control EntityConfig
+    # For this example, assuming control_entities are all company entities
+    control_entities_config = None
+    if control_entities:
+        control_entities_config = EntitiesToSearch(**control_entities)
+
+    return iter_batched_query(
+        sentences=sentences,
+        keywords=keywords,
+        entities=entities_config,
+        control_entities=control_entities_config,
+        custom_batches=None,
+        sources=sources,
+        batch_size=batch_size,
+        fiscal_year=fiscal_year,
+        scope=scope,
+    )
 
-        df_sentences = process_screener_search_results(
+
+def _process_company_search_results(
+    results: Union[List[List[Document]], ChunkTable],
+    companies: List[Company],
+    scope: DocumentType,
+    normalized: bool = False,
+) -> Union[DataFrame, ScreenerTables]:
+    """
+    Look up the entities of the search results and build the screening DataFrame,
+    or its `ScreenerTables` if `normalized` is True.
+    """
+    results, entities = filter_search_results(results)
+    # Filter entities to only include COMPANY entities
+    entities = filter_company_entities(entities)
+
+    # Determine whether to filter by companies based on document type
+    # For filings and transcripts, we don't need to filter as we use reporting entities
+    # For news, we need to check against our original universe of companies as a news article
+    # may mention other companies we're not interested in
+    needs_company_filtering = scope not in (
+        DocumentType.FILINGS,
+        DocumentType.TRANSCRIPTS,
+    )
+
+    if normalized:
+        return build_screener_tables(
             results=results,
             entities=entities,
             companies=companies if needs_company_filtering else None,
             document_type=scope,
         )
-    except Exception:
-        execution_result = "error"
-        raise
-    else:
-        execution_result = "success"
-    finally:
-        current_trace = kwargs.get("current_trace")
-        if current_trace and current_trace.event_name == TraceEventNames.COMPANY_SEARCH:
-            current_trace.workflow_end_date = Trace.get_time_now()
-            current_trace.result = execution_result  # noqa
-            send_trace(bigdata_connection(), current_trace)
 
-    return df_sentences
+    return process_screener_search_results(
+        results=results,
+        entities=entities,
+        companies=companies if needs_company_filtering else None,
+        document_type=scope,
+    )
+
 
 def filter_company_entities(
     entities: List[ListQueryComponent],
@@ -205,9 +622,10 @@ def filter_company_entities(
         if hasattr(entity, "entity_type") and getattr(entity, "entity_type") == "COMP"
     ]
 
+
 def process_screener_search_results(
-    results: List[Document],
-    entities: List[ListQueryComponent],
+    results: Union[List[Document], ChunkTable],
+    entities: Union[List[ListQueryComponent], EntityIndex],
     companies: Optional[List[Company]] = None,
     document_type: DocumentType = DocumentType.NEWS,
 ) -> DataFrame:
@@ -215,10 +633,12 @@ def process_screener_search_results(
     Build a unified DataFrame from search results for any document type.
 
     Args:
-        results (List[Document]): A list of Bigdata search results.
-        entities (List[ListQueryComponent]): A list of entities.
-        companies (Optional[List[Company]]): A list of companies to filter for.
-            Only used for non-reporting entity documents.
+        results (Union[List[Document], ChunkTable]): A list of Bigdata search results,
+            or a `ChunkTable` of them.
+        entities (Union[List[ListQueryComponent], EntityIndex]): A list of entities,
+            or an `EntityIndex` of them.
+        companies (Optional[List[Company]]): A list of companies to filter for,
+            by id. Only used for non-reporting entity documents.
         document_type (DocumentType): The type of documents being processed.
 
     Returns:
@@ -243,220 +663,86 @@ def process_screener_search_results(
             - masked_text: str
             - other_entities_map: List[Tuple[int, str]]
     """
-    entity_key_map = {entity.id: entity for entity in entities}
-
-    rows = []
-    for result in tqdm(results, desc=f"Processing {document_type} results..."):
-        for chunk in result.chunks:
-            # Build a list of entities present in the chunk
-            chunk_entities = [
-                {
-                    "key": entity.key,
-                    "name": (
-                        entity_key_map[entity.key].name
-                        if entity.key in entity_key_map
-                        else None
-                    ),
-                    "ticker": (
-                        entity_key_map[entity.key].ticker
-                        if entity.key in entity_key_map
-                        else None
-                    ),
-                    "start": entity.start,
-                    "end": entity.end,
-                }
-                for entity in chunk.entities
-                if entity.key in entity_key_map
-            ]
-
-            if not chunk_entities:
-                continue  # Skip if no entities are mapped
-
-            # Handle differently based on document type
-            if document_type in (DocumentType.FILINGS, DocumentType.TRANSCRIPTS):
-                # Process reporting entities
-                for re_key in result.reporting_entities:
-                    reporting_entity = entity_key_map.get(re_key)
-
-                    if not reporting_entity:
-                        continue  # Skip if reporting entity is not found
-
-                    # Exclude the reporting entity from other entities
-                    other_entities = [
-                        e for e in chunk_entities if e["name"] != reporting_entity.name
-                    ]
-
-                    # Collect information in standard format
-                    rows.append(
-                        {
-                            "timestamp_utc": result.timestamp,
-                            "document_id": result.id,
-                            "sentence_id": f"{result.id}-{chunk.chunk}",
-                            "headline": result.headline,
-                            "entity_id": re_key,
-                            "document_type": document_type.value,
-                            "is_reporting_entity": True,
-                            "entity_name": reporting_entity.name,
-                            "entity_sector": reporting_entity.sector,
-                            "entity_industry": reporting_entity.industry,
-                            "entity_country": reporting_entity.country,
-                            "entity_ticker": reporting_entity.ticker,
-                            "text": chunk.text,
-                            "other_entities": ", ".join(
-                                e["name"] for e in other_entities
-                            ),
-                            "entities": chunk_entities,
-                        }
-                    )
-            else:
-                # Process standard entities
-                for chunk_entity in chunk_entities:
-                    entity_key = entity_key_map.get(chunk_entity["key"])
-
-                    if not entity_key:
-                        continue  # Skip if entity is not found
-                    
-                    # # if entity isn't in our original watchlist, skip
-                    if companies and entity_key not in companies:
-                        continue
-
-                    # Exclude the entity from other entities
-                    other_entities = [
-                        e for e in chunk_entities if e["name"] != chunk_entity["name"]
-                    ]
-
-                    # Collect information in standard format
-                    rows.append(
-                        {
-                            "timestamp_utc": result.timestamp,
-                            "document_id": result.id,
-                            "sentence_id": f"{result.id}-{chunk.chunk}",
-                            "headline": result.headline,
-                            "entity_id": chunk_entity["key"],
-                            "document_type": document_type.value,
-                            "is_reporting_entity": False,
-                            "entity_name": entity_key.name,
-                            "entity_sector": entity_key.sector,
-                            "entity_industry": entity_key.industry,
-                            "entity_country": entity_key.country,
-                            "entity_ticker": entity_key.ticker,
-                            "text": chunk.text,
-                            "other_entities": ", ".join(
-                                e["name"] for e in other_entities
-                            ),
-                            "entities": chunk_entities,
-                        }
-                    )
+    return build_screener_tables(
+        results, entities, companies=companies, document_type=document_type
+    ).to_frame()
 
-    if not rows:
-        raise ValueError("No rows to process")
 
-    df = DataFrame(rows).sort_values("timestamp_utc").reset_index(drop=True)
-
-    # Deduplicate by quote text as well
-    df = df.drop_duplicates(
-        subset=["timestamp_utc", "document_id", "text", "entity_id"]
-    )
-
-    df = mask_sentences(df)
-    return df.reset_index(drop=True)
-
-
-def mask_sentences(
-    df: DataFrame
-) -> DataFrame:
+def mask_sentences(df: DataFrame, max_workers: Optional[int] = None) -> DataFrame:
     """
     Mask the target entity and other entities in the text.
 
     Args:
         df (DataFrame): The input DataFrame. Columns required:
             - text
-            - masked_text
-        document_type (DocumentType): The document type (for logging only)
+            - entity_id
+            - entities
+        max_workers (Optional[int]): The number of processes to mask very
+            large DataFrames, see `mask_texts`. Defaults to the number of CPUs.
     Returns:
         DataFrame: masked DataFrame. Will add/transform the columns:
             - text
             - masked_text
             - other_entities_map
     """
-    df["text"] = df["text"].str.replace("{", "", regex=False)
-    df["text"] = df["text"].str.replace("}", "", regex=False)
+    df["text"] = df["text"].str.replace("[{}]", "", regex=True)
 
-    df = mask_entity_coordinates(df=df)
+    df = mask_entity_coordinates(df=df, max_workers=max_workers)
 
-    df["masked_text"] = df["masked_text"].apply(
-        lambda x: x.replace("{", "").replace("}", "")
-    )
+    # The texts have no braces left, only the placeholders may have some
+    placeholders = get_target_entity_placeholder() + get_other_entity_placeholder()
+    if "{" in placeholders or "}" in placeholders:
+        df["masked_text"] = df["masked_text"].str.replace("[{}]", "", regex=True)
     df = df[df["masked_text"] != "to_remove"]
-    df["text"] = df["text"].apply(lambda x: x.replace("{", "").replace("}", ""))
     df = df[df.text != "to_remove"]
     return df
 
 
 def mask_entity_coordinates(
     df: DataFrame,
+    max_workers: Optional[int] = None,
 ) -> DataFrame:
     """
     Mask the target entity and other entities in the text.
 
+    The mentions of all the rows are flattened into arrays and masked in one
+    batch with `mask_texts`; other entities are numbered across the rows.
+
     Args:
         df (DataFrame): The input DataFrame
+        max_workers (Optional[int]): The number of processes to mask very
+            large DataFrames, see `mask_texts`. Defaults to the number of CPUs.
     Returns:
         DataFrame: The masked DataFrame
     """
-    i = 1
-    entity_counter = {}
-    df["masked_text"] = None
-    df["other_entities_map"] = None
-
-    # Ensure columns are compatible with string/object assignments
-    df["masked_text"] = df["masked_text"].astype("object")
-    df["other_entities_map"] = df["other_entities_map"].astype("object")
-
-    # Process each row
-    for idx, row in df.iterrows():
-        text = row["text"]
-        entities = sorted(row["entities"], key=lambda x: x["start"], reverse=True)
-        masked_text = text
-
-        # Get target entity coordinates
-        target_start = []
-        target_end = []
-        for entity in entities:
-            if entity["key"] == row["entity_id"]:
-                target_start.append(entity["start"])
-                target_end.append(entity["end"])
-
-        # Apply masking
-        other_entity_map = []
-        for entity in entities:
-            start, end = entity["start"], entity["end"]
-
-            if entity["key"] == row["entity_id"]:
-                # Mask target entity
-                masked_text = f"{masked_text[:start]}{get_target_entity_placeholder()}{masked_text[end:]}"
-
-            elif start not in target_start and end not in target_end:
-                # Mask other entities
-                if entity["key"] not in entity_counter:
-                    entity_counter[entity["key"]] = i
-                    mask = f"{get_other_entity_placeholder()}_{entity_counter[entity['key']]}"
-                    masked_text = f"{masked_text[:start]}{mask}{masked_text[end:]}"
-                    other_entity_map.append(
-                        (entity_counter[entity["key"]], entity["name"])
-                    )
-                    i += 1
-                else:
-                    mask = f"{get_other_entity_placeholder()}_{entity_counter[entity['key']]}"
-                    masked_text = f"{masked_text[:start]}{mask}{masked_text[end:]}"
-                    other_entity_map.append(
-                        (entity_counter[entity["key"]], entity["name"])
-                    )
+    entities = df["entities"].tolist()
+    mentions = [entity for row_entities in entities for entity in row_entities]
+    offsets = np.zeros(len(entities) + 1, dtype=np.int64)
+    np.cumsum([len(row_entities) for row_entities in entities], out=offsets[1:])
+
+    keys = np.empty(len(mentions), dtype=object)
+    keys[:] = [entity["key"] for entity in mentions]
+    names = np.empty(len(mentions), dtype=object)
+    names[:] = [entity["name"] for entity in mentions]
+    targets = keys == np.repeat(
+        df["entity_id"].to_numpy(dtype=object), np.diff(offsets)
+    )
 
-        # Update DataFrame
-        df.at[idx, "masked_text"] = masked_text
-        df.at[idx, "other_entities_map"] = (
-            other_entity_map if other_entity_map else None
-        )
+    masked_text, other_entities_map = mask_texts(
+        df["text"].tolist(),
+        offsets,
+        np.fromiter((entity["start"] for entity in mentions), np.int64, len(mentions)),
+        np.fromiter((entity["end"] for entity in mentions), np.int64, len(mentions)),
+        keys,
+        targets,
+        names,
+        max_workers=max_workers,
+    )
+
+    # Update DataFrame
+    df["masked_text"] = Series(masked_text, index=df.index, dtype="object")
+    df["other_entities_map"] = Series(
+        other_entities_map, index=df.index, dtype="object"
+    )
 
     return df
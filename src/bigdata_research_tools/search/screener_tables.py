@@ -0,0 +1,382 @@
+"""
+Module for storing the screening results in normalized tables.
+
+The screening DataFrame of `search_by_companies` has one row per chunk and
+entity, and every row repeats the text, the headline and the list of the
+entities mentioned in its chunk: a chunk that mentions five companies is
+stored five times, along with a masked copy of its text per row.
+`ScreenerTables` stores each chunk, each entity mention and each entity
+once, in tables joined by integer ids, and each row as a pair of ids.
+`ScreenerTables.to_frame` masks the texts and builds the wide DataFrame
+when it is needed.
+"""
+
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from bigdata_client.document import Document
+from bigdata_client.models.advanced_search_query import ListQueryComponent
+from bigdata_client.models.entities import Company
+from bigdata_client.models.search import DocumentType
+from pandas import DataFrame, Series
+
+from bigdata_research_tools.prompts.labeler import (
+    get_other_entity_placeholder,
+    get_target_entity_placeholder,
+)
+from bigdata_research_tools.search.chunk_table import ChunkTable
+from bigdata_research_tools.search.entity_index import EntityIndex, EntityJoin
+from bigdata_research_tools.search.masking import mask_texts
+
+# Columns of the screening DataFrame taken from the entity table
+ENTITY_COLUMNS = {
+    "entity_id": "key",
+    "entity_name": "name",
+    "entity_sector": "sector",
+    "entity_industry": "industry",
+    "entity_country": "country",
+    "entity_ticker": "ticker",
+}
+
+class ScreenerTables:
+    """
+    Normalized screening results.
+
+    Args:
+        chunks (DataFrame): One row per chunk, indexed by chunk id, with the
+            columns timestamp_utc, document_id, sentence_id, headline and text.
+        entities (DataFrame): One row per entity, indexed by entity id, with
+            the columns of `ENTITY_COLUMNS`.
+        mentions (DataFrame): One row per entity mention, grouped by chunk in
+            text order, with the columns chunk, entity, start and end.
+        rows (DataFrame): One row per row of the screening DataFrame, in
+            order, with the columns chunk, entity and is_reporting_entity.
+        document_type (str): The type of the documents.
+    """
+
+    def __init__(
+        self,
+        chunks: DataFrame,
+        entities: DataFrame,
+        mentions: DataFrame,
+        rows: DataFrame,
+        document_type: str,
+    ):
+        self.chunks = chunks
+        self.entities = entities
+        self.mentions = mentions
+        self.rows = rows
+        self.document_type = document_type
+
+    def __len__(self) -> int:
+        """The number of rows."""
+        return len(self.rows)
+
+    def memory_usage(self) -> int:
+        """Memory used by the tables, including their strings, in bytes."""
+        return sum(
+            int(table.memory_usage(deep=True).sum())
+            for table in (self.chunks, self.entities, self.mentions, self.rows)
+        )
+
+    def chunk_entities(self) -> List[List[dict]]:
+        """
+        The entities mentioned in each chunk.
+
+        Returns:
+            List[List[dict]]: The key, name, ticker, start and end of each
+                mention of each chunk, in chunk id order.
+        """
+        entity = self.mentions["entity"].to_numpy()
+        records = [
+            {"key": key, "name": name, "ticker": ticker, "start": start, "end": end}
+            for key, name, ticker, start, end in zip(
+                self.entities["entity_id"].to_numpy()[entity].tolist(),
+                self.entities["entity_name"].to_numpy()[entity].tolist(),
+                self.entities["entity_ticker"].to_numpy()[entity].tolist(),
+                self.mentions["start"].tolist(),
+                self.mentions["end"].tolist(),
+            )
+        ]
+        offsets = np.zeros(len(self.chunks) + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(self.mentions["chunk"], minlength=len(self.chunks)),
+            out=offsets[1:],
+        )
+        offsets = offsets.tolist()
+        return [records[first:last] for first, last in zip(offsets[:-1], offsets[1:])]
+
+    def mask(
+        self, max_workers: Optional[int] = None
+    ) -> Tuple[List[str], List[Optional[List[Tuple[int, str]]]]]:
+        """
+        Mask the target entity and the other entities in the text of each row.
+
+        Args:
+            max_workers (Optional[int]): The number of processes to mask very
+                large screens, see `mask_texts`.
+        Returns:
+            Tuple[List[str], List[Optional[List[Tuple[int, str]]]]]: The masked
+                text and the other entities map of each row, with the other
+                entities numbered across the rows, as in `mask_sentences`.
+        """
+        chunk = self.rows["chunk"].to_numpy()
+        entity = self.rows["entity"].to_numpy()
+        mention_entity = self.mentions["entity"].to_numpy()
+        mention_counts = np.bincount(self.mentions["chunk"], minlength=len(self.chunks))
+        offsets = np.concatenate(([0], np.cumsum(mention_counts)))
+
+        # The mentions of the chunk of each row
+        row_counts = mention_counts[chunk]
+        row_mention = _ranges(offsets[chunk], row_counts)
+        texts = self.chunks["text"].tolist()
+        masked_text, other_entities_map = mask_texts(
+            [texts[row_chunk] for row_chunk in chunk.tolist()],
+            np.concatenate(([0], np.cumsum(row_counts))),
+            self.mentions["start"].to_numpy()[row_mention],
+            self.mentions["end"].to_numpy()[row_mention],
+            mention_entity[row_mention],
+            mention_entity[row_mention] == np.repeat(entity, row_counts),
+            self.entities["entity_name"].to_numpy()[mention_entity[row_mention]],
+            max_workers=max_workers,
+        )
+
+        # The texts have no braces left, only the placeholders may have some
+        placeholders = get_target_entity_placeholder() + get_other_entity_placeholder()
+        if "{" in placeholders or "}" in placeholders:
+            masked_text = [
+                text.replace("{", "").replace("}", "") for text in masked_text
+            ]
+        return masked_text, other_entities_map
+
+    def to_frame(self, max_workers: Optional[int] = None) -> DataFrame:
+        """
+        Build the wide screening DataFrame.
+
+        Args:
+            max_workers (Optional[int]): The number of processes to mask very
+                large screens, see `mask_texts`.
+        Returns:
+            DataFrame: The DataFrame of `process_screener_search_results`,
+                with the columns of `search_by_companies`.
+        """
+        chunk = self.rows["chunk"].to_numpy()
+        entity = self.rows["entity"].to_numpy()
+
+        def take(table: DataFrame, column: str, ids: np.ndarray) -> Series:
+            return table[column].take(ids).reset_index(drop=True)
+
+        chunk_entities = self.chunk_entities()
+        names = take(self.entities, "entity_name", entity).tolist()
+        # The names of the other entities of the chunk, excluding the row entity
+        other_entities = {}
+        for row_chunk, name in zip(chunk.tolist(), names):
+            if (row_chunk, name) not in other_entities:
+                other_entities[(row_chunk, name)] = ", ".join(
+                    e["name"] for e in chunk_entities[row_chunk] if e["name"] != name
+                )
+        masked_text, other_entities_map = self.mask(max_workers)
+
+        columns = {
+            column: take(self.chunks, column, chunk)
+            for column in ("timestamp_utc", "document_id", "sentence_id", "headline")
+        }
+        columns["entity_id"] = take(self.entities, "entity_id", entity)
+        columns["document_type"] = self.document_type
+        columns["is_reporting_entity"] = self.rows["is_reporting_entity"].to_numpy()
+        for column in list(ENTITY_COLUMNS)[1:]:
+            columns[column] = take(self.entities, column, entity)
+        columns["text"] = take(self.chunks, "text", chunk)
+        columns["other_entities"] = [
+            other_entities[(row_chunk, name)]
+            for row_chunk, name in zip(chunk.tolist(), names)
+        ]
+        columns["entities"] = Series(
+            [chunk_entities[row_chunk] for row_chunk in chunk.tolist()], dtype=object
+        )
+        columns["masked_text"] = masked_text
+        columns["other_entities_map"] = Series(other_entities_map, dtype=object)
+        df = DataFrame(columns)
+
+        df = df[(df["masked_text"] != "to_remove") & (df["text"] != "to_remove")]
+        return df.reset_index(drop=True)
+
+
+def build_screener_tables(
+    results: Union[List[Document], ChunkTable],
+    entities: Union[List[ListQueryComponent], EntityIndex],
+    companies: Optional[List[Company]] = None,
+    document_type: DocumentType = DocumentType.NEWS,
+) -> ScreenerTables:
+    """
+    Build the normalized screening results of a set of search results.
+
+    The rows are those of `process_screener_search_results`, in the same
+    order: sorted by timestamp and without duplicates. Their texts are only
+    masked by `ScreenerTables.to_frame`.
+
+    Args:
+        results (Union[List[Document], ChunkTable]): A list of Bigdata search results,
+            or a `ChunkTable` of them.
+        entities (Union[List[ListQueryComponent], EntityIndex]): A list of entities,
+            or an `EntityIndex` of them.
+        companies (Optional[List[Company]]): A list of companies to filter for,
+            by id. Only used for non-reporting entity documents.
+        document_type (DocumentType): The type of documents being processed.
+    Returns:
+        ScreenerTables: The normalized screening results.
+    Raises:
+        ValueError: If no chunk mentions an entity to screen.
+    """
+    if not isinstance(results, ChunkTable):
+        results = ChunkTable.from_documents(results)
+    if not isinstance(entities, EntityIndex):
+        entities = EntityIndex(entities)
+    mentions = entities.join(results)
+
+    row_chunk, row_entity = _select_rows(
+        results, entities, mentions, companies, document_type
+    )
+    if not len(row_chunk):
+        raise ValueError("No rows to process")
+
+    # Sort by timestamp, then drop the rows of the same entity in the same
+    # text of the same document, as the wide DataFrame always has
+    row_document = results.chunk_document[row_chunk]
+    kept = (
+        DataFrame(
+            {
+                "timestamp_utc": results.timestamps[row_document].tolist(),
+                "document_id": pd.factorize(results.document_ids)[0][row_document],
+                "text": pd.factorize(results.texts)[0][row_chunk],
+                "entity_id": row_entity,
+            }
+        )
+        .sort_values("timestamp_utc")
+        .drop_duplicates(subset=["timestamp_utc", "document_id", "text", "entity_id"])
+        .index.to_numpy()
+    )
+    row_entity = row_entity[kept]
+    # Renumber the chunks of the rows in table order
+    used, row_chunk = np.unique(row_chunk[kept], return_inverse=True)
+    row_chunk = row_chunk.reshape(-1)
+
+    document = results.chunk_document[used]
+    document_ids = results.document_ids[document].tolist()
+    texts = [
+        text.replace("{", "").replace("}", "") for text in results.texts[used].tolist()
+    ]
+    chunks = DataFrame(
+        {
+            "timestamp_utc": results.timestamps[document].tolist(),
+            "document_id": document_ids,
+            "sentence_id": [
+                f"{document_id}-{index}"
+                for document_id, index in zip(
+                    document_ids, results.chunk_index[used].tolist()
+                )
+            ],
+            "headline": results.headlines[document].tolist(),
+            "text": texts,
+        }
+    )
+
+    mention_counts = np.diff(mentions.chunk_offsets)[used]
+    mention = _ranges(mentions.chunk_offsets[used], mention_counts)
+    mention_entity = mentions.rows[mention]
+    mention_table = DataFrame(
+        {
+            "chunk": np.repeat(np.arange(len(used), dtype=np.int32), mention_counts),
+            "entity": mention_entity.astype(np.int32),
+            "start": mentions.start[mention],
+            "end": mentions.end[mention],
+        }
+    )
+
+    rows = DataFrame(
+        {
+            "chunk": row_chunk.astype(np.int32),
+            "entity": row_entity.astype(np.int32),
+            "is_reporting_entity": document_type
+            in (DocumentType.FILINGS, DocumentType.TRANSCRIPTS),
+        }
+    )
+
+    entity_table = DataFrame(
+        {
+            column: entities.keys if attribute == "key" else entities.columns[attribute]
+            for column, attribute in ENTITY_COLUMNS.items()
+        }
+    )
+    return ScreenerTables(
+        chunks, entity_table, mention_table, rows, document_type.value
+    )
+
+
+def _select_rows(
+    results: ChunkTable,
+    entities: EntityIndex,
+    mentions: EntityJoin,
+    companies: Optional[List[Company]],
+    document_type: DocumentType,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Select the chunk and entity of the rows of the screening DataFrame.
+
+    The rows are those of the chunks with at least one indexed entity, either
+    for each reporting entity of the document (filings and transcripts) or
+    for each mention of an entity of `companies` (other document types), in
+    table order.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The chunk of each row, and the row of its
+            entity in `entities`.
+    """
+    mention_counts = np.diff(mentions.chunk_offsets)
+
+    if document_type in (DocumentType.FILINGS, DocumentType.TRANSCRIPTS):
+        # One row per indexed reporting entity of the document of each chunk
+        # with entities
+        reporting = [
+            [row for row in entities.lookup(keys).tolist() if row >= 0]
+            for keys in results.reporting_entities.tolist()
+        ]
+        reporting_counts = np.array([len(rows) for rows in reporting], dtype=np.int64)
+        reporting_offsets = np.concatenate(([0], np.cumsum(reporting_counts)))
+        reporting_rows = np.fromiter(
+            (row for rows in reporting for row in rows),
+            dtype=np.int64,
+            count=reporting_offsets[-1],
+        )
+        counts = np.where(
+            mention_counts > 0, reporting_counts[results.chunk_document], 0
+        )
+        row_chunk = np.repeat(np.arange(len(results), dtype=np.int64), counts)
+        row_entity = reporting_rows[
+            _ranges(reporting_offsets[results.chunk_document], counts)
+        ]
+        return row_chunk, row_entity
+
+    # One row per mention of an entity of the universe
+    row_chunk = np.repeat(np.arange(len(results), dtype=np.int64), mention_counts)
+    row_entity = mentions.rows
+    if companies:
+        universe = {company.id for company in companies}
+        in_universe = np.fromiter(
+            (key in universe for key in entities.keys.tolist()),
+            dtype=bool,
+            count=len(entities),
+        )
+        kept = in_universe[row_entity]
+        row_chunk, row_entity = row_chunk[kept], row_entity[kept]
+    return row_chunk, row_entity
+
+
+def _ranges(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Concatenate the ranges `starts[i]:starts[i] + counts[i]`."""
+    counts = np.asarray(counts, dtype=np.int64)
+    first = np.cumsum(counts) - counts
+    return np.repeat(np.asarray(starts, dtype=np.int64) - first, counts) + np.arange(
+        counts.sum(), dtype=np.int64
+    )
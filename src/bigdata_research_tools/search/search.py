@@ -2,17 +2,29 @@
 Module for executing concurrent and rate-limited searches via
 the Bigdata client.
 
-This module defines a `RateLimitedSearchManager` class to manage multiple
-search requests efficiently while respecting request-per-minute (RPM) limits
-of the Bigdata API.
+This module defines a `SearchManager` class to manage multiple search
+requests efficiently while respecting request-per-minute (RPM) limits
+of the Bigdata API, and an `AsyncSearchManager` counterpart that drives
+the searches from a single asyncio event loop.
 """
 
+import asyncio
 import itertools
 import logging
-import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Dict, List, Optional, Tuple, Union
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import partial
+from typing import (
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sized,
+    Tuple,
+    Union,
+)
 
 from bigdata_client import Bigdata
 from bigdata_client.daterange import AbsoluteDateRange, RollingDateRange
@@ -21,7 +33,26 @@ from bigdata_client.models.advanced_search_query import QueryComponent
 from bigdata_client.models.search import DocumentType, SortBy
 from tqdm import tqdm
 
-from bigdata_research_tools.client import bigdata_connection, init_bigdata_client
+from bigdata_research_tools.client import bigdata_connection
+from bigdata_research_tools.search.cache import SearchCache, create_search_cache
+from bigdata_research_tools.search.chunk_table import ChunkTable, ChunkTableBuilder
+from bigdata_research_tools.search.concurrency import (
+    MAX_ADAPTIVE_WORKERS,
+    AdaptiveConcurrency,
+)
+from bigdata_research_tools.search.fingerprint import date_range_key, search_fingerprint
+from bigdata_research_tools.search.journal import SearchJournal
+from bigdata_research_tools.search.rate_limiter import (
+    REQUESTS_PER_MINUTE_LIMIT,
+    RateLimiter,
+    create_rate_limiter,
+    get_shared_rate_limiter,
+)
+from bigdata_research_tools.search.retry import (
+    FailedQuery,
+    RetryPolicy,
+    is_retryable_error,
+)
 from bigdata_research_tools.tracing import Trace, TraceEventNames, send_trace
 
 DATE_RANGE_TYPE = Union[
@@ -32,9 +63,27 @@ DATE_RANGE_TYPE = Union[
 SEARCH_QUERY_RESULTS_TYPE = Dict[
     Tuple[QueryComponent, Union[AbsoluteDateRange, RollingDateRange]], List[Document]
 ]
+SEARCH_QUERY_RESULT_TYPE = Tuple[
+    QueryComponent, Union[AbsoluteDateRange, RollingDateRange], Optional[List[Document]]
+]
 
-REQUESTS_PER_MINUTE_LIMIT = 300
 MAX_WORKERS = 4
+MAX_CONCURRENT_REQUESTS = 100
+# Keyword arguments of the search managers, as opposed to those of their searches
+MANAGER_ARGUMENTS = frozenset(
+    {
+        "rpm",
+        "bucket_size",
+        "bigdata",
+        "bigdata_client",
+        "max_concurrency",
+        "rate_limiter",
+        "cache",
+        "retry_policy",
+        "concurrency",
+        "journal",
+    }
+)
 
 
 class SearchManager:
@@ -42,48 +91,69 @@ class SearchManager:
     Rate-limited search executor for managing concurrent searches via
     the Bigdata SDK.
 
-    This class implements a token bucket algorithm for rate limiting and
+    Rate limiting is delegated to a `RateLimiter` (a token bucket), which
     provides thread-safe access to the search functionality.
     """
 
     def __init__(
         self,
-        rpm: int = REQUESTS_PER_MINUTE_LIMIT,
-        bucket_size: int = None,
+        rpm: Optional[int] = None,
+        bucket_size: Optional[int] = None,
         bigdata: Bigdata = None,
+        rate_limiter: RateLimiter = None,
+        cache: SearchCache = None,
+        retry_policy: RetryPolicy = None,
+        concurrency: AdaptiveConcurrency = None,
+        journal: SearchJournal = None,
         **kwargs,
     ):
         """
         Initialize the rate-limited search manager.
 
         :param rpm:
-            Queries per minute limit. Defaults to 300.
+            Queries per minute limit of a rate limiter of its own. Defaults to
+            None (the shared rate limiter, which allows 300).
         :param bucket_size:
-            Size of the token bucket. Defaults to the value of `rpm`.
+            Size of the token bucket of a rate limiter of its own. Defaults to
+            the value of `rpm`.
         :param bigdata:
             The Bigdata SDK client instance used for executing searches.
-            Defaults to None (uses the library default client).
-        """
-        self.bigdata = bigdata or init_bigdata_client()
-        self.rpm = rpm
-        self.bucket_size = bucket_size or rpm
-        self.tokens = self.bucket_size
-        self.last_refill = time.time()
-        self._lock = threading.Lock()
-
-    def _refill_tokens(self):
+            Can also be passed as `bigdata_client`, as the workflows do.
+            Defaults to None (uses the shared client, see
+            `bigdata_connection`).
+        :param rate_limiter:
+            The rate limiter to draw tokens from. Pass the same instance to
+            several managers, or a `FileRateLimiter` to several processes,
+            to share one budget. Defaults to `get_shared_rate_limiter()`,
+            the budget shared with the other managers and the entity
+            resolver of the process, or to `create_rate_limiter(rpm,
+            bucket_size)` if `rpm` or `bucket_size` is given.
+        :param cache:
+            Optional on-disk cache of search results. Searches found in the
+            cache are answered without a request or a rate limit token.
+            Defaults to `create_search_cache()`, i.e. no caching unless the
+            environment variable `BIGDATA_SEARCH_CACHE_PATH` is set.
+        :param retry_policy:
+            How transient errors are retried. Searches that still fail are
+            recorded in `failed_queries`. Defaults to `RetryPolicy()`.
+        :param concurrency:
+            Optional controller that adapts the number of searches in flight
+            to the observed latency and throttling, up to its
+            `max_concurrency`. Defaults to None (fixed concurrency).
+        :param journal:
+            Optional journal of completed searches. Searches found in it are
+            skipped, and every completed search is appended to it, so an
+            interrupted run can be resumed. Defaults to None.
         """
-        Refill tokens based on elapsed time since the last refill.
-        Tokens are replenished at a rate proportional to the RPM limit.
-        """
-        now = time.time()
-        elapsed = now - self.last_refill
-        new_tokens = int(elapsed * (self.rpm / 60.0))
-
-        if new_tokens > 0:
-            with self._lock:
-                self.tokens = min(self.bucket_size, self.tokens + new_tokens)
-                self.last_refill = now
+        self.bigdata = bigdata or kwargs.get("bigdata_client") or bigdata_connection()
+        self.rate_limiter = rate_limiter or _default_rate_limiter(rpm, bucket_size)
+        self.rpm = self.rate_limiter.rpm
+        self.bucket_size = self.rate_limiter.bucket_size
+        self.cache = cache if cache is not None else create_search_cache()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.failed_queries: List[FailedQuery] = []
+        self.concurrency = concurrency
+        self.journal = journal
 
     def _acquire_token(self, timeout: float = None) -> bool:
         """
@@ -95,19 +165,7 @@ class SearchManager:
         :return:
             True if a token is acquired, False if timed out.
         """
-        start = time.time()
-        while True:
-            self._refill_tokens()
-
-            with self._lock:
-                if self.tokens > 0:
-                    self.tokens -= 1
-                    return True
-
-            if timeout and (time.time() - start) > timeout:
-                return False
-
-            time.sleep(0.1)  # Prevent tight looping
+        return self.rate_limiter.acquire(timeout)
 
     def _search(
         self,
@@ -143,28 +201,80 @@ class SearchManager:
         :return:
             A list of search results.
         """
-        if not self._acquire_token(timeout):
-            logging.warning("Timed out attempting to acquire rate limit token")
-            return None
+        search_key = None
+        if self.cache is not None or self.journal is not None:
+            search_key = search_fingerprint(
+                query, date_range, scope, sortby, limit, rerank_threshold
+            )
+            stored = _get_stored_results(
+                self.cache, self.journal, search_key, kwargs.get("current_trace")
+            )
+            if stored is not None:
+                return stored
 
+        search_date_range = date_range
         if isinstance(date_range, tuple):
-            date_range = AbsoluteDateRange(*date_range)
+            search_date_range = AbsoluteDateRange(*date_range)
 
-        try:
-            query_obj = self.bigdata.search.new(
-                query=query,
-                date_range=date_range,
-                sortby=sortby,
-                scope=scope,
-                rerank_threshold=rerank_threshold,
-            )
-            results = query_obj.run(limit=limit)
-            if kwargs.get("current_trace"):
-                kwargs["current_trace"].add_query_units(query_obj.get_usage())
+        for attempt in itertools.count(1):
+            if not self._acquire_token(timeout):
+                error = "Timed out attempting to acquire rate limit token"
+                logging.warning(error)
+                self.failed_queries.append(
+                    FailedQuery(
+                        query=query,
+                        date_range=date_range,
+                        sortby=sortby,
+                        scope=scope,
+                        limit=limit,
+                        rerank_threshold=rerank_threshold,
+                        error=error,
+                        attempts=attempt,
+                    )
+                )
+                return None
+
+            started_at = time.monotonic()
+            try:
+                results = _run_bigdata_search(
+                    self.bigdata,
+                    query=query,
+                    date_range=search_date_range,
+                    sortby=sortby,
+                    scope=scope,
+                    limit=limit,
+                    rerank_threshold=rerank_threshold,
+                    current_trace=kwargs.get("current_trace"),
+                )
+            except Exception as e:
+                retryable = is_retryable_error(e)
+                if retryable and self.concurrency is not None:
+                    self.concurrency.record_failure()
+                if attempt <= self.retry_policy.max_retries and retryable:
+                    delay = self.retry_policy.get_delay(attempt - 1)
+                    logging.warning(f"Search error: {e}. Retrying in {delay:.1f}s...")
+                    time.sleep(delay)
+                    continue
+                logging.error(f"Search error: {e}")
+                self.failed_queries.append(
+                    FailedQuery(
+                        query=query,
+                        date_range=date_range,
+                        sortby=sortby,
+                        scope=scope,
+                        limit=limit,
+                        rerank_threshold=rerank_threshold,
+                        error=str(e),
+                        attempts=attempt,
+                    )
+                )
+                return None
+
+            if self.concurrency is not None:
+                self.concurrency.record_success(time.monotonic() - started_at)
+            if search_key is not None:
+                _store_results(self.cache, self.journal, search_key, results)
             return results
-        except Exception as e:
-            logging.error(f"Search error: {e}")
-            return None
 
     def concurrent_search(
         self,
@@ -207,122 +317,1365 @@ class SearchManager:
             A mapping of the tuple of search query and date range
             to the list of the corresponding search results.
         """
+        queries = list(queries)
         results = {}
+        for query, date_range, documents in tqdm(
+            self.iter_search(
+                queries=queries,
+                date_ranges=date_ranges,
+                sortby=sortby,
+                scope=scope,
+                limit=limit,
+                max_workers=max_workers,
+                timeout=timeout,
+                rerank_threshold=rerank_threshold,
+                **kwargs,
+            ),
+            total=len(queries) * len(date_ranges),
+            desc="Querying Bigdata...",
+        ):
+            results[(query, date_range)] = documents
+
+        return _order_by_grid(results, queries, date_ranges)
+
+    def chunk_table_search(
+        self,
+        queries: Iterable[QueryComponent],
+        date_ranges: DATE_RANGE_TYPE = None,
+        sortby: SortBy = SortBy.RELEVANCE,
+        scope: DocumentType = DocumentType.ALL,
+        limit: int = 10,
+        max_workers: int = MAX_WORKERS,
+        timeout: float = None,
+        rerank_threshold: float = None,
+        **kwargs,
+    ) -> ChunkTable:
+        """
+        Execute multiple searches concurrently, like `concurrent_search`, and
+        collect the results into a `ChunkTable` as each search completes, so
+        that the documents are released as soon as they are ingested.
+        Documents follow the order of the query x date range grid. Chunks
+        returned by several searches are stored once, with the queries that
+        matched them (see `ChunkTable.chunk_queries`).
+
+        The queries are drawn lazily as searches are submitted, so they can
+        be a generator, e.g. `iter_batched_query`, and the grid is never
+        held in memory.
+
+        :param queries:
+            An iterable of QueryComponent objects.
+        :param date_ranges:
+            Date range filter for all searches.
+        :param sortby:
+            The sorting criterion for the search results.
+            Defaults to SortBy.RELEVANCE.
+        :param scope:
+            The scope of the documents to include.
+            Defaults to DocumentType.ALL.
+        :param limit:
+            The maximum number of documents to return per query.
+            Defaults to 10.
+        :param max_workers:
+            The maximum number of concurrent threads.
+            Defaults to MAX_WORKERS.
+        :param timeout:
+            The maximum time (in seconds) to wait for a token
+            per request.
+        :param rerank_threshold:
+            Enable the cross-encoder by setting value between [0,1]
+        :return:
+            The chunks of all the search results.
+        """
+        builder = ChunkTableBuilder()
+        positions = _GridPositions(queries, date_ranges)
+        for query, date_range, documents in tqdm(
+            self.iter_search(
+                queries=positions,
+                date_ranges=date_ranges,
+                sortby=sortby,
+                scope=scope,
+                limit=limit,
+                max_workers=max_workers,
+                timeout=timeout,
+                rerank_threshold=rerank_threshold,
+                **kwargs,
+            ),
+            total=positions.total,
+            desc="Querying Bigdata...",
+        ):
+            builder.add(documents, positions.pop(query, date_range), query)
+
+        logging.debug(f"Skipped {builder.duplicates} duplicate chunks")
+        return builder.build()
+
+    def replay(
+        self,
+        failed_queries: List[FailedQuery],
+        max_workers: int = MAX_WORKERS,
+        timeout: float = None,
+        **kwargs,
+    ) -> SEARCH_QUERY_RESULTS_TYPE:
+        """
+        Re-run searches that previously failed, each with its own parameters.
+
+        Searches that fail again are recorded in `failed_queries` of this
+        manager.
+
+        :param failed_queries:
+            The failed searches, e.g. the `failed_queries` of a previous run.
+        :param max_workers:
+            The maximum number of concurrent threads.
+            Defaults to MAX_WORKERS.
+        :param timeout:
+            The maximum time (in seconds) to wait for a token per search.
+        :return:
+            A mapping of the tuple of search query and date range to
+            the list of the corresponding search results.
+        """
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = {
+            futures = [
                 executor.submit(
                     self._search,
-                    query=query,
-                    date_range=date_range,
-                    sortby=sortby,
-                    scope=scope,
-                    limit=limit,
+                    query=failed.query,
+                    date_range=failed.date_range,
+                    sortby=failed.sortby,
+                    scope=failed.scope,
+                    limit=failed.limit,
                     timeout=timeout,
-                    rerank_threshold=rerank_threshold,
+                    rerank_threshold=failed.rerank_threshold,
                     **kwargs,
-                ): (query, date_range)
-                for query, date_range in itertools.product(queries, date_ranges)
+                )
+                for failed in failed_queries
+            ]
+            return {
+                (failed.query, failed.date_range): future.result()
+                for failed, future in zip(failed_queries, futures)
             }
 
-            for future in tqdm(
-                as_completed(futures), total=len(futures), desc="Querying Bigdata..."
-            ):
-                query, date_range = futures[future]
-                try:
-                    results[(query, date_range)] = future.result()
-                except Exception as e:
-                    logging.error(f"Error in search {query, date_range}: {e}")
+    def iter_search(
+        self,
+        queries: Iterable[QueryComponent],
+        date_ranges: DATE_RANGE_TYPE = None,
+        sortby: SortBy = SortBy.RELEVANCE,
+        scope: DocumentType = DocumentType.ALL,
+        limit: int = 10,
+        max_workers: int = MAX_WORKERS,
+        timeout: float = None,
+        rerank_threshold: float = None,
+        max_pending: int = None,
+        **kwargs,
+    ) -> Iterator[SEARCH_QUERY_RESULT_TYPE]:
+        """
+        Execute multiple searches concurrently while respecting rate limits,
+        yielding each result as soon as its search completes.
 
-        return results
+        At most `max_pending` searches are submitted but not yet consumed,
+        so a slow consumer throttles the searches instead of accumulating
+        results in memory. Closing the generator early cancels the searches
+        that have not started yet.
 
+        :param queries:
+            An iterable of QueryComponent objects.
+        :param date_ranges:
+            Date range filter for all searches.
+        :param sortby:
+            The sorting criterion for the search results.
+            Defaults to SortBy.RELEVANCE.
+        :param scope:
+            The scope of the documents to include.
+            Defaults to DocumentType.ALL.
+        :param limit:
+            The maximum number of documents to return per query.
+            Defaults to 10.
+        :param max_workers:
+            The maximum number of concurrent threads. Ignored if the
+            manager has a `concurrency` controller, whose limit is used
+            instead. Defaults to MAX_WORKERS.
+        :param timeout:
+            The maximum time (in seconds) to wait for a token
+            per request.
+        :param rerank_threshold:
+            Enable the cross-encoder by setting value between [0,1]
+        :param max_pending:
+            The maximum number of searches submitted and not yet consumed.
+            Defaults to twice `max_workers`. Ignored if the manager has a
+            `concurrency` controller.
+        :return:
+            A generator of tuples of search query, date range and the list
+            of the corresponding search results (None if the search failed),
+            in completion order.
+        """
+        cells = ((query, date_range) for query in queries for date_range in date_ranges)
+        yield from self.iter_cells(
+            cells,
+            sortby=sortby,
+            scope=scope,
+            limit=limit,
+            max_workers=max_workers,
+            timeout=timeout,
+            rerank_threshold=rerank_threshold,
+            max_pending=max_pending,
+            **kwargs,
+        )
 
-def normalize_date_range(date_ranges: DATE_RANGE_TYPE) -> DATE_RANGE_TYPE:
-    if not isinstance(date_ranges, list):
-        date_ranges = [date_ranges]
+    def iter_cells(
+        self,
+        cells: Iterable[
+            Tuple[QueryComponent, Union[AbsoluteDateRange, RollingDateRange]]
+        ],
+        sortby: SortBy = SortBy.RELEVANCE,
+        scope: DocumentType = DocumentType.ALL,
+        limit: int = 10,
+        max_workers: int = MAX_WORKERS,
+        timeout: float = None,
+        rerank_threshold: float = None,
+        max_pending: int = None,
+        **kwargs,
+    ) -> Iterator[SEARCH_QUERY_RESULT_TYPE]:
+        """
+        Execute searches for arbitrary pairs of query and date range, which
+        need not form a grid, yielding each result as soon as its search
+        completes. See `iter_search` for the other parameters.
 
-    # Convert mutable AbsoluteDateRange into hashable objects
-    for i, dr in enumerate(date_ranges):
-        if isinstance(dr, AbsoluteDateRange):
-            date_ranges[i] = (dr.start_dt.strftime("%Y-%m-%d %H:%M:%S"), dr.end_dt.strftime("%Y-%m-%d %H:%M:%S"))
-    return date_ranges
+        :param cells:
+            An iterable of tuples of search query and date range.
+        :return:
+            A generator of tuples of search query, date range and the list
+            of the corresponding search results (None if the search failed),
+            in completion order.
+        """
+        max_pending = max_pending or 2 * max_workers
+        if self.concurrency is not None:
+            max_workers = self.concurrency.max_concurrency
+        cells = iter(cells)
 
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = {}
 
-def run_search(
-    queries: List[QueryComponent],
-    date_ranges: DATE_RANGE_TYPE = None,
-    sortby: SortBy = SortBy.RELEVANCE,
-    scope: DocumentType = DocumentType.ALL,
-    limit: int = 10,
-    only_results: bool = True,
-    rerank_threshold: float = None,
-    **kwargs,
-) -> Union[SEARCH_QUERY_RESULTS_TYPE, list[list[Document]]]:
-    """
-    Execute multiple searches concurrently using the Bigdata client, with rate limiting.
+            def window():
+                if self.concurrency is not None:
+                    return self.concurrency.limit
+                return max_pending
 
-    Args:
-        queries (list[QueryComponent]): A list of QueryComponent objects.
-        date_ranges (Optional[Union[AbsoluteDateRange, RollingDateRange, List[Union[AbsoluteDateRange, RollingDateRange]]]]):
-            Date range filter for the search results.
-        sortby (SortBy): The sorting criterion for the search results. Defaults to SortBy.RELEVANCE.
-        scope (DocumentType): The scope of the documents to include. Defaults to DocumentType.ALL.
-        limit (int): The maximum number of documents to return per query. Defaults to 10.
-        only_results (bool): If True, return only the search results.
-            If False, return the queries along with the results.
-            Defaults to True.
-        rerank_threshold (Optional[float]): The threshold for reranking the search results.
-            See https://sdk.bigdata.com/en/latest/how_to_guides/rerank_search.html.
-    Returns:
-        Union[Dict[Tuple[QueryComponent, Union[AbsoluteDateRange, RollingDateRange]], List[Document]], list[list[Document]], list[dict]]:
-        If `only_results` is True, returns the list of search results.
+            def submit(cells_to_submit):
+                for query, date_range in cells_to_submit:
+                    future = executor.submit(
+                        self._search,
+                        query=query,
+                        date_range=date_range,
+                        sortby=sortby,
+                        scope=scope,
+                        limit=limit,
+                        timeout=timeout,
+                        rerank_threshold=rerank_threshold,
+                        **kwargs,
+                    )
+                    pending[future] = (query, date_range)
 
-        If `only_results` is False, returns a mapping of the tuple of search query and date range to
-        the list of the corresponding search results.
+            try:
+                submit(itertools.islice(cells, window()))
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        query, date_range = pending.pop(future)
+                        try:
+                            documents = future.result()
+                        except Exception as e:
+                            logging.error(f"Error in search {query, date_range}: {e}")
+                            documents = None
+                        yield query, date_range, documents
+                        submit(itertools.islice(cells, max(0, window() - len(pending))))
+            finally:
+                for future in pending:
+                    future.cancel()
+
+
+class AsyncSearchManager:
     """
-    date_ranges = normalize_date_range(date_ranges)
-    date_ranges.sort(key=lambda x: x[0])
+    Asyncio-native rate-limited search executor for the Bigdata SDK.
 
-    if not kwargs.get("current_trace"):
-        start_date = date_ranges[0][0] if date_ranges else None
-        end_date = date_ranges[-1][1] if date_ranges else None     
+    Searches are scheduled from a single event loop, so the number of
+    requests in flight is bounded by the token bucket and `max_concurrency`
+    rather than by a small pool of worker threads. The Bigdata SDK search
+    call is blocking, so each request is handed to an executor owned by
+    the manager and created on the first request; callers never have to
+    manage threads themselves.
+    """
 
-        current_trace = Trace(
-            event_name=TraceEventNames.RUN_SEARCH,
-            document_type=scope,
-            start_date=start_date,
-            end_date=end_date,
-            rerank_threshold=rerank_threshold,
-            llm_model=None,
-            frequency=None,
-            workflow_start_date=Trace.get_time_now(),
-        )
+    def __init__(
+        self,
+        rpm: Optional[int] = None,
+        bucket_size: Optional[int] = None,
+        bigdata: Bigdata = None,
+        max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+        rate_limiter: RateLimiter = None,
+        cache: SearchCache = None,
+        retry_policy: RetryPolicy = None,
+        concurrency: AdaptiveConcurrency = None,
+        journal: SearchJournal = None,
+        **kwargs,
+    ):
+        """
+        Initialize the asynchronous rate-limited search manager.
 
-        kwargs["current_trace"] = current_trace
+        :param rpm:
+            Queries per minute limit of a rate limiter of its own. Defaults to
+            None (the shared rate limiter, which allows 300).
+        :param bucket_size:
+            Size of the token bucket of a rate limiter of its own. Defaults to
+            the value of `rpm`.
+        :param bigdata:
+            The Bigdata SDK client instance used for executing searches.
+            Can also be passed as `bigdata_client`, as the workflows do.
+            Defaults to None (uses the shared client, see
+            `bigdata_connection`).
+        :param max_concurrency:
+            The maximum number of requests in flight at any time.
+            Defaults to MAX_CONCURRENT_REQUESTS.
+        :param rate_limiter:
+            The rate limiter to draw tokens from. Pass the same instance to
+            several managers, or a `FileRateLimiter` to several processes,
+            to share one budget. Defaults to `get_shared_rate_limiter()`,
+            the budget shared with the other managers and the entity
+            resolver of the process, or to `create_rate_limiter(rpm,
+            bucket_size)` if `rpm` or `bucket_size` is given.
+        :param cache:
+            Optional on-disk cache of search results. Searches found in the
+            cache are answered without a request or a rate limit token.
+            Defaults to `create_search_cache()`, i.e. no caching unless the
+            environment variable `BIGDATA_SEARCH_CACHE_PATH` is set.
+        :param retry_policy:
+            How transient errors are retried. Searches that still fail are
+            recorded in `failed_queries`. Defaults to `RetryPolicy()`.
+        :param concurrency:
+            Optional controller that adapts the number of searches in flight
+            to the observed latency and throttling, up to its
+            `max_concurrency`. Defaults to None (fixed concurrency).
+        :param journal:
+            Optional journal of completed searches. Searches found in it are
+            skipped, and every completed search is appended to it, so an
+            interrupted run can be resumed. Defaults to None.
+        """
+        self.bigdata = bigdata or kwargs.get("bigdata_client") or bigdata_connection()
+        self.rate_limiter = rate_limiter or _default_rate_limiter(rpm, bucket_size)
+        self.rpm = self.rate_limiter.rpm
+        self.bucket_size = self.rate_limiter.bucket_size
+        self.cache = cache if cache is not None else create_search_cache()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.failed_queries: List[FailedQuery] = []
+        self.concurrency = concurrency
+        self.journal = journal
+        self.max_concurrency = max_concurrency
+        self._executor: Optional[ThreadPoolExecutor] = None
 
-    try: 
-        manager = SearchManager(**kwargs)
-        query_results = manager.concurrent_search(
-            queries=queries,
-            date_ranges=date_ranges,
-            sortby=sortby,
-            scope=scope,
-            limit=limit,
-            rerank_threshold=rerank_threshold,
-            **kwargs,
-        )
-    except Exception:
-        execution_result = "error"
-        raise
-    else:
-        execution_result = "success"
-    finally:
-        current_trace = kwargs.get("current_trace")
-        if current_trace and current_trace.event_name == TraceEventNames.RUN_SEARCH:
-            current_trace.workflow_end_date = Trace.get_time_now()
-            current_trace.result = execution_result  # noqa
-            send_trace(bigdata_connection(), current_trace)
+    async def __aenter__(self) -> "AsyncSearchManager":
+        return self
 
+    async def __aexit__(self, *exc_info) -> None:
+        self.close()
 
-    if only_results:
-        return list(query_results.values())
-    return query_results
+    def close(self) -> None:
+        """Release the executor used to run the blocking SDK calls."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """
+        Get the executor of the blocking SDK calls, creating it when the
+        first request is sent, so that runs answered from the cache or the
+        journal start no thread. It is sized to the requests allowed in
+        flight, and only starts a thread when no idle one is left.
+        """
+        if self._executor is None:
+            max_workers = self.max_concurrency
+            if self.concurrency is not None:
+                max_workers = min(max_workers, self.concurrency.max_concurrency)
+            self._executor = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="bigdata-search"
+            )
+        return self._executor
+
+    async def _acquire_token(self, timeout: float = None) -> bool:
+        """
+        Attempt to acquire a token for executing a search request,
+        without blocking the event loop.
+
+        :param timeout:
+            Maximum time (in seconds) to wait for a token.
+            Defaults to no timeout.
+        :return:
+            True if a token is acquired, False if timed out.
+        """
+        return await self.rate_limiter.acquire_async(timeout)
+
+    async def _search(
+        self,
+        query: QueryComponent,
+        date_range: Union[AbsoluteDateRange, RollingDateRange] = None,
+        sortby: SortBy = SortBy.RELEVANCE,
+        scope: DocumentType = DocumentType.ALL,
+        limit: int = 10,
+        timeout: float = None,
+        rerank_threshold: float = None,
+        **kwargs,
+    ) -> Optional[List[Document]]:
+        """
+        Execute a single search with rate limiting.
+
+        :param query:
+            The search query to execute.
+        :param date_range:
+            A date range filter for the search results.
+        :param sortby:
+            The sorting criterion for the search results.
+            Defaults to SortBy.RELEVANCE.
+        :param scope:
+            The scope of the documents to include.
+            Defaults to DocumentType.ALL.
+        :param limit:
+            The maximum number of documents to return.
+            Defaults to 10.
+        :param timeout:
+            The maximum time (in seconds) to wait for a token.
+        :param rerank_threshold:
+            Enable the cross-encoder by setting value between [0,1]
+        :return:
+            A list of search results.
+        """
+        search_key = None
+        if self.cache is not None or self.journal is not None:
+            search_key = search_fingerprint(
+                query, date_range, scope, sortby, limit, rerank_threshold
+            )
+            stored = _get_stored_results(
+                self.cache, self.journal, search_key, kwargs.get("current_trace")
+            )
+            if stored is not None:
+                return stored
+
+        search_date_range = date_range
+        if isinstance(date_range, tuple):
+            search_date_range = AbsoluteDateRange(*date_range)
+
+        loop = asyncio.get_running_loop()
+        for attempt in itertools.count(1):
+            if not await self._acquire_token(timeout):
+                error = "Timed out attempting to acquire rate limit token"
+                logging.warning(error)
+                self.failed_queries.append(
+                    FailedQuery(
+                        query=query,
+                        date_range=date_range,
+                        sortby=sortby,
+                        scope=scope,
+                        limit=limit,
+                        rerank_threshold=rerank_threshold,
+                        error=error,
+                        attempts=attempt,
+                    )
+                )
+                return None
+
+            started_at = time.monotonic()
+            try:
+                results = await loop.run_in_executor(
+                    self._get_executor(),
+                    partial(
+                        _run_bigdata_search,
+                        self.bigdata,
+                        query=query,
+                        date_range=search_date_range,
+                        sortby=sortby,
+                        scope=scope,
+                        limit=limit,
+                        rerank_threshold=rerank_threshold,
+                        current_trace=kwargs.get("current_trace"),
+                    ),
+                )
+            except Exception as e:
+                retryable = is_retryable_error(e)
+                if retryable and self.concurrency is not None:
+                    self.concurrency.record_failure()
+                if attempt <= self.retry_policy.max_retries and retryable:
+                    delay = self.retry_policy.get_delay(attempt - 1)
+                    logging.warning(f"Search error: {e}. Retrying in {delay:.1f}s...")
+                    await asyncio.sleep(delay)
+                    continue
+                logging.error(f"Search error: {e}")
+                self.failed_queries.append(
+                    FailedQuery(
+                        query=query,
+                        date_range=date_range,
+                        sortby=sortby,
+                        scope=scope,
+                        limit=limit,
+                        rerank_threshold=rerank_threshold,
+                        error=str(e),
+                        attempts=attempt,
+                    )
+                )
+                return None
+
+            if self.concurrency is not None:
+                self.concurrency.record_success(time.monotonic() - started_at)
+            if search_key is not None:
+                _store_results(self.cache, self.journal, search_key, results)
+            return results
+
+    async def concurrent_search(
+        self,
+        queries: List[QueryComponent],
+        date_ranges: DATE_RANGE_TYPE = None,
+        sortby: SortBy = SortBy.RELEVANCE,
+        scope: DocumentType = DocumentType.ALL,
+        limit: int = 10,
+        timeout: float = None,
+        rerank_threshold: float = None,
+        **kwargs,
+    ) -> SEARCH_QUERY_RESULTS_TYPE:
+        """
+        Execute multiple searches concurrently while respecting rate limits.
+        The order of results is preserved based on the input queries.
+
+        :param queries:
+            A list of QueryComponent objects.
+        :param date_ranges:
+            Date range filter for all searches.
+        :param sortby:
+            The sorting criterion for the search results.
+            Defaults to SortBy.RELEVANCE.
+        :param scope:
+            The scope of the documents to include.
+            Defaults to DocumentType.ALL.
+        :param limit:
+            The maximum number of documents to return per query.
+            Defaults to 10.
+        :param timeout:
+            The maximum time (in seconds) to wait for a token
+            per request.
+        :param rerank_threshold:
+            Enable the cross-encoder by setting value between [0,1]
+        :return:
+            A mapping of the tuple of search query and date range
+            to the list of the corresponding search results.
+        """
+        queries = list(queries)
+        results = {}
+        with tqdm(
+            total=len(queries) * len(date_ranges), desc="Querying Bigdata..."
+        ) as pbar:
+            async for query, date_range, documents in self.iter_search(
+                queries=queries,
+                date_ranges=date_ranges,
+                sortby=sortby,
+                scope=scope,
+                limit=limit,
+                timeout=timeout,
+                rerank_threshold=rerank_threshold,
+                **kwargs,
+            ):
+                results[(query, date_range)] = documents
+                pbar.update(1)
+
+        return _order_by_grid(results, queries, date_ranges)
+
+    async def chunk_table_search(
+        self,
+        queries: Iterable[QueryComponent],
+        date_ranges: DATE_RANGE_TYPE = None,
+        sortby: SortBy = SortBy.RELEVANCE,
+        scope: DocumentType = DocumentType.ALL,
+        limit: int = 10,
+        timeout: float = None,
+        rerank_threshold: float = None,
+        **kwargs,
+    ) -> ChunkTable:
+        """
+        Execute multiple searches concurrently, like `concurrent_search`, and
+        collect the results into a `ChunkTable` as each search completes, so
+        that the documents are released as soon as they are ingested.
+        Documents follow the order of the query x date range grid. Chunks
+        returned by several searches are stored once, with the queries that
+        matched them (see `ChunkTable.chunk_queries`).
+
+        The queries are drawn lazily as searches are submitted, so they can
+        be a generator, e.g. `iter_batched_query`, and the grid is never
+        held in memory.
+
+        :param queries:
+            An iterable of QueryComponent objects.
+        :param date_ranges:
+            Date range filter for all searches.
+        :param sortby:
+            The sorting criterion for the search results.
+            Defaults to SortBy.RELEVANCE.
+        :param scope:
+            The scope of the documents to include.
+            Defaults to DocumentType.ALL.
+        :param limit:
+            The maximum number of documents to return per query.
+            Defaults to 10.
+        :param timeout:
+            The maximum time (in seconds) to wait for a token
+            per request.
+        :param rerank_threshold:
+            Enable the cross-encoder by setting value between [0,1]
+        :return:
+            The chunks of all the search results.
+        """
+        builder = ChunkTableBuilder()
+        positions = _GridPositions(queries, date_ranges)
+        with tqdm(total=positions.total, desc="Querying Bigdata...") as pbar:
+            async for query, date_range, documents in self.iter_search(
+                queries=positions,
+                date_ranges=date_ranges,
+                sortby=sortby,
+                scope=scope,
+                limit=limit,
+                timeout=timeout,
+                rerank_threshold=rerank_threshold,
+                **kwargs,
+            ):
+                builder.add(documents, positions.pop(query, date_range), query)
+                pbar.update(1)
+
+        logging.debug(f"Skipped {builder.duplicates} duplicate chunks")
+        return builder.build()
+
+    async def iter_search(
+        self,
+        queries: Iterable[QueryComponent],
+        date_ranges: DATE_RANGE_TYPE = None,
+        sortby: SortBy = SortBy.RELEVANCE,
+        scope: DocumentType = DocumentType.ALL,
+        limit: int = 10,
+        timeout: float = None,
+        rerank_threshold: float = None,
+        max_pending: int = None,
+        **kwargs,
+    ) -> AsyncIterator[SEARCH_QUERY_RESULT_TYPE]:
+        """
+        Execute multiple searches concurrently while respecting rate limits,
+        yielding each result as soon as its search completes.
+
+        At most `max_pending` searches are scheduled but not yet consumed,
+        which also bounds the number of requests in flight. Closing the
+        generator early cancels the outstanding searches.
+
+        :param queries:
+            An iterable of QueryComponent objects.
+        :param date_ranges:
+            Date range filter for all searches.
+        :param sortby:
+            The sorting criterion for the search results.
+            Defaults to SortBy.RELEVANCE.
+        :param scope:
+            The scope of the documents to include.
+            Defaults to DocumentType.ALL.
+        :param limit:
+            The maximum number of documents to return per query.
+            Defaults to 10.
+        :param timeout:
+            The maximum time (in seconds) to wait for a token
+            per request.
+        :param rerank_threshold:
+            Enable the cross-encoder by setting value between [0,1]
+        :param max_pending:
+            The maximum number of searches scheduled and not yet consumed.
+            Defaults to `max_concurrency`. Ignored if the manager has a
+            `concurrency` controller.
+        :return:
+            An asynchronous generator of tuples of search query, date range
+            and the list of the corresponding search results (None if the
+            search failed), in completion order.
+        """
+        max_pending = min(max_pending or self.max_concurrency, self.max_concurrency)
+        cells = ((query, date_range) for query in queries for date_range in date_ranges)
+        pending = {}
+
+        def window():
+            if self.concurrency is not None:
+                return min(self.concurrency.limit, self.max_concurrency)
+            return max_pending
+
+        def schedule(cells_to_schedule):
+            for query, date_range in cells_to_schedule:
+                task = asyncio.ensure_future(
+                    self._search(
+                        query=query,
+                        date_range=date_range,
+                        sortby=sortby,
+                        scope=scope,
+                        limit=limit,
+                        timeout=timeout,
+                        rerank_threshold=rerank_threshold,
+                        **kwargs,
+                    )
+                )
+                pending[task] = (query, date_range)
+
+        try:
+            schedule(itertools.islice(cells, window()))
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    query, date_range = pending.pop(task)
+                    try:
+                        documents = task.result()
+                    except Exception as e:
+                        logging.error(f"Error in search {query, date_range}: {e}")
+                        documents = None
+                    yield query, date_range, documents
+                    schedule(itertools.islice(cells, max(0, window() - len(pending))))
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+def split_manager_kwargs(kwargs: dict) -> Tuple[dict, dict]:
+    """Split keyword arguments into those of a search manager and those of its searches."""
+    manager_kwargs = {k: v for k, v in kwargs.items() if k in MANAGER_ARGUMENTS}
+    search_kwargs = {k: v for k, v in kwargs.items() if k not in MANAGER_ARGUMENTS}
+    return manager_kwargs, search_kwargs
+
+
+def _default_rate_limiter(
+    rpm: Optional[int], bucket_size: Optional[int]
+) -> RateLimiter:
+    """The shared rate limiter, or a new one for an explicit budget."""
+    if rpm is None and bucket_size is None:
+        return get_shared_rate_limiter()
+    return create_rate_limiter(
+        rpm=REQUESTS_PER_MINUTE_LIMIT if rpm is None else rpm, bucket_size=bucket_size
+    )
+
+
+def _run_bigdata_search(
+    bigdata: Bigdata,
+    query: QueryComponent,
+    date_range: Union[AbsoluteDateRange, RollingDateRange],
+    sortby: SortBy,
+    scope: DocumentType,
+    limit: int,
+    rerank_threshold: Optional[float],
+    current_trace: Optional[Trace] = None,
+) -> List[Document]:
+    """Run a single blocking search through the Bigdata SDK."""
+    query_obj = bigdata.search.new(
+        query=query,
+        date_range=date_range,
+        sortby=sortby,
+        scope=scope,
+        rerank_threshold=rerank_threshold,
+    )
+    results = query_obj.run(limit=limit)
+    if current_trace:
+        current_trace.add_query_units(query_obj.get_usage())
+    return results
+
+
+def _order_by_grid(
+    results: SEARCH_QUERY_RESULTS_TYPE,
+    queries: List[QueryComponent],
+    date_ranges: DATE_RANGE_TYPE,
+) -> SEARCH_QUERY_RESULTS_TYPE:
+    """Reorder the search results to follow the query x date range grid."""
+    return {
+        (query, date_range): results[(query, date_range)]
+        for query, date_range in itertools.product(queries, date_ranges)
+        if (query, date_range) in results
+    }
+
+
+class _GridPositions:
+    """
+    Positions of the searches of a query x date range grid whose queries are
+    drawn lazily. Iterating yields the queries, recording the position of
+    each one until all its date ranges have been searched, so only the
+    queries of the searches in flight are held.
+    """
+
+    def __init__(self, queries: Iterable[QueryComponent], date_ranges: DATE_RANGE_TYPE):
+        self.total = (
+            len(queries) * len(date_ranges) if isinstance(queries, Sized) else None
+        )
+        self._queries = queries
+        self._date_positions = {
+            date_range: i for i, date_range in enumerate(date_ranges)
+        }
+        self._query_positions = {}
+        self._remaining = {}
+
+    def __iter__(self) -> Iterator[QueryComponent]:
+        for i, query in enumerate(self._queries):
+            self._query_positions[query] = i
+            self._remaining[query] = self._remaining.get(query, 0) + len(
+                self._date_positions
+            )
+            yield query
+
+    def pop(
+        self,
+        query: QueryComponent,
+        date_range: Union[AbsoluteDateRange, RollingDateRange],
+    ) -> Tuple[int, int]:
+        """Return the position of a completed search and release its query."""
+        position = (self._query_positions[query], self._date_positions[date_range])
+        self._remaining[query] -= 1
+        if not self._remaining[query]:
+            del self._remaining[query]
+            del self._query_positions[query]
+        return position
+
+
+def _get_stored_results(
+    cache: Optional[SearchCache],
+    journal: Optional[SearchJournal],
+    search_key: str,
+    current_trace: Optional[Trace],
+) -> Optional[List[Document]]:
+    """
+    Look up a search in the journal, then in the cache, recording the cache
+    hit or miss in the trace. Cache hits are journaled as completed.
+    """
+    if journal is not None:
+        journaled = journal.get(search_key)
+        if journaled is not None:
+            return journaled
+    if cache is None:
+        return None
+    try:
+        cached = cache.get(search_key)
+    except Exception as e:
+        logging.warning(f"Search cache error: {e}")
+        cached = None
+    if current_trace:
+        current_trace.add_cache_lookup(cached is not None)
+    if cached is not None and journal is not None:
+        _store_results(None, journal, search_key, cached)
+    return cached
+
+
+def _store_results(
+    cache: Optional[SearchCache],
+    journal: Optional[SearchJournal],
+    search_key: str,
+    results: List[Document],
+) -> None:
+    """Store search results in the cache and the journal; a failure never fails the search."""
+    if cache is not None:
+        try:
+            cache.set(search_key, results)
+        except Exception as e:
+            logging.warning(f"Search cache error: {e}")
+    if journal is not None:
+        try:
+            journal.append(search_key, results)
+        except Exception as e:
+            logging.warning(f"Search journal error: {e}")
+
+
+def _event_loop_running() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def normalize_date_range(date_ranges: DATE_RANGE_TYPE) -> DATE_RANGE_TYPE:
+    if not isinstance(date_ranges, list):
+        date_ranges = [date_ranges]
+
+    # Convert mutable AbsoluteDateRange into hashable objects
+    for i, dr in enumerate(date_ranges):
+        date_ranges[i] = date_range_key(dr)
+    return date_ranges
+
+
+def _start_search_trace(
+    date_ranges: DATE_RANGE_TYPE,
+    scope: DocumentType,
+    rerank_threshold: Optional[float],
+    kwargs: dict,
+) -> None:
+    """Attach a RUN_SEARCH trace to `kwargs` unless the caller provided one."""
+    if kwargs.get("current_trace"):
+        return
+
+    start_date = date_ranges[0][0] if date_ranges else None
+    end_date = date_ranges[-1][1] if date_ranges else None
+
+    kwargs["current_trace"] = Trace(
+        event_name=TraceEventNames.RUN_SEARCH,
+        document_type=scope,
+        start_date=start_date,
+        end_date=end_date,
+        rerank_threshold=rerank_threshold,
+        llm_model=None,
+        frequency=None,
+        workflow_start_date=Trace.get_time_now(),
+    )
+
+
+def _finish_search_trace(kwargs: dict, execution_result: str) -> None:
+    """Send the trace started by `_start_search_trace`, if it was ours."""
+    current_trace = kwargs.get("current_trace")
+    if current_trace and current_trace.event_name == TraceEventNames.RUN_SEARCH:
+        current_trace.workflow_end_date = Trace.get_time_now()
+        current_trace.result = execution_result  # noqa
+        send_trace(bigdata_connection(), current_trace)
+
+
+def _report_concurrency(
+    manager: Union[SearchManager, AsyncSearchManager],
+    max_workers: int,
+    kwargs: dict,
+) -> None:
+    """Log the concurrency chosen for a run and record it in the trace."""
+    if manager.concurrency is None:
+        concurrency = max_workers
+    else:
+        report = manager.concurrency.report
+        concurrency = report.final
+        logging.info(
+            f"Adaptive concurrency settled at {report.final} searches in flight "
+            f"(peak {report.peak}, mean {report.mean:.1f}) for "
+            f"{report.requests_per_minute:.0f} of {manager.rpm} requests per minute"
+        )
+    current_trace = kwargs.get("current_trace")
+    if current_trace:
+        current_trace.search_concurrency = concurrency
+
+
+def _report_cache(manager: SearchManager, kwargs: dict) -> None:
+    """Log the search cache hits and misses recorded in the trace."""
+    current_trace = kwargs.get("current_trace")
+    if manager.cache is not None and current_trace:
+        logging.info(
+            f"Search cache: {current_trace.cache_hits} hits, "
+            f"{current_trace.cache_misses} misses"
+        )
+
+
+def run_search(
+    queries: Iterable[QueryComponent],
+    date_ranges: DATE_RANGE_TYPE = None,
+    sortby: SortBy = SortBy.RELEVANCE,
+    scope: DocumentType = DocumentType.ALL,
+    limit: int = 10,
+    only_results: bool = True,
+    rerank_threshold: float = None,
+    return_failed: bool = False,
+    use_async: bool = False,
+    max_workers: int = None,
+    adaptive_concurrency: bool = False,
+    journal_path: str = None,
+    as_chunk_table: bool = False,
+    **kwargs,
+) -> Union[SEARCH_QUERY_RESULTS_TYPE, list[list[Document]], ChunkTable]:
+    """
+    Execute multiple searches concurrently using the Bigdata client, with rate limiting.
+
+    Args:
+        queries (Iterable[QueryComponent]): The QueryComponent objects. With `as_chunk_table`,
+            they are drawn lazily as searches are submitted, so a generator such as
+            `iter_batched_query` streams a grid of any size without holding it in memory.
+        date_ranges (Optional[Union[AbsoluteDateRange, RollingDateRange, List[Union[AbsoluteDateRange, RollingDateRange]]]]):
+            Date range filter for the search results.
+        sortby (SortBy): The sorting criterion for the search results. Defaults to SortBy.RELEVANCE.
+        scope (DocumentType): The scope of the documents to include. Defaults to DocumentType.ALL.
+        limit (int): The maximum number of documents to return per query. Defaults to 10.
+        only_results (bool): If True, return only the search results.
+            If False, return the queries along with the results.
+            Defaults to True.
+        rerank_threshold (Optional[float]): The threshold for reranking the search results.
+            See https://sdk.bigdata.com/en/latest/how_to_guides/rerank_search.html.
+        return_failed (bool): If True, also return the list of `FailedQuery`
+            for the searches that failed after all retries, which can be passed
+            to `replay_failed_queries`. Defaults to False.
+        use_async (bool): If True, run the searches from a single event loop with
+            `AsyncSearchManager` (see `arun_search`) instead of a thread pool. When
+            an event loop is already running, e.g. in Jupyter, the searches run in
+            a thread pool, use `await arun_search(...)` instead. Defaults to False.
+        max_workers (Optional[int]): The maximum number of concurrent searches. Defaults to
+            MAX_WORKERS, or to MAX_ADAPTIVE_WORKERS with `adaptive_concurrency`. With `use_async`,
+            it sets `max_concurrency` of `AsyncSearchManager`.
+        adaptive_concurrency (bool): If True, start with a few searches in flight and adapt their
+            number, up to `max_workers`, to the observed latency and throttling (see
+            `AdaptiveConcurrency`). The chosen concurrency is logged and recorded in the trace.
+            Defaults to False.
+        journal_path (Optional[str]): Path of a `SearchJournal` to checkpoint the run. Every
+            completed search is appended to it, and a run restarted with the same path only
+            issues the searches that are not in it yet. Defaults to None.
+        as_chunk_table (bool): If True, collect the results into a `ChunkTable` as each search
+            completes, instead of keeping every `Document` until the end of the run. The table
+            follows the order of the query x date range grid and `only_results` is ignored.
+            Defaults to False.
+        kwargs (dict): Additional arguments for `SearchManager`, such as `rpm`,
+            `rate_limiter`, `cache` or `retry_policy`.
+    Returns:
+        Union[Dict[Tuple[QueryComponent, Union[AbsoluteDateRange, RollingDateRange]], List[Document]], list[list[Document]], list[dict]]:
+        If `only_results` is True, returns the list of search results.
+
+        If `only_results` is False, returns a mapping of the tuple of search query and date range to
+        the list of the corresponding search results.
+
+        If `as_chunk_table` is True, returns a `ChunkTable` of the search results.
+
+        If `return_failed` is True, returns a tuple of the above and the list of failed searches.
+    """
+    if use_async and _event_loop_running():
+        # asyncio.run cannot be nested, e.g. in a Jupyter notebook
+        logging.warning(
+            "run_search(use_async=True) was called from a running event loop: "
+            "running the searches in a thread pool instead. Use "
+            "`await arun_search(...)` to run them on the event loop."
+        )
+        use_async = False
+
+    if use_async:
+        if max_workers:
+            kwargs.setdefault("max_concurrency", max_workers)
+        return asyncio.run(
+            arun_search(
+                queries,
+                date_ranges=date_ranges,
+                sortby=sortby,
+                scope=scope,
+                limit=limit,
+                only_results=only_results,
+                rerank_threshold=rerank_threshold,
+                return_failed=return_failed,
+                adaptive_concurrency=adaptive_concurrency,
+                journal_path=journal_path,
+                as_chunk_table=as_chunk_table,
+                **kwargs,
+            )
+        )
+
+    date_ranges = normalize_date_range(date_ranges)
+    date_ranges.sort(key=lambda x: x[0])
+
+    manager_kwargs, kwargs = split_manager_kwargs(kwargs)
+    _start_search_trace(date_ranges, scope, rerank_threshold, kwargs)
+
+    journal = None
+    if journal_path and manager_kwargs.get("journal") is None:
+        journal = manager_kwargs["journal"] = SearchJournal(journal_path)
+
+    if adaptive_concurrency and manager_kwargs.get("concurrency") is None:
+        manager_kwargs["concurrency"] = AdaptiveConcurrency(
+            max_concurrency=max_workers or MAX_ADAPTIVE_WORKERS
+        )
+    max_workers = max_workers or MAX_WORKERS
+
+    try:
+        manager = SearchManager(**manager_kwargs)
+        search = (
+            manager.chunk_table_search if as_chunk_table else manager.concurrent_search
+        )
+        query_results = search(
+            queries=queries,
+            date_ranges=date_ranges,
+            sortby=sortby,
+            scope=scope,
+            limit=limit,
+            max_workers=max_workers,
+            rerank_threshold=rerank_threshold,
+            **kwargs,
+        )
+        logging.debug(f"Rate limiter usage: {manager.rate_limiter.stats}")
+        _report_concurrency(manager, max_workers, kwargs)
+        _report_cache(manager, kwargs)
+    except Exception:
+        execution_result = "error"
+        raise
+    else:
+        execution_result = "success"
+    finally:
+        if journal is not None:
+            logging.info(f"Resumed {journal.hits} searches from {journal_path}")
+            journal.close()
+        _finish_search_trace(kwargs, execution_result)
+
+    if only_results and not as_chunk_table:
+        query_results = list(query_results.values())
+    if return_failed:
+        return query_results, manager.failed_queries
+    return query_results
+
+
+async def arun_search(
+    queries: Iterable[QueryComponent],
+    date_ranges: DATE_RANGE_TYPE = None,
+    sortby: SortBy = SortBy.RELEVANCE,
+    scope: DocumentType = DocumentType.ALL,
+    limit: int = 10,
+    only_results: bool = True,
+    rerank_threshold: float = None,
+    return_failed: bool = False,
+    adaptive_concurrency: bool = False,
+    journal_path: str = None,
+    as_chunk_table: bool = False,
+    **kwargs,
+) -> Union[SEARCH_QUERY_RESULTS_TYPE, list[list[Document]], ChunkTable]:
+    """
+    Execute multiple searches concurrently from the running event loop, with rate limiting.
+
+    Coroutine counterpart of `run_search`, backed by `AsyncSearchManager`.
+    Results are returned in the order of the input query and date range grid.
+
+    Args:
+        queries (Iterable[QueryComponent]): The QueryComponent objects. With `as_chunk_table`,
+            they are drawn lazily as searches are submitted, so a generator such as
+            `iter_batched_query` streams a grid of any size without holding it in memory.
+        date_ranges (Optional[Union[AbsoluteDateRange, RollingDateRange, List[Union[AbsoluteDateRange, RollingDateRange]]]]):
+            Date range filter for the search results.
+        sortby (SortBy): The sorting criterion for the search results. Defaults to SortBy.RELEVANCE.
+        scope (DocumentType): The scope of the documents to include. Defaults to DocumentType.ALL.
+        limit (int): The maximum number of documents to return per query. Defaults to 10.
+        only_results (bool): If True, return only the search results.
+            If False, return the queries along with the results.
+            Defaults to True.
+        rerank_threshold (Optional[float]): The threshold for reranking the search results.
+            See https://sdk.bigdata.com/en/latest/how_to_guides/rerank_search.html.
+        return_failed (bool): If True, also return the list of `FailedQuery`
+            for the searches that failed after all retries, which can be passed
+            to `replay_failed_queries`. Defaults to False.
+        adaptive_concurrency (bool): If True, adapt the number of requests in flight, up to
+            `max_concurrency`, to the observed latency and throttling (see `AdaptiveConcurrency`).
+            The chosen concurrency is logged and recorded in the trace. Defaults to False.
+        journal_path (Optional[str]): Path of a `SearchJournal` to checkpoint the run. Every
+            completed search is appended to it, and a run restarted with the same path only
+            issues the searches that are not in it yet. Defaults to None.
+        as_chunk_table (bool): If True, collect the results into a `ChunkTable` as each search
+            completes, instead of keeping every `Document` until the end of the run. The table
+            follows the order of the query x date range grid and `only_results` is ignored.
+            Defaults to False.
+        kwargs (dict): Additional arguments for `AsyncSearchManager`, such as
+            `rpm`, `max_concurrency`, `rate_limiter`, `cache` or `retry_policy`.
+    Returns:
+        Union[Dict[Tuple[QueryComponent, Union[AbsoluteDateRange, RollingDateRange]], List[Document]], list[list[Document]]]:
+        If `only_results` is True, returns the list of search results.
+
+        If `only_results` is False, returns a mapping of the tuple of search query and date range to
+        the list of the corresponding search results.
+
+        If `as_chunk_table` is True, returns a `ChunkTable` of the search results.
+
+        If `return_failed` is True, returns a tuple of the above and the list of failed searches.
+    """
+    date_ranges = normalize_date_range(date_ranges)
+    date_ranges.sort(key=lambda x: x[0])
+
+    manager_kwargs, kwargs = split_manager_kwargs(kwargs)
+    _start_search_trace(date_ranges, scope, rerank_threshold, kwargs)
+
+    journal = None
+    if journal_path and manager_kwargs.get("journal") is None:
+        journal = manager_kwargs["journal"] = SearchJournal(journal_path)
+
+    if adaptive_concurrency and manager_kwargs.get("concurrency") is None:
+        manager_kwargs["concurrency"] = AdaptiveConcurrency(
+            max_concurrency=manager_kwargs.get(
+                "max_concurrency", MAX_CONCURRENT_REQUESTS
+            )
+        )
+
+    try:
+        async with AsyncSearchManager(**manager_kwargs) as manager:
+            search = (
+                manager.chunk_table_search
+                if as_chunk_table
+                else manager.concurrent_search
+            )
+            query_results = await search(
+                queries=queries,
+                date_ranges=date_ranges,
+                sortby=sortby,
+                scope=scope,
+                limit=limit,
+                rerank_threshold=rerank_threshold,
+                **kwargs,
+            )
+        logging.debug(f"Rate limiter usage: {manager.rate_limiter.stats}")
+        _report_concurrency(manager, manager.max_concurrency, kwargs)
+        _report_cache(manager, kwargs)
+    except Exception:
+        execution_result = "error"
+        raise
+    else:
+        execution_result = "success"
+    finally:
+        if journal is not None:
+            logging.info(f"Resumed {journal.hits} searches from {journal_path}")
+            journal.close()
+        _finish_search_trace(kwargs, execution_result)
+
+    if only_results and not as_chunk_table:
+        query_results = list(query_results.values())
+    if return_failed:
+        return query_results, manager.failed_queries
+    return query_results
+
+
+def replay_failed_queries(
+    failed_queries: List[FailedQuery],
+    only_results: bool = True,
+    return_failed: bool = False,
+    **kwargs,
+) -> Union[SEARCH_QUERY_RESULTS_TYPE, list[list[Document]]]:
+    """
+    Re-run the searches that failed in a previous `run_search`, and only those.
+
+    Args:
+        failed_queries (List[FailedQuery]): The failed searches, as returned by
+            `run_search(..., return_failed=True)`.
+        only_results (bool): If True, return only the search results.
+            If False, return the queries along with the results.
+            Defaults to True.
+        return_failed (bool): If True, also return the list of searches that
+            failed again. Defaults to False.
+        kwargs (dict): Additional arguments for `SearchManager`, such as `rpm`,
+            `rate_limiter`, `cache` or `retry_policy`.
+    Returns:
+        Union[Dict[Tuple[QueryComponent, Union[AbsoluteDateRange, RollingDateRange]], List[Document]], list[list[Document]]]:
+        The results of the replayed searches, in the order of `failed_queries`, in the
+        same format as `run_search`.
+    """
+    manager_kwargs, kwargs = split_manager_kwargs(kwargs)
+    manager = SearchManager(**manager_kwargs)
+    query_results = manager.replay(failed_queries, **kwargs)
+
+    if only_results:
+        query_results = list(query_results.values())
+    if return_failed:
+        return query_results, manager.failed_queries
+    return query_results
+
+
+def iter_search(
+    queries: Iterable[QueryComponent],
+    date_ranges: DATE_RANGE_TYPE = None,
+    sortby: SortBy = SortBy.RELEVANCE,
+    scope: DocumentType = DocumentType.ALL,
+    limit: int = 10,
+    rerank_threshold: float = None,
+    max_pending: int = None,
+    **kwargs,
+) -> Iterator[SEARCH_QUERY_RESULT_TYPE]:
+    """
+    Execute multiple searches concurrently using the Bigdata client, with rate limiting,
+    yielding the results as each search completes.
+
+    Unlike `run_search`, downstream processing can start as soon as the first search
+    finishes, and documents can be released once processed instead of being held until
+    the whole grid of queries and date ranges is done.
+
+    Args:
+        queries (Iterable[QueryComponent]): An iterable of QueryComponent objects.
+        date_ranges (Optional[Union[AbsoluteDateRange, RollingDateRange, List[Union[AbsoluteDateRange, RollingDateRange]]]]):
+            Date range filter for the search results.
+        sortby (SortBy): The sorting criterion for the search results. Defaults to SortBy.RELEVANCE.
+        scope (DocumentType): The scope of the documents to include. Defaults to DocumentType.ALL.
+        limit (int): The maximum number of documents to return per query. Defaults to 10.
+        rerank_threshold (Optional[float]): The threshold for reranking the search results.
+            See https://sdk.bigdata.com/en/latest/how_to_guides/rerank_search.html.
+        max_pending (Optional[int]): The maximum number of searches submitted and not yet
+            consumed. Defaults to twice the number of workers.
+        kwargs (dict): Additional arguments for `SearchManager`, such as `rpm`,
+            `max_workers`, `rate_limiter` or `cache`.
+    Yields:
+        Tuple[QueryComponent, Union[AbsoluteDateRange, RollingDateRange], Optional[List[Document]]]:
+        The search query, the date range and the corresponding search results (None if the
+        search failed), in completion order.
+    """
+    date_ranges = normalize_date_range(date_ranges)
+    date_ranges.sort(key=lambda x: x[0])
+
+    manager_kwargs, kwargs = split_manager_kwargs(kwargs)
+    _start_search_trace(date_ranges, scope, rerank_threshold, kwargs)
+
+    execution_result = "success"
+    try:
+        manager = SearchManager(**manager_kwargs)
+        yield from manager.iter_search(
+            queries=queries,
+            date_ranges=date_ranges,
+            sortby=sortby,
+            scope=scope,
+            limit=limit,
+            rerank_threshold=rerank_threshold,
+            max_pending=max_pending,
+            **kwargs,
+        )
+    except Exception:
+        execution_result = "error"
+        raise
+    finally:
+        _finish_search_trace(kwargs, execution_result)
+
+
+async def aiter_search(
+    queries: Iterable[QueryComponent],
+    date_ranges: DATE_RANGE_TYPE = None,
+    sortby: SortBy = SortBy.RELEVANCE,
+    scope: DocumentType = DocumentType.ALL,
+    limit: int = 10,
+    rerank_threshold: float = None,
+    max_pending: int = None,
+    **kwargs,
+) -> AsyncIterator[SEARCH_QUERY_RESULT_TYPE]:
+    """
+    Execute multiple searches concurrently from the running event loop, with rate limiting,
+    yielding the results as each search completes.
+
+    Asynchronous counterpart of `iter_search`, backed by `AsyncSearchManager`.
+
+    Args:
+        queries (Iterable[QueryComponent]): An iterable of QueryComponent objects.
+        date_ranges (Optional[Union[AbsoluteDateRange, RollingDateRange, List[Union[AbsoluteDateRange, RollingDateRange]]]]):
+            Date range filter for the search results.
+        sortby (SortBy): The sorting criterion for the search results. Defaults to SortBy.RELEVANCE.
+        scope (DocumentType): The scope of the documents to include. Defaults to DocumentType.ALL.
+        limit (int): The maximum number of documents to return per query. Defaults to 10.
+        rerank_threshold (Optional[float]): The threshold for reranking the search results.
+            See https://sdk.bigdata.com/en/latest/how_to_guides/rerank_search.html.
+        max_pending (Optional[int]): The maximum number of searches scheduled and not yet
+            consumed. Defaults to `max_concurrency`.
+        kwargs (dict): Additional arguments for `AsyncSearchManager`, such as
+            `rpm`, `max_concurrency`, `rate_limiter`, `cache` or `retry_policy`.
+    Yields:
+        Tuple[QueryComponent, Union[AbsoluteDateRange, RollingDateRange], Optional[List[Document]]]:
+        The search query, the date range and the corresponding search results (None if the
+        search failed), in completion order.
+    """
+    date_ranges = normalize_date_range(date_ranges)
+    date_ranges.sort(key=lambda x: x[0])
+
+    manager_kwargs, kwargs = split_manager_kwargs(kwargs)
+    _start_search_trace(date_ranges, scope, rerank_threshold, kwargs)
+
+    execution_result = "success"
+    try:
+        async with AsyncSearchManager(**manager_kwargs) as manager:
+            async for result in manager.iter_search(
+                queries=queries,
+                date_ranges=date_ranges,
+                sortby=sortby,
+                scope=scope,
+                limit=limit,
+                rerank_threshold=rerank_threshold,
+                max_pending=max_pending,
+                **kwargs,
+            ):
+                yield result
+    except Exception:
+        execution_result = "error"
+        raise
+    finally:
+        _finish_search_trace(kwargs, execution_result)
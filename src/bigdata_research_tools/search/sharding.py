@@ -0,0 +1,289 @@
+"""
+Module for splitting a search run into shards.
+
+A run searches every query over every date range. This module assigns the
+cells of that query x date range grid to a fixed number of shards, so that
+each shard can be searched independently (by another process or machine)
+with `run_search_shard`, which writes its results to its own file.
+`merge_shards` reads the files of all the shards back into the `ChunkTable`
+that `run_search(as_chunk_table=True)` would have returned for the whole
+grid in a single process.
+"""
+
+import hashlib
+import itertools
+import json
+import logging
+import os
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from bigdata_client.document import Document
+from bigdata_client.models.advanced_search_query import QueryComponent
+from bigdata_client.models.search import DocumentType, SortBy
+
+from bigdata_research_tools.search.chunk_table import ChunkTable, ChunkTableBuilder
+from bigdata_research_tools.search.fingerprint import (
+    canonical_date_range,
+    canonical_query,
+)
+from bigdata_research_tools.search.retry import FailedQuery
+from bigdata_research_tools.search.search import (
+    DATE_RANGE_TYPE,
+    SearchManager,
+    _finish_search_trace,
+    _start_search_trace,
+    normalize_date_range,
+    split_manager_kwargs,
+)
+
+SHARD_BY = ("cell", "query")
+
+
+def shard_cells(
+    n_queries: int, n_date_ranges: int, shards: int, shard: int, by: str = "cell"
+) -> List[Tuple[int, int]]:
+    """
+    Select the cells of the query x date range grid that belong to a shard.
+
+    Cells are dealt round-robin, so that every shard gets a similar mix of
+    queries and date ranges. The assignment only depends on the size of the
+    grid and the number of shards.
+
+    Args:
+        n_queries (int): The number of queries.
+        n_date_ranges (int): The number of date ranges.
+        shards (int): The number of shards.
+        shard (int): The index of the shard, from 0 to `shards` - 1.
+        by (str): 'cell' to deal single searches, or 'query' to keep all the
+            date ranges of a query (e.g. of a batch of companies) in the same
+            shard. Defaults to 'cell'.
+    Returns:
+        List[Tuple[int, int]]: The query and date range index of each cell of
+            the shard, in grid order.
+    """
+    if shards < 1:
+        raise ValueError(f"The number of shards must be positive, got {shards}")
+    if not 0 <= shard < shards:
+        raise ValueError(f"Shard {shard} is out of range for {shards} shards")
+    if by not in SHARD_BY:
+        raise ValueError(f"Cannot shard by {by!r}, expected one of {SHARD_BY}")
+
+    cells = itertools.product(range(n_queries), range(n_date_ranges))
+    if by == "query":
+        return [cell for cell in cells if cell[0] % shards == shard]
+    return [cell for i, cell in enumerate(cells) if i % shards == shard]
+
+
+def grid_fingerprint(
+    queries: Sequence[QueryComponent],
+    date_ranges: DATE_RANGE_TYPE,
+    sortby: SortBy = SortBy.RELEVANCE,
+    scope: DocumentType = DocumentType.ALL,
+    limit: int = 10,
+    rerank_threshold: Optional[float] = None,
+) -> str:
+    """
+    Compute a stable fingerprint of a whole search grid, to check that the
+    shards being merged were searched from the same run.
+
+    Args:
+        queries (Sequence[QueryComponent]): The queries of the grid.
+        date_ranges (DATE_RANGE_TYPE): The date ranges of the grid, normalized
+            and sorted as `run_search` does.
+        sortby (SortBy): The sorting criterion for the search results.
+        scope (DocumentType): The scope of the documents to include.
+        limit (int): The maximum number of documents to return per search.
+        rerank_threshold (Optional[float]): The reranking threshold.
+    Returns:
+        str: A hexadecimal SHA-256 digest.
+    """
+    parameters = [getattr(scope, "value", scope), getattr(sortby, "value", sortby)]
+    parameters += [limit, rerank_threshold]
+    digest = hashlib.sha256(json.dumps(parameters).encode("utf-8"))
+    # Hash the serialization of each query and date range, one per line
+    for date_range in date_ranges:
+        digest.update(f"\n{canonical_date_range(date_range)}".encode("utf-8"))
+    for query in queries:
+        digest.update(f"\n{canonical_query(query)}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def run_search_shard(
+    queries: List[QueryComponent],
+    date_ranges: DATE_RANGE_TYPE,
+    shards: int,
+    shard: int,
+    path: str,
+    by: str = "cell",
+    sortby: SortBy = SortBy.RELEVANCE,
+    scope: DocumentType = DocumentType.ALL,
+    limit: int = 10,
+    rerank_threshold: Optional[float] = None,
+    **kwargs,
+) -> List[FailedQuery]:
+    """
+    Search the cells of one shard of the query x date range grid and write
+    their results to a file.
+
+    Every shard of a run must be given the same queries, date ranges and
+    search parameters. The file is written under a temporary name and only
+    moved to `path` once the shard has completed, so an interrupted shard
+    never leaves an incomplete file at `path`; pass a `journal` (see
+    `SearchJournal`) to resume it. Failed searches are recorded as such and
+    count as failed searches once merged, as in `run_search`.
+
+    Args:
+        queries (List[QueryComponent]): The queries of the whole grid.
+        date_ranges (DATE_RANGE_TYPE): The date ranges of the whole grid.
+        shards (int): The number of shards of the run.
+        shard (int): The index of the shard to search, from 0 to `shards` - 1.
+        path (str): Path of the result file of the shard.
+        by (str): How cells are assigned to shards, see `shard_cells`.
+        sortby (SortBy): The sorting criterion for the search results.
+        scope (DocumentType): The scope of the documents to include.
+        limit (int): The maximum number of documents to return per search.
+        rerank_threshold (Optional[float]): The threshold for reranking the search results.
+        kwargs (dict): Additional arguments for `SearchManager` and its
+            `iter_cells` method, such as `rpm`, `max_workers` or `journal`.
+    Returns:
+        List[FailedQuery]: The searches of the shard that failed after all retries.
+    """
+    date_ranges = normalize_date_range(date_ranges)
+    date_ranges.sort(key=lambda x: x[0])
+    cells = shard_cells(len(queries), len(date_ranges), shards, shard, by)
+    positions = {
+        (queries[query], date_ranges[date_range]): (query, date_range)
+        for query, date_range in cells
+    }
+    header = {
+        "grid": grid_fingerprint(
+            queries, date_ranges, sortby, scope, limit, rerank_threshold
+        ),
+        "shards": shards,
+        "shard": shard,
+        "by": by,
+        "queries": len(queries),
+        "date_ranges": len(date_ranges),
+        "cells": len(cells),
+    }
+    logging.info(f"Searching {len(cells)} cells of shard {shard} of {shards}")
+
+    manager_kwargs, kwargs = split_manager_kwargs(kwargs)
+    _start_search_trace(date_ranges, scope, rerank_threshold, kwargs)
+    execution_result = "error"
+    partial_path = f"{path}.partial"
+    try:
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        manager = SearchManager(**manager_kwargs)
+        with open(partial_path, "w") as shard_file:
+            shard_file.write(json.dumps(header) + "\n")
+            for query, date_range, documents in manager.iter_cells(
+                list(positions),
+                sortby=sortby,
+                scope=scope,
+                limit=limit,
+                rerank_threshold=rerank_threshold,
+                **kwargs,
+            ):
+                query_index, date_index = positions[(query, date_range)]
+                line = {
+                    "query": query_index,
+                    "date_range": date_index,
+                    "documents": (
+                        [document.model_dump(mode="json") for document in documents]
+                        if documents is not None
+                        else None
+                    ),
+                }
+                shard_file.write(json.dumps(line, separators=(",", ":")) + "\n")
+        os.replace(partial_path, path)
+        execution_result = "success"
+    finally:
+        _finish_search_trace(kwargs, execution_result)
+
+    if manager.failed_queries:
+        logging.warning(
+            f"{len(manager.failed_queries)} searches of shard {shard} failed"
+        )
+    return manager.failed_queries
+
+
+def merge_shards(
+    paths: Sequence[str], queries: Optional[Sequence[QueryComponent]] = None
+) -> ChunkTable:
+    """
+    Merge the result files of all the shards of a run into a single table.
+
+    Cells are laid out in the order of the query x date range grid and chunks
+    returned by several searches are de-duplicated as in a single run, so the
+    table is the one `run_search(as_chunk_table=True)` returns for the whole
+    grid, whatever the number of shards.
+
+    Args:
+        paths (Sequence[str]): The files written by `run_search_shard`, one
+            per shard, in any order.
+        queries (Optional[Sequence[QueryComponent]]): The queries of the grid,
+            to record which queries matched each chunk (see
+            `ChunkTable.chunk_queries`). Defaults to None.
+    Returns:
+        ChunkTable: The chunks of all the search results.
+    Raises:
+        ValueError: If the files are not the complete set of shards of a
+            single run.
+    """
+    headers = [_read_header(path) for path in paths]
+    if not headers:
+        raise ValueError("No shards to merge")
+
+    first = headers[0]
+    for path, header in zip(paths, headers):
+        if header["grid"] != first["grid"] or header["shards"] != first["shards"]:
+            raise ValueError(f"Shard {path} belongs to a different run")
+    shards = sorted(header["shard"] for header in headers)
+    if shards != list(range(first["shards"])):
+        missing = sorted(set(range(first["shards"])) - set(shards))
+        raise ValueError(
+            f"Expected shards 0 to {first['shards'] - 1} once each, "
+            f"missing {missing} and got {shards}"
+        )
+    if queries is not None and len(queries) != first["queries"]:
+        raise ValueError(
+            f"Got {len(queries)} queries for a grid of {first['queries']} queries"
+        )
+
+    builder = ChunkTableBuilder()
+    cells = 0
+    for path in paths:
+        for query_index, date_index, documents in _read_cells(path):
+            query = queries[query_index] if queries is not None else None
+            builder.add(documents, (query_index, date_index), query)
+            cells += 1
+    expected = first["queries"] * first["date_ranges"]
+    if cells != expected:
+        raise ValueError(f"The shards hold {cells} searches instead of {expected}")
+
+    logging.debug(f"Skipped {builder.duplicates} duplicate chunks")
+    return builder.build()
+
+
+def _read_header(path: str) -> dict:
+    """Read the first line of a shard file."""
+    with open(path) as shard_file:
+        return json.loads(shard_file.readline())
+
+
+def _read_cells(
+    path: str,
+) -> Iterator[Tuple[int, int, Optional[List[Document]]]]:
+    """Read the searches of a shard file, one at a time."""
+    with open(path) as shard_file:
+        shard_file.readline()
+        for line in shard_file:
+            cell = json.loads(line)
+            documents = cell["documents"]
+            if documents is not None:
+                documents = [
+                    Document.model_validate(document) for document in documents
+                ]
+            yield cell["query"], cell["date_range"], documents
@@ -32,8 +32,10 @@ class Trace:
     workflow_start_date: datetime = None
     workflow_end_date: datetime = None
     workflow_usage: str = None
+    search_concurrency: int = None
 
     _query_units_queue: Queue = Queue()  # To protect against concurrent access issues
+    _cache_lookups_queue: Queue = dataclasses.field(default_factory=Queue)
 
     @staticmethod
     def get_time_now():
@@ -43,6 +45,18 @@ class Trace:
     def add_query_units(self, query_units: int):
         self._query_units_queue.put(query_units)
 
+    def add_cache_lookup(self, hit: bool):
+        """Record a search cache lookup, either a hit or a miss."""
+        self._cache_lookups_queue.put(hit)
+
+    @property
+    def cache_hits(self) -> int:
+        return sum(self._cache_lookups_queue.queue)
+
+    @property
+    def cache_misses(self) -> int:
+        return self._cache_lookups_queue.qsize() - self.cache_hits
+
     def to_trace_event(self):
         return tracking_services.TraceEvent(
             event_name=self.event_name.value,
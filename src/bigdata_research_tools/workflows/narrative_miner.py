@@ -2,7 +2,7 @@ from logging import Logger, getLogger
 from typing import Dict, List, Optional
 
 from bigdata_client.models.search import DocumentType
-from bigdata_research_tools.client import init_bigdata_client
+from bigdata_research_tools.client import bigdata_connection
 from pandas import merge
 from bigdata_research_tools.tracing import Trace, TraceEventNames, send_trace
 
@@ -79,7 +79,7 @@ class NarrativeMiner:
                 "Consider installing them to save the Narrative Miner result into the "
                 f"path `{export_path}`."
             )
-        bigdata_client = init_bigdata_client()
+        bigdata_client = bigdata_connection()
         current_trace = Trace(
             event_name=TraceEventNames.NARRATIVE_MINER,
             document_type=self.document_type,
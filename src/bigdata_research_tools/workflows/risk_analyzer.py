@@ -3,7 +3,7 @@ from typing import Dict, List, Optional, Tuple
 
 from bigdata_client.models.entities import Company
 from bigdata_client.models.search import DocumentType
-from bigdata_research_tools.client import init_bigdata_client
+from bigdata_research_tools.client import bigdata_connection
 from pandas import DataFrame, merge
 from bigdata_research_tools.portfolio.motivation import Motivation
 from bigdata_research_tools.tracing import Trace, TraceEventNames, send_trace
@@ -281,7 +281,7 @@ class RiskAnalyzer:
                 f"path `{export_path}`."
             )
         
-        bigdata_client = init_bigdata_client()
+        bigdata_client = bigdata_connection()
         current_trace = Trace(
             event_name=TraceEventNames.RISK_ANALYZER,
             document_type=self.document_type,
@@ -3,7 +3,7 @@ from typing import Dict, List, Optional, Tuple
 
 from bigdata_client.models.entities import Company
 from bigdata_client.models.search import DocumentType
-from bigdata_research_tools.client import init_bigdata_client
+from bigdata_research_tools.client import bigdata_connection
 from pandas import DataFrame, merge
 from bigdata_research_tools.portfolio.motivation import Motivation
 from bigdata_research_tools.tracing import Trace, TraceEventNames, send_trace
@@ -107,7 +107,7 @@ class ThematicScreener:
                 "Consider installing them to save the Thematic Screener result into the "
                 f"path `{export_path}`."
             )
-        bigdata_client = init_bigdata_client()
+        bigdata_client = bigdata_connection()
         current_trace = Trace(
             event_name=TraceEventNames.THEMATIC_SCREENER,
             document_type=self.document_type,
@@ -0,0 +1,10 @@
+import pytest
+from bigdata_research_tools.search.rate_limiter import set_shared_rate_limiter
+
+
+@pytest.fixture(autouse=True)
+def shared_rate_limiter():
+    """Give each test a full bucket of the rate limiter shared by the process."""
+    set_shared_rate_limiter(None)
+    yield
+    set_shared_rate_limiter(None)
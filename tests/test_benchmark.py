@@ -0,0 +1,51 @@
+from bigdata_research_tools.benchmark import (
+    BenchmarkConfig,
+    BenchmarkScenario,
+    compare_baselines,
+    load_baseline,
+    run_benchmark,
+    save_baseline,
+)
+from bigdata_research_tools.fake_bigdata import FakeBackendConfig, FakeCorpusConfig
+
+CONFIG = BenchmarkConfig(
+    corpus=FakeCorpusConfig(documents=300, companies=20),
+    backend=FakeBackendConfig(),
+    max_workers=4,
+)
+
+
+def test_scenario_reports_searches_and_rows(tmp_path):
+    results = run_benchmark([BenchmarkScenario(10, 3, 2)], CONFIG, isolate=False)
+
+    result = results[0]
+    assert result.scenario == "10c-3d-2s"
+    assert result.searches == 2 * 3 and result.failed_searches == 0
+    assert result.queries_per_second > 0
+    assert result.latency_p50 <= result.latency_p95 <= result.latency_p99
+    assert result.rows > 0
+
+    path = str(tmp_path / "baseline.json")
+    baseline = save_baseline(results, path, CONFIG)
+    assert load_baseline(path)["results"] == baseline["results"]
+    assert compare_baselines(baseline, baseline) == []
+
+
+def test_regressions_are_reported():
+    baseline = {
+        "results": [
+            {"scenario": "s", "rows": 10, "queries_per_second": 100.0},
+            {"scenario": "t", "rows": 10, "processing_seconds": 0.01},
+        ]
+    }
+    current = {
+        "results": [
+            {"scenario": "s", "rows": 9, "queries_per_second": 50.0},
+            {"scenario": "t", "rows": 10, "processing_seconds": 0.03},
+        ]
+    }
+
+    regressions = compare_baselines(baseline, current)
+    assert len(regressions) == 2
+    assert regressions[0].startswith("s: rows changed")
+    assert "queries_per_second" in regressions[1]
@@ -0,0 +1,59 @@
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from bigdata_research_tools import client
+from bigdata_research_tools.search.search import SearchManager
+
+
+@pytest.fixture(autouse=True)
+def empty_pool(monkeypatch):
+    monkeypatch.setattr(client, "_bigdata_clients", {})
+    monkeypatch.setenv("BIGDATA_USERNAME", "user")
+    monkeypatch.setenv("BIGDATA_PASSWORD", "password")
+
+
+def slow_init(user=None, password=None):
+    time.sleep(0.05)
+    return MagicMock(name=f"Bigdata({user})")
+
+
+def test_connection_is_authenticated_once_across_threads():
+    with patch.object(client, "init_bigdata_client", side_effect=slow_init) as init:
+        clients = []
+        threads = [
+            threading.Thread(target=lambda: clients.append(client.bigdata_connection()))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert init.call_count == 1
+    assert all(c is clients[0] for c in clients)
+
+
+def test_connections_are_keyed_by_credentials():
+    with patch.object(client, "init_bigdata_client", side_effect=slow_init) as init:
+        default = client.bigdata_connection()
+        assert client.bigdata_connection("user", "password") is default
+        assert client.bigdata_connection("other", "secret") is not default
+    assert init.call_count == 2
+
+
+def test_registered_client_is_shared():
+    bigdata = MagicMock()
+    client.set_bigdata_connection(bigdata)
+    with patch.object(client, "init_bigdata_client") as init:
+        assert client.bigdata_connection() is bigdata
+        assert SearchManager().bigdata is bigdata
+    init.assert_not_called()
+
+
+def test_search_manager_honours_bigdata_client():
+    bigdata = MagicMock()
+    with patch.object(client, "init_bigdata_client") as init:
+        assert SearchManager(bigdata_client=bigdata).bigdata is bigdata
+    init.assert_not_called()
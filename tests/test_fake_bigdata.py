@@ -0,0 +1,133 @@
+import pytest
+from bigdata_client.query import Any, Entity, Similarity
+from bigdata_research_tools import client
+from bigdata_research_tools.fake_bigdata import (
+    FakeBackendConfig,
+    FakeBigdata,
+    FakeCorpus,
+    FakeCorpusConfig,
+    use_fake_bigdata,
+)
+from bigdata_research_tools.search.entity_resolver import get_entity_resolver
+from bigdata_research_tools.search.rate_limiter import (
+    RateLimiter,
+    set_shared_rate_limiter,
+)
+from bigdata_research_tools.search.retry import RetryPolicy
+from bigdata_research_tools.search.search import run_search
+from bigdata_research_tools.search.search_utils import filter_search_results
+from bigdata_research_tools.tracing import Trace
+
+CORPUS = FakeCorpus(FakeCorpusConfig(documents=500, companies=50, seed=1))
+DATE_RANGES = [
+    ("2021-01-01 00:00:00", "2021-12-31 23:59:59"),
+    ("2022-01-01 00:00:00", "2022-12-31 23:59:59"),
+]
+
+
+@pytest.fixture(autouse=True)
+def restore_factory(monkeypatch):
+    monkeypatch.setattr(client, "_bigdata_clients", {})
+    yield
+    client.set_bigdata_client_factory(None)
+
+
+def company_query(*companies):
+    return Similarity("AI") & Any([Entity(company.id) for company in companies])
+
+
+def test_searches_match_entities_and_date_ranges():
+    companies = CORPUS.companies[:2]
+    results = run_search(
+        [company_query(*companies)],
+        date_ranges=DATE_RANGES,
+        limit=5,
+        bigdata=FakeBigdata(CORPUS),
+        current_trace=Trace(),
+    )
+
+    assert [len(documents) for documents in results] == [5, 5]
+    for documents, (start, _) in zip(results, DATE_RANGES):
+        for document in documents:
+            assert document.timestamp.year == int(start[:4])
+            for chunk in document.chunks:
+                keys = {entity.key for entity in chunk.entities}
+                assert keys & {company.id for company in companies}
+
+
+def test_searches_are_reproducible():
+    query = company_query(CORPUS.companies[3])
+    first, second = (
+        run_search(
+            [query],
+            date_ranges=DATE_RANGES,
+            bigdata=FakeBigdata(CORPUS),
+            current_trace=Trace(),
+        )
+        for _ in range(2)
+    )
+    assert [[d.id for d in documents] for documents in first] == [
+        [d.id for d in documents] for documents in second
+    ]
+
+
+def test_errors_and_throttling_are_injected():
+    backend = FakeBigdata(CORPUS, FakeBackendConfig(error_rate=1.0))
+    _, failed = run_search(
+        [company_query(CORPUS.companies[0])],
+        date_ranges=DATE_RANGES,
+        bigdata=backend,
+        retry_policy=RetryPolicy(max_retries=1, base_delay=0),
+        return_failed=True,
+        current_trace=Trace(),
+    )
+    assert len(failed) == 2 and backend.stats.errors == 4
+
+    backend = FakeBigdata(CORPUS, FakeBackendConfig(rpm=1))
+    _, failed = run_search(
+        [company_query(CORPUS.companies[0])],
+        date_ranges=DATE_RANGES,
+        bigdata=backend,
+        retry_policy=RetryPolicy(max_retries=0),
+        return_failed=True,
+        max_workers=1,
+        current_trace=Trace(),
+    )
+    assert len(failed) == 1 and backend.stats.throttled == 1
+
+
+def test_installed_backend_answers_knowledge_graph_lookups():
+    backend = use_fake_bigdata(corpus=CORPUS)
+    assert client.bigdata_connection() is backend
+
+    results = run_search(
+        [company_query(CORPUS.companies[0])],
+        date_ranges=DATE_RANGES,
+        current_trace=Trace(),
+    )
+    documents, entities = filter_search_results(results)
+
+    assert documents and backend.stats.searches == 2
+    assert CORPUS.companies[0] in entities
+    assert backend.knowledge_graph.find_companies("Company 0007") == [
+        CORPUS.companies[7]
+    ]
+
+
+def test_searches_and_lookups_share_one_rate_limiter():
+    limiter = RateLimiter(rpm=6000)
+    set_shared_rate_limiter(limiter)
+    backend = use_fake_bigdata(corpus=CORPUS)
+
+    companies = get_entity_resolver().resolve(["Company 0007"], Entity)
+    results = run_search(
+        [company_query(*CORPUS.companies[:3])] + [Similarity("AI") & companies[0]],
+        date_ranges=DATE_RANGES,
+        current_trace=Trace(),
+    )
+    filter_search_results(results)
+
+    assert backend.stats.searches == 4 and backend.stats.kg_lookups > 1
+    assert limiter.stats.tokens_consumed == (
+        backend.stats.searches + backend.stats.kg_lookups
+    )
@@ -0,0 +1,141 @@
+import datetime
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+from bigdata_client.document import Document
+from bigdata_client.models.entities import Person
+from bigdata_research_tools import client
+from bigdata_research_tools.search.chunk_table import ChunkTable
+from bigdata_research_tools.search.entity_resolver import set_entity_resolver
+
+DATE_RANGES = [
+    ("2024-01-01 00:00:00", "2024-01-31 23:59:59"),
+    ("2024-02-01 00:00:00", "2024-02-29 23:59:59"),
+]
+APPLE = SimpleNamespace(
+    id="D8442A",
+    name="Apple Inc.",
+    ticker="AAPL",
+    sector="Technology",
+    industry="Hardware",
+    country="United States",
+    country_code="US",
+    entity_type="COMP",
+)
+MICROSOFT = SimpleNamespace(id="228D42", name="Microsoft Corp.", ticker="MSFT")
+ELON = Person(id="9A8B7C", name="Elon Musk")
+
+
+def _make_document(doc_id="D1"):
+    return Document(
+        id=doc_id,
+        headline="Headline",
+        sentiment=0.1,
+        document_scope="news",
+        source={"key": "S1", "name": "Source", "rank": 1},
+        timestamp=datetime.datetime(2024, 1, 1, 12),
+        chunks=[
+            {
+                "text": "Apple expands in AI",
+                "chunk": 0,
+                "entities": [
+                    {"key": "D8442A", "start": 0, "end": 5, "query_type": "entity"}
+                ],
+                "sentences": [{"paragraph": 0, "sentence": 0}],
+                "relevance": 0.5,
+                "sentiment": 0.0,
+                "section_metadata": None,
+                "speaker": None,
+            }
+        ],
+        language="en",
+    )
+
+
+def _make_bigdata(fail_on=()):
+    """Bigdata mock returning one document per search, named after the query."""
+    bigdata = MagicMock()
+
+    def new(query, **kwargs):
+        sentence = query.to_dict()["value"][0]
+        if sentence in fail_on:
+            raise ValueError("interrupted")
+        search = MagicMock()
+        search.run.return_value = [_make_document(sentence)]
+        search.get_usage.return_value = 1
+        return search
+
+    bigdata.search.new.side_effect = new
+    return bigdata
+
+
+def _make_table():
+    documents = [_make_document("A"), _make_document("B"), _make_document("C")]
+    # An unknown entity before Microsoft and Apple
+    documents[1].chunks[0].text = "Zeta, Microsoft and Apple"
+    mention = documents[1].chunks[0].entities[0]
+    documents[1].chunks[0].entities = [
+        mention.model_copy(update={"key": "UNKNOWN", "start": 0, "end": 4}),
+        mention.model_copy(update={"key": "228D42", "start": 6, "end": 15}),
+        mention.model_copy(update={"start": 20, "end": 25}),
+    ]
+    documents[2].chunks[0].entities = []
+    for document in documents:
+        document.reporting_entities = ["228D42"]
+    return documents, ChunkTable.from_documents(documents)
+
+
+@pytest.fixture
+def make_document():
+    """Factory of news documents with one chunk mentioning Apple."""
+    return _make_document
+
+
+@pytest.fixture
+def make_bigdata():
+    """Factory of Bigdata mocks returning one document per search."""
+    return _make_bigdata
+
+
+@pytest.fixture
+def date_ranges():
+    return list(DATE_RANGES)
+
+
+@pytest.fixture
+def apple():
+    return APPLE
+
+
+@pytest.fixture
+def microsoft():
+    return MICROSOFT
+
+
+@pytest.fixture
+def elon():
+    return ELON
+
+
+@pytest.fixture
+def make_table():
+    """Factory of three documents mentioning Apple, Microsoft and an unknown
+    entity, and their chunk table."""
+    return _make_table
+
+
+@pytest.fixture
+def knowledge_graph(monkeypatch):
+    """Knowledge graph mock matching company names 'Company <id>' and Elon Musk."""
+    bigdata = MagicMock()
+    bigdata.knowledge_graph.find_companies.side_effect = lambda name: (
+        [MagicMock(id=name.split()[-1])] if name.startswith("Company") else []
+    )
+    bigdata.knowledge_graph.find_people.side_effect = lambda name: (
+        [ELON] if name == "Elon Musk" else []
+    )
+    monkeypatch.setattr(client, "_bigdata_clients", {})
+    client.set_bigdata_connection(bigdata)
+    yield bigdata.knowledge_graph
+    set_entity_resolver(None)
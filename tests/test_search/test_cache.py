@@ -0,0 +1,82 @@
+import time
+from unittest.mock import MagicMock
+
+from bigdata_client.models.search import DocumentType, SortBy
+from bigdata_client.query import Entity, Similarity
+from bigdata_research_tools.search.cache import SearchCache, search_fingerprint
+from bigdata_research_tools.search.search import SearchManager
+from bigdata_research_tools.tracing import Trace, TraceEventNames
+
+
+def fingerprint(query, date_range=("2024-01-01 00:00:00", "2024-01-31 23:59:59")):
+    return search_fingerprint(
+        query, date_range, DocumentType.NEWS, SortBy.RELEVANCE, 10, None
+    )
+
+
+def test_fingerprint_is_stable_and_discriminating():
+    query = Similarity("AI spending") & Entity("D8442A")
+    assert fingerprint(query) == fingerprint(
+        Similarity("AI spending") & Entity("D8442A")
+    )
+    assert fingerprint(query) != fingerprint(Similarity("AI spending"))
+    assert fingerprint(query) != fingerprint(
+        query, ("2024-02-01 00:00:00", "2024-02-29 23:59:59")
+    )
+
+
+def test_cache_round_trip_and_ttl(make_document, tmp_path):
+    cache = SearchCache(str(tmp_path / "cache.db"), ttl=0.2)
+    cache.set("key", [make_document()])
+    documents = cache.get("key")
+    assert documents == [make_document()]
+    time.sleep(0.3)
+    assert cache.get("key") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cache_evicts_least_recently_used(make_document, tmp_path):
+    cache = SearchCache(str(tmp_path / "cache.db"))
+    cache.set("a", [make_document("A")])
+    cache.set("b", [make_document("B")])
+    cache.get("a")
+    cache.max_size = cache._connection.execute(
+        "SELECT MAX(size) FROM search_results"
+    ).fetchone()[0]
+    cache.set("c", [make_document("C")])
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+    assert len(cache) == 1
+
+
+def test_search_manager_serves_hits_from_cache(make_document, tmp_path):
+    bigdata = MagicMock()
+    bigdata.search.new.return_value.run.return_value = [make_document()]
+    bigdata.search.new.return_value.get_usage.return_value = 1
+    cache = SearchCache(str(tmp_path / "cache.db"))
+    trace = Trace()
+    manager = SearchManager(bigdata=bigdata, cache=cache)
+    queries = [Similarity("AI spending")]
+    date_ranges = [("2024-01-01 00:00:00", "2024-01-31 23:59:59")]
+
+    first = manager.concurrent_search(queries, date_ranges, current_trace=trace)
+    second = manager.concurrent_search(queries, date_ranges, current_trace=trace)
+
+    assert list(first.values()) == list(second.values())
+    assert bigdata.search.new.call_count == 1
+    assert (trace.cache_hits, trace.cache_misses) == (1, 1)
+
+
+def test_cache_lookups_stay_out_of_the_trace_event():
+    now = Trace.get_time_now()
+    trace = Trace(
+        event_name=TraceEventNames.RUN_SEARCH,
+        workflow_start_date=now,
+        workflow_end_date=now,
+        search_concurrency=4,
+    )
+    trace.add_cache_lookup(True)
+
+    properties = trace.to_trace_event().properties
+    assert trace.cache_hits == 1
+    assert not {"cacheHits", "cacheMisses", "searchConcurrency"} & set(properties)
@@ -0,0 +1,166 @@
+import pytest
+from bigdata_client.models.search import DocumentType
+from bigdata_client.query import Similarity
+from bigdata_research_tools.search.chunk_table import ChunkTable, ChunkTableBuilder
+from bigdata_research_tools.search.narrative_search import _process_narrative_search
+from bigdata_research_tools.search.screener_search import (
+    process_screener_search_results,
+)
+from bigdata_research_tools.search.search import SearchManager, run_search
+from bigdata_research_tools.tracing import Trace
+from pandas.testing import assert_frame_equal
+
+
+@pytest.fixture
+def make_documents(make_document):
+    def make():
+        documents = [make_document("A"), make_document("B")]
+        documents[1].chunks[0].text = "Apple and Apple again"
+        documents[1].chunks[0].chunk = 3
+        return documents
+
+    return make
+
+
+def test_builder_lays_out_batches_by_position(make_document):
+    builder = ChunkTableBuilder()
+    builder.add([make_document("B")], position=(1, 0))
+    builder.add(None, position=(0, 1))
+    builder.add([make_document("A"), make_document("C")], position=(0, 0))
+    table = builder.build()
+
+    assert table.document_ids.tolist() == ["A", "C", "B"]
+    assert table.document_count == 3 and len(table) == 3
+    assert builder.failed == 1
+    assert list(table.document_chunks(2)) == [2]
+    assert table.chunk_mentions(1) == [("D8442A", 0, 5)]
+    assert table.collect_entity_keys() == ["D8442A"]
+
+
+def test_empty_table():
+    table = ChunkTableBuilder().build()
+    assert len(table) == 0
+    assert list(table.iter_chunks()) == []
+    assert table.collect_entity_keys() == []
+
+
+def test_run_search_returns_chunk_table_in_grid_order(make_bigdata, date_ranges):
+    bigdata = make_bigdata()
+    queries = [Similarity("q1"), Similarity("q2")]
+    table = run_search(
+        queries,
+        date_ranges=date_ranges,
+        bigdata=bigdata,
+        as_chunk_table=True,
+        current_trace=Trace(),
+    )
+
+    assert isinstance(table, ChunkTable)
+    # Each query returns the same chunk for both date ranges
+    assert table.document_ids.tolist() == ["q1", "q2"]
+    assert table.chunk_queries(0) == [queries[0]]
+    assert table.chunk_sentences(1) == ["q2"]
+
+
+def test_run_search_streams_lazy_queries_into_the_same_table(make_bigdata, date_ranges):
+    sentences = ["q1", "q2", "q3"]
+    tables = [
+        run_search(
+            queries,
+            date_ranges=date_ranges,
+            bigdata=make_bigdata(),
+            as_chunk_table=True,
+            current_trace=Trace(),
+        )
+        for queries in (
+            [Similarity(sentence) for sentence in sentences],
+            (Similarity(sentence) for sentence in sentences),
+        )
+    ]
+
+    assert tables[1].document_ids.tolist() == tables[0].document_ids.tolist()
+    assert tables[1].chunk_sentences(2) == ["q3"]
+
+
+def test_chunk_table_search_draws_queries_lazily(make_bigdata, date_ranges):
+    bigdata = make_bigdata()
+    search, drawn, drawn_at_search = bigdata.search.new.side_effect, [], []
+
+    def new(query, **kwargs):
+        drawn_at_search.append(len(drawn))
+        return search(query, **kwargs)
+
+    def queries():
+        for i in range(10):
+            drawn.append(i)
+            yield Similarity(f"q{i}")
+
+    bigdata.search.new.side_effect = new
+    table = SearchManager(bigdata=bigdata).chunk_table_search(
+        queries(), date_ranges, max_workers=1, max_pending=2
+    )
+
+    # Searching starts before the queries are exhausted
+    assert drawn_at_search[0] <= 2
+    assert len(drawn_at_search) == 20
+    assert table.document_ids.tolist() == [f"q{i}" for i in range(10)]
+
+
+def test_duplicate_chunks_are_stored_once_with_provenance(make_document):
+    first, second = Similarity("AI spending"), Similarity("Data centers")
+    builder = ChunkTableBuilder()
+    # The higher batch completes first: its copy of A-0 is dropped
+    builder.add([make_document("A"), make_document("B")], (1, 0), second)
+    builder.add([make_document("A")], (0, 0), first)
+    builder.add([make_document("B")], (2, 0), first)
+    table = builder.build()
+
+    assert builder.duplicates == 2
+    assert table.document_ids.tolist() == ["A", "B"]
+    assert table.mention_offsets.tolist() == [0, 1, 2]
+    assert table.chunk_queries(0) == [second, first]
+    assert table.chunk_sentences(0) == ["Data centers", "AI spending"]
+    assert table.chunk_queries(1) == [second, first]
+
+
+def test_duplicate_documents_keep_distinct_chunks(make_document):
+    other_chunk = make_document("A")
+    other_chunk.chunks[0].chunk = 1
+    table = ChunkTable.from_documents(
+        [make_document("A"), other_chunk, make_document("A")]
+    )
+
+    assert table.document_ids.tolist() == ["A", "A"]
+    assert table.chunk_index.tolist() == [0, 1]
+    assert table.chunk_queries(0) == []
+
+
+def test_screener_rows_match_document_input(apple, make_documents):
+    documents = make_documents()
+    expected = process_screener_search_results(
+        documents, [apple], document_type=DocumentType.NEWS
+    )
+    actual = process_screener_search_results(
+        ChunkTable.from_documents(documents),
+        [apple],
+        document_type=DocumentType.NEWS,
+    )
+
+    assert_frame_equal(actual, expected)
+    assert actual["sentence_id"].tolist() == ["A-0", "B-3"]
+
+
+def test_screener_rows_skip_duplicate_documents(apple, make_documents):
+    documents = make_documents()
+    expected = process_screener_search_results(documents, [apple])
+    actual = process_screener_search_results(documents + make_documents(), [apple])
+
+    assert_frame_equal(actual, expected)
+
+
+def test_narrative_rows_match_document_input(apple, make_documents):
+    documents = make_documents()
+    expected = _process_narrative_search(documents, [apple])
+    actual = _process_narrative_search(ChunkTable.from_documents(documents), [apple])
+
+    assert_frame_equal(actual, expected)
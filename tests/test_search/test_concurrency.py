@@ -0,0 +1,113 @@
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+from bigdata_client.query import Similarity
+from bigdata_research_tools.search.concurrency import AdaptiveConcurrency
+from bigdata_research_tools.search.search import SearchManager, run_search
+from bigdata_research_tools.tracing import Trace
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def run_rounds(controller, clock, rounds, latency):
+    """Complete `rounds` rounds with all slots busy and a fixed latency."""
+    for _ in range(rounds):
+        clock.now += latency
+        for _ in range(controller.limit):
+            controller.record_success(latency)
+
+
+def test_grows_while_throughput_rises():
+    clock = FakeClock()
+    with patch("bigdata_research_tools.search.concurrency.time.monotonic", clock):
+        controller = AdaptiveConcurrency(initial=2, max_concurrency=6)
+        run_rounds(controller, clock, rounds=10, latency=1.0)
+
+        report = controller.report
+    assert controller.limit == 6
+    assert (report.initial, report.peak, report.final) == (2, 6, 6)
+
+
+def test_holds_when_latency_rises():
+    clock = FakeClock()
+    with patch("bigdata_research_tools.search.concurrency.time.monotonic", clock):
+        controller = AdaptiveConcurrency(initial=2, max_concurrency=10)
+        run_rounds(controller, clock, rounds=1, latency=1.0)
+        limit = controller.limit
+        run_rounds(controller, clock, rounds=5, latency=3.0)
+    assert controller.limit == limit
+
+
+def test_backs_off_once_per_round():
+    controller = AdaptiveConcurrency(initial=8, max_concurrency=8)
+    for _ in range(4):
+        controller.record_failure()
+    assert controller.limit == 4
+    # The next round of 4 completions may back off again
+    controller.record_failure()
+    assert controller.limit == 2
+    assert controller.report.decreases == 2
+
+    for _ in range(10):
+        controller.record_failure()
+    assert controller.limit == 1
+
+
+def test_search_manager_bounds_in_flight_searches():
+    in_flight, peak = [0], [0]
+    lock = threading.Lock()
+    bigdata = MagicMock()
+
+    def run(limit):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.005)
+        with lock:
+            in_flight[0] -= 1
+        return []
+
+    bigdata.search.new.return_value.run.side_effect = run
+    bigdata.search.new.return_value.get_usage.return_value = 1
+    controller = AdaptiveConcurrency(initial=1, max_concurrency=3)
+    manager = SearchManager(bigdata=bigdata, concurrency=controller)
+    queries = [Similarity(f"sentence {i}") for i in range(20)]
+
+    results = manager.concurrent_search(queries, [("2024-01-01", "2024-01-31")])
+
+    assert len(results) == 20
+    assert peak[0] <= 3
+    assert controller.report.searches == 20
+
+
+def test_run_search_reports_concurrency():
+    bigdata = MagicMock()
+    bigdata.search.new.return_value.run.return_value = []
+    bigdata.search.new.return_value.get_usage.return_value = 1
+    trace = Trace()
+
+    run_search(
+        [Similarity("a")],
+        [("2024-01-01", "2024-01-31")],
+        bigdata=bigdata,
+        max_workers=3,
+        adaptive_concurrency=True,
+        current_trace=trace,
+    )
+    assert 1 <= trace.search_concurrency <= 3
+
+    run_search(
+        [Similarity("a")],
+        [("2024-01-01", "2024-01-31")],
+        bigdata=bigdata,
+        max_workers=2,
+        current_trace=trace,
+    )
+    assert trace.search_concurrency == 2
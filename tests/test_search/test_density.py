@@ -0,0 +1,124 @@
+import datetime
+
+import pytest
+from bigdata_client.query import Entity
+from bigdata_research_tools import client
+from bigdata_research_tools.fake_bigdata import (
+    FakeCorpus,
+    FakeCorpusConfig,
+    use_fake_bigdata,
+)
+from bigdata_research_tools.search.density import (
+    DensityProfile,
+    _estimate_volume,
+    probe_density,
+)
+from bigdata_research_tools.search.screener_search import search_by_companies
+from bigdata_research_tools.search.search import run_search
+from bigdata_research_tools.tracing import Trace
+
+YEAR = ("2024-01-01 00:00:00", "2024-12-31 23:59:59")
+HALVES = [
+    ("2024-01-01 00:00:00", "2024-06-30 23:59:59"),
+    ("2024-07-01 00:00:00", "2024-12-31 23:59:59"),
+]
+
+
+@pytest.fixture
+def make_documents(make_document):
+    def make(days):
+        documents = []
+        for day in days:
+            document = make_document(f"D{day}")
+            document.timestamp = datetime.datetime(2024, 1, 1) + datetime.timedelta(day)
+            documents.append(document)
+        return documents
+
+    return make
+
+
+def test_saturated_probes_are_extrapolated_from_their_time_span(make_documents):
+    assert _estimate_volume(make_documents([1, 2]), YEAR, 10) == 2
+    # 10 documents, one every 3 days, over a year
+    volume = _estimate_volume(make_documents(range(0, 30, 3)), YEAR, 10)
+    assert volume == pytest.approx(9 * 366 / 27, rel=0.01)
+    # A burst of documents is spread over at least an hour
+    assert _estimate_volume(make_documents([5] * 10), YEAR, 10) == pytest.approx(
+        9 * 366 * 24, rel=0.01
+    )
+
+
+def test_schedule_splits_dense_and_merges_sparse_date_ranges():
+    profile = DensityProfile(
+        date_ranges=HALVES,
+        volumes={"dense": [100.0, 10.0], "sparse": [3.0, 4.0], "failed": [None, 1.0]},
+    )
+    schedule = profile.schedule(document_limit=20, target_fill=0.5)
+
+    dense = schedule.windows["dense"]
+    assert len(dense) == 16 + 1
+    assert dense[0][0] == HALVES[0][0] and dense[-1] == HALVES[1]
+    assert schedule.windows["sparse"] == [YEAR]
+    assert schedule.windows["failed"] == HALVES
+    with pytest.raises(ValueError):
+        profile.schedule(document_limit=20, target_fill=0)
+
+
+def test_probed_schedule_runs_with_run_search(monkeypatch):
+    monkeypatch.setattr(client, "_bigdata_clients", {})
+    corpus = FakeCorpus(
+        FakeCorpusConfig(documents=3000, companies=100, popularity=1.2, seed=1)
+    )
+    backend = use_fake_bigdata(corpus=corpus)
+    batches = [[Entity(corpus.companies[i].id)] for i in (0, 99)]
+    try:
+        profile = probe_density(
+            [None], batches, "2021-01-01", "2021-12-31", current_trace=Trace()
+        )
+        schedule = profile.schedule(document_limit=20)
+        grid = schedule.grid([None], batches)
+        results = [
+            run_search(queries, date_ranges, limit=20, current_trace=Trace())
+            for queries, date_ranges in grid
+        ]
+    finally:
+        client.set_bigdata_client_factory(None)
+
+    assert profile.searches == 2 and profile.saturated == 1
+    popular, rare = (schedule.windows[key] for key in profile.volumes)
+    assert len(popular) > 4 and rare == [("2021-01-01 00:00:00", "2021-12-31 23:59:59")]
+    assert [len(queries) for queries, _ in grid] == [1, 1]
+    assert backend.stats.searches == 2 + len(popular) + 1
+    searched = [documents for result in results for documents in result]
+    assert sum(len(documents) >= 20 for documents in searched) <= len(searched) // 4
+
+
+def test_search_by_companies_runs_the_probed_schedule(monkeypatch):
+    monkeypatch.setattr(client, "_bigdata_clients", {})
+    corpus = FakeCorpus(
+        FakeCorpusConfig(documents=3000, companies=100, popularity=1.2, seed=1)
+    )
+    backend = use_fake_bigdata(corpus=corpus)
+    arguments = dict(
+        companies=[corpus.companies[0], corpus.companies[99]],
+        sentences=["Supply chain"],
+        start_date="2021-01-01",
+        end_date="2021-12-31",
+        freq="Y",
+        document_limit=20,
+        batch_size=1,
+    )
+    try:
+        probed = search_by_companies(
+            **arguments, density_probe=True, current_trace=Trace()
+        )
+        probe_searches = backend.stats.searches
+        fixed = search_by_companies(**arguments, current_trace=Trace())
+    finally:
+        client.set_bigdata_client_factory(None)
+
+    # 2 probes, then more date ranges for the popular company only
+    assert probe_searches > 2 + 2
+    assert backend.stats.searches - probe_searches == 2
+    assert len(probed) > len(fixed)
+    assert set(probed["entity_id"]) == set(fixed["entity_id"])
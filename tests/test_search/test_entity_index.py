@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+
+from bigdata_client.models.search import DocumentType
+from bigdata_research_tools.search.entity_index import EntityIndex
+from bigdata_research_tools.search.screener_search import (
+    process_screener_search_results,
+)
+from bigdata_research_tools.search.search_utils import build_chunk_entities
+
+
+def test_join_maps_mentions_to_entity_columns(apple, microsoft, make_table):
+    documents, table = make_table()
+    stale = SimpleNamespace(id="228D42", name="Old name")
+    index = EntityIndex([stale, apple, microsoft])
+
+    assert len(index) == 2 and "228D42" in index and "UNKNOWN" not in index
+    assert index.get("228D42") is microsoft
+    assert index.lookup(["D8442A", "UNKNOWN", "228D42"]).tolist() == [1, -1, 0]
+
+    joined = index.join(table)
+    assert joined.chunk_offsets.tolist() == [0, 1, 3, 3]
+    assert joined.column("key").tolist() == ["D8442A", "228D42", "D8442A"]
+    assert joined.column("sector").tolist() == ["Technology", None, "Technology"]
+    assert joined.records(["sector"])[0] == {
+        "key": "D8442A",
+        "sector": "Technology",
+        "start": 0,
+        "end": 5,
+    }
+    chunk_entities = build_chunk_entities(documents[1].chunks[0], index)
+    assert chunk_entities == build_chunk_entities(
+        documents[1].chunks[0], [apple, microsoft]
+    )
+    assert chunk_entities[0] == {
+        "key": "228D42",
+        "name": "Microsoft Corp.",
+        "ticker": "MSFT",
+        "country": None,
+        "country_code": None,
+        "entity_type": None,
+        "start": 6,
+        "end": 15,
+    }
+    assert list(chunk_entities[0]) == list(chunk_entities[1])
+
+
+def test_screener_rows_of_reporting_entities(apple, microsoft, make_table):
+    _, table = make_table()
+    df = process_screener_search_results(
+        table, EntityIndex([apple, microsoft]), document_type=DocumentType.TRANSCRIPTS
+    )
+
+    assert df["sentence_id"].tolist() == ["A-0", "B-0"]
+    assert df["entity_name"].tolist() == ["Microsoft Corp.", "Microsoft Corp."]
+    assert df["other_entities"].tolist() == ["Apple Inc.", "Apple Inc."]
+    assert [len(entities) for entities in df["entities"]] == [1, 2]
+
+
+def test_screener_rows_filter_the_universe_by_id(apple, microsoft, make_table):
+    _, table = make_table()
+    universe = [SimpleNamespace(id="228D42", name="Microsoft")]
+    df = process_screener_search_results(table, [apple, microsoft], universe)
+
+    assert df["entity_id"].tolist() == ["228D42"]
+    assert df["other_entities"].tolist() == ["Apple Inc."]
+    assert df["masked_text"].tolist() == ["Zeta, Target Company and Other Company_1"]
@@ -0,0 +1,166 @@
+from unittest.mock import MagicMock
+
+import pytest
+import requests as requests_lib
+from bigdata_client.models.entities import Company, Person
+from bigdata_client.models.search import DocumentType
+from bigdata_client.query import Entity, ReportingEntity
+from bigdata_research_tools import client
+from bigdata_research_tools.search.entity_resolver import (
+    EntityCache,
+    EntityResolver,
+    set_entity_resolver,
+)
+from bigdata_research_tools.search.query_builder import (
+    EntitiesToSearch,
+    build_batched_query,
+)
+from bigdata_research_tools.search.rate_limiter import get_shared_rate_limiter
+from bigdata_research_tools.search.retry import RetryPolicy
+from pydantic import BaseModel, ValidationError
+
+
+def test_names_are_resolved_once(knowledge_graph):
+    resolver = EntityResolver(cache=None)
+    names = ["Company A1", "Unknown", "Company B2", "Company A1"]
+
+    entities = resolver.resolve(names, ReportingEntity)
+    assert [entity.to_dict() for entity in entities] == [
+        ReportingEntity("A1").to_dict(),
+        ReportingEntity("B2").to_dict(),
+        ReportingEntity("A1").to_dict(),
+    ]
+    assert resolver.lookups == 3
+
+    entities = resolver.resolve(names[:2], Entity)
+    assert [entity.to_dict() for entity in entities] == [Entity("A1").to_dict()]
+    assert resolver.lookups == 3 and resolver.lru_hits == 2
+    assert resolver.resolve(["Company A1"], str) == []
+
+
+def test_lookups_persist_across_resolvers(elon, knowledge_graph, tmp_path):
+    path = str(tmp_path / "entities.db")
+    resolver = EntityResolver(cache=EntityCache(path))
+    assert resolver.resolve(["Elon Musk", "Nobody"], Person) == [elon]
+
+    resolver = EntityResolver(cache=EntityCache(path))
+    assert resolver.resolve(["Elon Musk", "Nobody"], Person) == [elon]
+    assert resolver.lookups == 0 and resolver.cache_hits == 2
+
+    resolver = EntityResolver(cache=EntityCache(path, negative_ttl=0))
+    resolver.resolve(["Elon Musk", "Nobody"], Person)
+    assert resolver.lookups == 1
+
+
+def test_batched_query_resolves_every_name_in_one_pass(knowledge_graph):
+    resolver = EntityResolver(cache=None)
+    set_entity_resolver(resolver)
+    companies = [f"Company {i}" for i in range(25)]
+
+    queries = build_batched_query(
+        sentences=["Supply chain"],
+        keywords=None,
+        entities=EntitiesToSearch(companies=companies),
+        control_entities=EntitiesToSearch(people=["Elon Musk"]),
+        sources=None,
+        batch_size=10,
+        fiscal_year=None,
+        scope=DocumentType.NEWS,
+        custom_batches=None,
+    )
+
+    assert len(queries) == 3
+    assert knowledge_graph.find_companies.call_count == 25
+    assert knowledge_graph.find_people.call_count == 1
+    assert resolver.lru_hits == 26
+
+
+def test_failed_name_lookups_are_retried_then_left_out(knowledge_graph):
+    calls = []
+
+    def find_companies(name):
+        calls.append(name)
+        if name == "Company FLAKY" and calls.count(name) == 1:
+            raise requests_lib.ConnectionError("dropped")
+        if name == "Company DOWN":
+            raise requests_lib.ConnectionError("dropped")
+        return [MagicMock(id=name.split()[-1])]
+
+    knowledge_graph.find_companies.side_effect = find_companies
+    resolver = EntityResolver(
+        cache=None, retry_policy=RetryPolicy(max_retries=1, base_delay=0)
+    )
+    assert resolver.rate_limiter is get_shared_rate_limiter()
+
+    entities = resolver.resolve(["Company FLAKY", "Company DOWN"], Entity)
+    assert [entity.to_dict() for entity in entities] == [Entity("FLAKY").to_dict()]
+    assert calls.count("Company FLAKY") == 2 and calls.count("Company DOWN") == 2
+
+    # Failed names are not remembered, so they are looked up again
+    resolver.resolve(["Company FLAKY", "Company DOWN"], Entity)
+    assert calls.count("Company FLAKY") == 2 and calls.count("Company DOWN") == 4
+
+
+class _Lookup(BaseModel):
+    entity: int
+
+
+def non_entity_error(key):
+    """The validation error raised by a lookup of the key of a source."""
+    try:
+        _Lookup.model_validate({"entity": {"key": key, "entityType": "SRCE"}})
+    except ValidationError as e:
+        return e
+
+
+@pytest.fixture
+def entity_keys(monkeypatch):
+    """Knowledge graph mock where 'SRC...' keys are sources and 'BAD...' keys fail."""
+    bigdata = MagicMock()
+    requests = []
+
+    def get_entities(keys):
+        requests.append(list(keys))
+        sources = [key for key in keys if key.startswith("SRC")]
+        if sources:
+            raise non_entity_error(sources[0])
+        if any(key.startswith("BAD") for key in keys):
+            raise requests_lib.ConnectionError("dropped")
+        return [Company(id=key, name=f"Company {key}") for key in keys]
+
+    bigdata.knowledge_graph.get_entities.side_effect = get_entities
+    monkeypatch.setattr(client, "_bigdata_clients", {})
+    client.set_bigdata_connection(bigdata)
+    yield requests
+
+
+def test_entity_keys_are_looked_up_in_concurrent_batches(entity_keys, tmp_path):
+    path = str(tmp_path / "entities.db")
+    keys = [f"K{i:05d}" for i in range(10)] + ["SRC001", "SRC002", "K00000"]
+    resolver = EntityResolver(cache=EntityCache(path), max_workers=4)
+
+    entities = resolver.look_up_keys(keys, max_batch_size=4)
+    assert [entity.id for entity in entities] == keys[:10]
+    # 3 batches of distinct keys, and 2 more requests as the sources are
+    # split out of the last one
+    assert len(entity_keys) == 5 and resolver.lookups == 12
+
+    # Entities and sources are both remembered across runs
+    resolver = EntityResolver(cache=EntityCache(path))
+    assert [entity.id for entity in resolver.look_up_keys(keys)] == keys[:10]
+    assert len(entity_keys) == 5 and resolver.cache_hits == 12
+
+
+def test_failed_entity_keys_are_retried_then_left_out(entity_keys):
+    resolver = EntityResolver(
+        cache=None, retry_policy=RetryPolicy(max_retries=2, base_delay=0)
+    )
+
+    entities = resolver.look_up_keys(["K00001", "BAD001"], max_batch_size=2)
+    assert entities == []
+    assert len(entity_keys) == 3
+
+    # Failed keys are not remembered, so they are looked up again
+    resolver.retry_policy = RetryPolicy(max_retries=0)
+    resolver.look_up_keys(["K00001", "BAD001"], max_batch_size=1)
+    assert entity_keys[3:] == [["K00001"], ["BAD001"]]
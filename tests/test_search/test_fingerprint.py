@@ -0,0 +1,72 @@
+import hashlib
+import json
+from unittest.mock import MagicMock
+
+import pytest
+from bigdata_client.daterange import AbsoluteDateRange, RollingDateRange
+from bigdata_client.models.search import DocumentType, SortBy
+from bigdata_client.query import Any, Entity, Similarity
+from bigdata_research_tools.search.fingerprint import (
+    canonical_query,
+    date_range_key,
+    query_fingerprint,
+    search_fingerprint,
+)
+
+QUERY = Similarity("AI spending") & Any([Entity("D8442A"), Entity("228D42")])
+
+
+@pytest.mark.parametrize(
+    "query, date_range, rerank_threshold",
+    [
+        (QUERY, ("2024-01-01 00:00:00", "2024-01-31 23:59:59"), None),
+        (QUERY, AbsoluteDateRange("2024-01-01", "2024-01-31T23:59:59"), 0.7),
+        (None, RollingDateRange.LAST_THIRTY_DAYS, None),
+    ],
+)
+def test_search_fingerprint_matches_json_of_parameters(
+    query, date_range, rerank_threshold
+):
+    if isinstance(date_range, tuple):
+        serialized_date_range = list(AbsoluteDateRange(*date_range).to_string_tuple())
+    elif isinstance(date_range, AbsoluteDateRange):
+        serialized_date_range = list(date_range.to_string_tuple())
+    else:
+        serialized_date_range = date_range.value
+    payload = {
+        "query": query.to_dict() if query is not None else None,
+        "date_range": serialized_date_range,
+        "scope": "news",
+        "sortby": "relevance",
+        "limit": 10,
+        "rerank_threshold": rerank_threshold,
+    }
+    expected = hashlib.sha256(
+        json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    ).hexdigest()
+
+    assert expected == search_fingerprint(
+        query, date_range, DocumentType.NEWS, SortBy.RELEVANCE, 10, rerank_threshold
+    )
+
+
+def test_query_serialization_is_memoized_per_object():
+    query = Similarity("AI spending") & Entity("D8442A")
+    query.to_dict = MagicMock(wraps=query.to_dict)
+
+    for _ in range(3):
+        canonical_query(query)
+    assert query.to_dict.call_count == 1
+
+    other = Similarity("AI spending") & Entity("D8442A")
+    assert query_fingerprint(query) == query_fingerprint(other)
+    assert query_fingerprint(query) != query_fingerprint(Similarity("AI spending"))
+
+
+def test_date_range_keys_are_hashable():
+    date_range = AbsoluteDateRange("2024-01-01", "2024-01-31T23:59:59")
+    key = date_range_key(date_range)
+
+    assert key == ("2024-01-01 00:00:00", "2024-01-31 23:59:59")
+    assert {key: 1}[date_range_key(("2024-01-01 00:00:00", "2024-01-31 23:59:59"))]
+    assert date_range_key(RollingDateRange.TODAY) is RollingDateRange.TODAY
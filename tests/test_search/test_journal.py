@@ -0,0 +1,59 @@
+from bigdata_client.query import Similarity
+from bigdata_research_tools.search.journal import SearchJournal
+from bigdata_research_tools.search.retry import RetryPolicy
+from bigdata_research_tools.search.search import run_search
+from bigdata_research_tools.tracing import Trace
+
+
+def test_journal_round_trip_and_reopen(make_document, tmp_path):
+    path = str(tmp_path / "run.jsonl")
+    journal = SearchJournal(path)
+    journal.append("a", [make_document("A")])
+    journal.append("b", [])
+    journal.close()
+
+    journal = SearchJournal(path)
+    assert len(journal) == 2
+    assert journal.get("a") == [make_document("A")]
+    assert journal.get("b") == []
+    assert journal.get("c") is None
+
+
+def test_journal_ignores_truncated_line(make_document, tmp_path):
+    path = tmp_path / "run.jsonl"
+    journal = SearchJournal(str(path))
+    journal.append("a", [make_document("A")])
+    journal.close()
+    with open(path, "ab") as journal_file:
+        journal_file.write(b'{"key":"b","documents":[{"id"')
+
+    journal = SearchJournal(str(path))
+    assert "b" not in journal
+    journal.append("c", [make_document("C")])
+    journal.close()
+
+    journal = SearchJournal(str(path))
+    assert journal.get("a") == [make_document("A")]
+    assert journal.get("c") == [make_document("C")]
+
+
+def test_run_search_resumes_from_journal(make_bigdata, date_ranges, tmp_path):
+    path = str(tmp_path / "run.jsonl")
+    queries = [Similarity(f"q{i}") for i in range(3)]
+    kwargs = dict(
+        date_ranges=date_ranges,
+        journal_path=path,
+        retry_policy=RetryPolicy(0),
+        current_trace=Trace(),
+    )
+
+    first = run_search(queries, bigdata=make_bigdata(fail_on={"q1"}), **kwargs)
+    assert [r is None for r in first] == [False, False, True, True, False, False]
+
+    bigdata = make_bigdata()
+    second = run_search(queries, bigdata=bigdata, **kwargs)
+    # Only the searches that did not complete are issued again
+    assert bigdata.search.new.call_count == 2
+    assert [[d.id for d in r] for r in second] == [
+        [f"q{i}"] for i in range(3) for _ in date_ranges
+    ]
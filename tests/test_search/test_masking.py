@@ -0,0 +1,77 @@
+import numpy as np
+from bigdata_research_tools.search import masking
+from bigdata_research_tools.search.masking import mask_texts
+from bigdata_research_tools.search.screener_search import mask_sentences
+from pandas import DataFrame
+from pandas.testing import assert_frame_equal
+
+TEXTS = [
+    "Apple, Zeta and Apple",
+    "Zeta and Omega beat Apple",
+    "Zeta Corp",
+    "Omega Beta",
+]
+
+
+def mask(**kwargs):
+    return mask_texts(
+        TEXTS,
+        offsets=np.array([0, 3, 6, 8, 10]),
+        # The mentions of the 2nd text are out of order, those of the 3rd
+        # share a start and those of the 4th overlap
+        starts=np.array([0, 7, 16, 20, 0, 9, 0, 0, 0, 3]),
+        ends=np.array([5, 11, 21, 25, 4, 14, 4, 9, 5, 10]),
+        keys=np.array(["A", "Z", "A", "A", "Z", "O", "Z", "C", "O", "B"], dtype=object),
+        targets=np.array([1, 0, 1, 1, 0, 0, 0, 1, 0, 0], dtype=bool),
+        names=np.array(
+            ["Apple", "Zeta", "Apple", "Apple", "Zeta", "Omega"]
+            + ["Zeta", "Zeta Corp", "Omega", "Beta"],
+            dtype=object,
+        ),
+        target_placeholder="T",
+        other_placeholder="O",
+        **kwargs,
+    )
+
+
+def test_mask_texts_numbers_other_entities_across_texts():
+    masked, other_entities_map = mask()
+
+    assert masked == ["T, O_1 and T", "O_1 and O_2 beat T", "T", "O_23"]
+    assert other_entities_map == [
+        [(1, "Zeta")],
+        [(2, "Omega"), (1, "Zeta")],
+        None,
+        [(3, "Beta"), (2, "Omega")],
+    ]
+
+
+def test_mask_sentences_in_processes(monkeypatch):
+    df = DataFrame(
+        {
+            "text": ["{Apple} and Zeta", "Zeta and Apple"] * 3,
+            "entity_id": ["A", "Z"] * 3,
+            "entities": [
+                [
+                    {"key": "A", "name": "Apple", "start": 0, "end": 5},
+                    {"key": "Z", "name": "Zeta", "start": 10, "end": 14},
+                ],
+                [
+                    {"key": "Z", "name": "Zeta", "start": 0, "end": 4},
+                    {"key": "A", "name": "Apple", "start": 9, "end": 14},
+                ],
+            ]
+            * 3,
+        }
+    )
+    expected = mask_sentences(df.copy(), max_workers=1)
+    monkeypatch.setattr(masking, "PROCESS_POOL_MIN_TEXTS", 2)
+    monkeypatch.setattr(masking, "PROCESS_POOL_BATCH_SIZE", 4)
+    actual = mask_sentences(df.copy(), max_workers=2)
+
+    assert_frame_equal(actual, expected)
+    assert actual["masked_text"].tolist()[:2] == [
+        "Target Company and Other Company_1",
+        "Target Company and Other Company_2",
+    ]
+    assert actual["other_entities_map"].tolist()[:2] == [[(1, "Zeta")], [(2, "Apple")]]
@@ -0,0 +1,166 @@
+import time
+from unittest.mock import MagicMock
+
+import pandas as pd
+from bigdata_client.query import Entity, Similarity
+from bigdata_research_tools.search.planner import (
+    SearchSchedule,
+    bisect_date_range,
+    adaptive_search,
+)
+from bigdata_research_tools.tracing import Trace
+
+# Documents per day mentioning each entity; "B" is only covered in March
+DENSITY = {"A": 1.0, "B": 0.0, "C": 0.1}
+
+
+def entity_ids(node):
+    if node["type"] == "entity":
+        return node["value"]
+    if node["type"] == "and":
+        return [key for child in node["value"] for key in entity_ids(child)]
+    return []
+
+
+def make_bigdata():
+    """Bigdata mock returning as many documents as the entity densities imply."""
+    bigdata = MagicMock()
+
+    def new(query, date_range, **kwargs):
+        start, end = date_range.start_dt, date_range.end_dt
+        days = (end - start).total_seconds() / 86400
+        count = sum(DENSITY[key] * days for key in entity_ids(query.to_dict()))
+        if "B" in entity_ids(query.to_dict()) and start.month <= 3 <= end.month:
+            count += 2
+        search = MagicMock()
+        search.run.side_effect = lambda limit: list(range(min(int(count), limit)))
+        search.get_usage.return_value = 1
+        return search
+
+    bigdata.search.new.side_effect = new
+    return bigdata
+
+
+def run(entity_batches=(("A",), ("B", "C")), freq="Y", **kwargs):
+    return adaptive_search(
+        [Similarity("supply chain")],
+        [[Entity(key) for key in batch] for batch in entity_batches],
+        start_date="2024-01-01",
+        end_date="2024-12-31",
+        freq=freq,
+        document_limit=10,
+        current_trace=Trace(),
+        **kwargs,
+    )
+
+
+def test_bisect_date_range():
+    first, second = bisect_date_range(
+        ("2024-01-01 00:00:00", "2024-01-31 23:59:59"), pd.Timedelta("1D")
+    )
+    assert first == ("2024-01-01 00:00:00", "2024-01-15 23:59:59")
+    assert second == ("2024-01-16 00:00:00", "2024-01-31 23:59:59")
+    assert (
+        bisect_date_range(
+            ("2024-01-01 00:00:00", "2024-01-01 23:59:59"), pd.Timedelta("1D")
+        )
+        is None
+    )
+
+
+def test_adaptive_search_splits_saturated_searches():
+    bigdata = make_bigdata()
+    results, schedule, stats = run(bigdata=bigdata)
+
+    # Every search ends below the limit, with fewer searches than a daily grid
+    assert all(len(documents) < 10 for documents in results)
+    assert stats.searches == bigdata.search.new.call_count
+    assert stats.searches < 2 * 366
+    assert stats.date_splits > 0
+    # The total covers the year of entity A
+    assert sum(len(documents) for documents in results) >= 300
+
+    for windows in schedule.windows.values():
+        assert windows[0][0] == "2024-01-01 00:00:00"
+        assert windows[-1][1] == "2024-12-31 23:59:59"
+        for previous, window in zip(windows, windows[1:]):
+            assert pd.Timestamp(window[0]) - pd.Timestamp(previous[1]) == pd.Timedelta(
+                seconds=1
+            )
+
+
+def test_schedule_merges_empty_windows():
+    results, schedule, stats = run(
+        entity_batches=[("B",)], freq="M", bigdata=make_bigdata()
+    )
+
+    assert [len(documents) for documents in results] == [0, 0, 2] + [0] * 9
+    assert stats.merged_windows == 9
+    assert list(schedule.windows.values()) == [
+        [
+            ("2024-01-01 00:00:00", "2024-02-29 23:59:59"),
+            ("2024-03-01 00:00:00", "2024-03-31 23:59:59"),
+            ("2024-04-01 00:00:00", "2024-12-31 23:59:59"),
+        ]
+    ]
+
+
+def test_later_pass_starts_from_schedule(tmp_path):
+    _, schedule, _ = run(bigdata=make_bigdata())
+    path = str(tmp_path / "schedule.json")
+    schedule.save(path)
+
+    bigdata = make_bigdata()
+    results, _, stats = run(bigdata=bigdata, schedule=SearchSchedule.load(path))
+    # The second pass starts from the final windows, so nothing saturates
+    assert stats.saturated == 0
+    assert stats.searches == sum(map(len, schedule.windows.values()))
+    assert all(len(documents) < 10 for documents in results)
+
+
+def test_entity_batches_split_below_min_window():
+    results, _, stats = run(
+        entity_batches=[("B", "C")], min_window="366D", bigdata=make_bigdata()
+    )
+
+    assert stats.date_splits == 0
+    assert stats.entity_splits == 1
+    # The batch of C alone is still saturated but cannot be split further
+    assert [len(documents) for documents in results] == [2, 10]
+
+
+def test_entity_split_halves_keep_batch_order():
+    bigdata = make_bigdata()
+    new = bigdata.search.new.side_effect
+    completed = []
+
+    def slow_first_half(query, date_range, **kwargs):
+        search = new(query, date_range, **kwargs)
+        documents = search.run.side_effect
+        keys = entity_ids(query.to_dict())
+
+        def run(limit):
+            if keys == ["E"]:
+                time.sleep(0.2)
+            completed.append(keys)
+            return documents(limit)
+
+        search.run.side_effect = run
+        return search
+
+    bigdata.search.new.side_effect = slow_first_half
+    DENSITY.update(E=0.02, F=0.015)
+    try:
+        results, _, stats = run(
+            entity_batches=[("E", "F")],
+            min_window="366D",
+            bigdata=bigdata,
+            max_workers=2,
+        )
+    finally:
+        del DENSITY["E"], DENSITY["F"]
+
+    assert stats.entity_splits == 1
+    # The second half completes first, but the halves keep the batch order
+    assert completed == [["E", "F"], ["F"], ["E"]]
+    assert [len(documents) for documents in results] == [7, 5]
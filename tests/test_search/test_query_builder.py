@@ -0,0 +1,56 @@
+from bigdata_client.models.search import DocumentType
+from bigdata_client.query import Any
+from bigdata_research_tools.search import query_builder
+from bigdata_research_tools.search.entity_resolver import (
+    EntityResolver,
+    set_entity_resolver,
+)
+from bigdata_research_tools.search.query_builder import (
+    EntitiesToSearch,
+    build_batched_query,
+    iter_batched_query,
+)
+
+PARAMETERS = dict(
+    sentences=["Supply chain", "Tariffs"],
+    keywords=["chips"],
+    control_entities=None,
+    sources=None,
+    batch_size=10,
+    fiscal_year=None,
+    scope=DocumentType.NEWS,
+    custom_batches=None,
+)
+
+
+def test_lazy_expansion_matches_batched_query(knowledge_graph):
+    set_entity_resolver(EntityResolver(cache=None))
+    entities = EntitiesToSearch(companies=[f"Company {i}" for i in range(25)])
+
+    queries = build_batched_query(entities=entities, **PARAMETERS)
+    lazy_queries = list(iter_batched_query(entities=entities, **PARAMETERS))
+
+    assert len(queries) == 6
+    assert [q.to_dict() for q in lazy_queries] == [q.to_dict() for q in queries]
+    assert [q.to_dict() for q in iter_batched_query(entities=None, **PARAMETERS)] == [
+        q.to_dict() for q in build_batched_query(entities=None, **PARAMETERS)
+    ]
+
+
+def test_lazy_expansion_builds_queries_on_demand(knowledge_graph, monkeypatch):
+    resolver = EntityResolver(cache=None)
+    set_entity_resolver(resolver)
+    built = []
+    monkeypatch.setattr(
+        query_builder, "Any", lambda values: built.append(values) or Any(values)
+    )
+    entities = EntitiesToSearch(companies=[f"Company {i}" for i in range(30)])
+
+    queries = iter_batched_query(entities=entities, **PARAMETERS)
+    # Names are resolved upfront, entity batches are built as queries are drawn
+    assert resolver.lookups == 30
+    assert len(built) == 1  # The keyword query
+    next(queries)
+    assert len(built) == 2
+    assert sum(1 for _ in queries) == 5
+    assert len(built) == 4
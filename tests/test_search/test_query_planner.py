@@ -0,0 +1,159 @@
+import pytest
+from bigdata_client.models.search import DocumentType
+from bigdata_research_tools import client
+from bigdata_research_tools.fake_bigdata import (
+    FakeCorpus,
+    FakeCorpusConfig,
+    use_fake_bigdata,
+)
+from bigdata_research_tools.search.query_builder import (
+    EntitiesToSearch,
+    create_date_ranges,
+)
+from bigdata_research_tools.search import screener_search
+from bigdata_research_tools.search.query_planner import plan_batched_query
+from bigdata_research_tools.search.screener_search import search_by_companies
+from bigdata_research_tools.tracing import Trace
+
+DATE_RANGES = create_date_ranges("2024-01-01", "2024-12-31", "M")
+COMPANIES = EntitiesToSearch(companies=[f"C{i:03d}" for i in range(100)])
+
+
+def test_rare_entities_are_batched_and_merged_over_time():
+    plan = plan_batched_query(
+        ["Supply chain", "Pricing power"], COMPANIES, DATE_RANGES, 50, rpm=300
+    )
+
+    # 100 entities with one document per month fit in 50 documents per search
+    assert plan.coverage == 1.0
+    assert plan.total_queries < plan.baseline_queries == 2 * 10 * 12
+    assert sum(plan.batch_sizes) == 100
+    assert plan.date_ranges[0][0] == "2024-01-01 00:00:00"
+    assert plan.date_ranges[-1][1] == "2024-12-31 23:59:59"
+    assert "Query plan: " in plan.explain()
+
+
+def test_popular_entities_get_their_own_batches():
+    expected = {f"C{i:03d}": 100.0 if i < 3 else 0.1 for i in range(100)}
+    plan = plan_batched_query(
+        ["Supply chain"],
+        COMPANIES,
+        DATE_RANGES,
+        50,
+        expected_documents=expected,
+        merge_date_ranges=False,
+        target_coverage=0.5,
+    )
+
+    assert len(plan.date_ranges) == 12
+    for name in ("C000", "C001", "C002"):
+        batch = next(b for b in plan.entity_batches if name in b.companies)
+        assert batch.companies == [name]
+    assert plan.coverage >= 0.5
+
+
+def test_budget_caps_the_number_of_searches():
+    plan = plan_batched_query(
+        ["Supply chain"],
+        COMPANIES,
+        DATE_RANGES,
+        5,
+        target_coverage=1.0,
+        rpm=60,
+        max_minutes=0.5,
+    )
+    assert plan.total_queries <= plan.budget == 30
+    assert plan.coverage < 1.0
+    assert "cannot be reached within the budget" in plan.explain()
+
+
+def test_probe_searches_count_against_the_budget():
+    arguments = dict(target_coverage=1.0, max_queries=60)
+    plan = plan_batched_query(["Supply chain"], COMPANIES, DATE_RANGES, 5, **arguments)
+    probed = plan_batched_query(
+        ["Supply chain"], COMPANIES, DATE_RANGES, 5, probe_queries=25, **arguments
+    )
+
+    assert plan.total_queries > 35 >= probed.total_queries
+    assert "Plus 25 probe searches" in probed.explain()
+    assert "the budget of 60 searches, including the probes" in probed.explain()
+
+
+def test_search_by_companies_runs_the_plan(monkeypatch):
+    monkeypatch.setattr(client, "_bigdata_clients", {})
+    corpus = FakeCorpus(FakeCorpusConfig(documents=300, companies=20, seed=3))
+    backend = use_fake_bigdata(corpus=corpus)
+    try:
+        df = search_by_companies(
+            companies=corpus.companies,
+            sentences=["Supply chain"],
+            start_date="2021-01-01",
+            end_date="2021-12-31",
+            scope=DocumentType.NEWS,
+            document_limit=50,
+            target_coverage=0.9,
+            max_queries=30,
+            current_trace=Trace(),
+        )
+        with pytest.raises(ValueError, match="pass `expected_documents`"):
+            search_by_companies(
+                companies=corpus.companies,
+                sentences=["Supply chain"],
+                start_date="2021-01-01",
+                end_date="2021-12-31",
+                target_coverage=0.9,
+                max_queries=20,
+                current_trace=Trace(),
+            )
+    finally:
+        client.set_bigdata_client_factory(None)
+
+    assert len(df) > 0
+    # One density probe per company, then the plan within the rest of the budget
+    assert backend.stats.searches <= 30
+
+
+def test_search_by_companies_sizes_the_plan_to_probed_yields(monkeypatch):
+    monkeypatch.setattr(client, "_bigdata_clients", {})
+    plans = []
+
+    def record_plan(*args, **kwargs):
+        plans.append(
+            (kwargs["expected_documents"], plan_batched_query(*args, **kwargs))
+        )
+        return plans[-1][1]
+
+    monkeypatch.setattr(screener_search, "plan_batched_query", record_plan)
+    corpus = FakeCorpus(
+        FakeCorpusConfig(documents=3000, companies=40, popularity=1.2, seed=1)
+    )
+    use_fake_bigdata(corpus=corpus)
+    try:
+        search_by_companies(
+            companies=corpus.companies,
+            sentences=["Supply chain"],
+            start_date="2021-01-01",
+            end_date="2021-12-31",
+            scope=DocumentType.NEWS,
+            document_limit=20,
+            target_coverage=0.9,
+            current_trace=Trace(),
+        )
+    finally:
+        client.set_bigdata_client_factory(None)
+
+    ((expected_documents, plan),) = plans
+    ids = [company.id for company in corpus.companies]
+    uniform = plan_batched_query(
+        ["Supply chain"],
+        EntitiesToSearch(companies=ids),
+        create_date_ranges("2021-01-01", "2021-12-31", "M"),
+        20,
+        target_coverage=0.9,
+    )
+    yields = sorted(expected_documents.values())
+    assert yields[-1] > 10 * yields[0]
+    # Popular companies are searched alone, rare ones share a batch
+    assert min(plan.batch_sizes) == 1 < max(plan.batch_sizes)
+    assert plan.batch_sizes != uniform.batch_sizes
+    assert plan.probe_queries == 40
@@ -0,0 +1,132 @@
+import asyncio
+import multiprocessing
+import time
+from types import SimpleNamespace
+
+import pytest
+from bigdata_research_tools.search import rate_limiter
+from bigdata_research_tools.search.rate_limiter import (
+    FileRateLimiter,
+    RateLimiter,
+    create_rate_limiter,
+)
+
+
+def test_acquire_within_bucket_does_not_wait():
+    limiter = RateLimiter(rpm=600, bucket_size=5)
+    start = time.monotonic()
+    for _ in range(5):
+        assert limiter.acquire()
+    assert time.monotonic() - start < 0.05
+    assert limiter.stats.tokens_consumed == 5
+    assert limiter.stats.max_wait == 0
+
+
+def test_acquire_waits_exactly_for_fractional_refill():
+    # 600 rpm = one token every 0.1 s
+    limiter = RateLimiter(rpm=600, bucket_size=1)
+    limiter.acquire()
+    start = time.monotonic()
+    limiter.acquire()
+    limiter.acquire()
+    elapsed = time.monotonic() - start
+    assert 0.18 <= elapsed < 0.3
+    stats = limiter.stats
+    assert stats.tokens_consumed == 3
+    assert stats.max_wait == pytest.approx(0.1, abs=0.02)
+    assert stats.average_wait == pytest.approx(stats.total_wait / 3)
+
+
+def test_acquire_times_out_without_consuming():
+    limiter = RateLimiter(rpm=60, bucket_size=1)
+    assert limiter.acquire()
+    assert not limiter.acquire(timeout=0.1)
+    assert limiter.stats.timeouts == 1
+    assert limiter.stats.tokens_consumed == 1
+    # A zero timeout never blocks
+    start = time.monotonic()
+    assert not limiter.acquire(timeout=0)
+    assert time.monotonic() - start < 0.05
+
+
+def test_acquire_async_serves_waiters_in_order():
+    limiter = RateLimiter(rpm=1200, bucket_size=1)
+    finished = []
+
+    async def worker(idx):
+        await limiter.acquire_async()
+        finished.append(idx)
+
+    async def main():
+        await asyncio.gather(*(worker(i) for i in range(4)))
+
+    start = time.monotonic()
+    asyncio.run(main())
+    assert finished == [0, 1, 2, 3]
+    assert 0.14 <= time.monotonic() - start < 0.3
+
+
+def test_cancelled_async_waiter_gives_its_token_back():
+    limiter = RateLimiter(rpm=60, bucket_size=1)
+    limiter.acquire()
+
+    async def main():
+        waiter = asyncio.create_task(limiter.acquire_async())
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+    asyncio.run(main())
+    assert limiter.tokens == pytest.approx(0, abs=0.05)
+    assert limiter.stats.tokens_consumed == 1
+
+
+def _acquire_shared_tokens(path, count):
+    limiter = FileRateLimiter(path, rpm=1200, bucket_size=1)
+    for _ in range(count):
+        limiter.acquire()
+
+
+def test_file_rate_limiter_shares_budget_across_processes(tmp_path):
+    # 1200 rpm = one token every 0.05 s, shared by both processes
+    path = str(tmp_path / "bucket.state")
+    processes = [
+        multiprocessing.Process(target=_acquire_shared_tokens, args=(path, 5))
+        for _ in range(2)
+    ]
+    start = time.monotonic()
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    # Ten tokens from a one-token bucket need at least nine refills
+    assert time.monotonic() - start >= 0.45
+    assert all(process.exitcode == 0 for process in processes)
+
+
+def test_create_rate_limiter_uses_environment(tmp_path, monkeypatch):
+    assert type(create_rate_limiter()) is RateLimiter
+    monkeypatch.setenv("BIGDATA_RATE_LIMITER_PATH", str(tmp_path / "bucket.state"))
+    limiter = create_rate_limiter(rpm=60)
+    assert isinstance(limiter, FileRateLimiter)
+    assert limiter.acquire()
+    assert limiter.tokens == pytest.approx(59, abs=0.1)
+
+
+def test_windows_lock_waits_for_a_contended_file(monkeypatch, tmp_path):
+    attempts = []
+
+    def locking(fileno, mode, size):
+        attempts.append(mode)
+        if len(attempts) < 3:
+            raise OSError("Resource deadlock avoided")
+
+    msvcrt = SimpleNamespace(LK_NBLCK=2, LK_UNLCK=0, locking=locking)
+    monkeypatch.setattr(rate_limiter, "fcntl", None)
+    monkeypatch.setattr(rate_limiter, "msvcrt", msvcrt, raising=False)
+    limiter = FileRateLimiter(str(tmp_path / "bucket"), rpm=600, bucket_size=5)
+
+    assert limiter.acquire()
+    assert attempts == [2, 2, 2, 0]
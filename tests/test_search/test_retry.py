@@ -0,0 +1,107 @@
+import asyncio
+
+import requests
+from unittest.mock import MagicMock
+from bigdata_client.exceptions import BigdataClientRateLimitError
+from bigdata_client.query import Similarity
+from bigdata_research_tools.search.retry import RetryPolicy, is_retryable_error
+from bigdata_research_tools.search.search import (
+    AsyncSearchManager,
+    SearchManager,
+    replay_failed_queries,
+)
+
+DATE_RANGE = ("2024-01-01 00:00:00", "2024-01-31 23:59:59")
+NO_DELAY = RetryPolicy(max_retries=2, base_delay=0)
+
+
+def make_bigdata(errors):
+    """Bigdata mock whose searches raise `errors` in turn, then succeed."""
+    errors = list(errors)
+    bigdata = MagicMock()
+
+    def new(query, **kwargs):
+        if errors:
+            raise errors.pop(0)
+        search = MagicMock()
+        search.run.return_value = [query.to_dict()["value"][0]]
+        search.get_usage.return_value = 1
+        return search
+
+    bigdata.search.new.side_effect = new
+    return bigdata
+
+
+def http_error(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    return requests.HTTPError(response=response)
+
+
+def test_is_retryable_error():
+    assert is_retryable_error(http_error(429))
+    assert is_retryable_error(http_error(503))
+    assert is_retryable_error(requests.ConnectionError())
+    assert is_retryable_error(BigdataClientRateLimitError())
+    assert not is_retryable_error(http_error(400))
+    assert not is_retryable_error(ValueError("invalid query"))
+
+
+def test_retry_policy_delay_is_bounded():
+    policy = RetryPolicy(base_delay=1, max_delay=5, jitter=0.5)
+    for attempt in range(6):
+        assert (
+            0.5 * min(5, 2**attempt) <= policy.get_delay(attempt) <= min(5, 2**attempt)
+        )
+
+
+def test_search_retries_transient_errors():
+    bigdata = make_bigdata([http_error(503), requests.Timeout()])
+    manager = SearchManager(bigdata=bigdata, retry_policy=NO_DELAY)
+
+    assert manager._search(Similarity("ok"), DATE_RANGE) == ["ok"]
+    assert bigdata.search.new.call_count == 3
+    assert manager.rate_limiter.stats.tokens_consumed == 3
+    assert manager.failed_queries == []
+
+
+def test_fatal_and_exhausted_errors_are_recorded():
+    manager = SearchManager(
+        bigdata=make_bigdata([ValueError("invalid")] + [http_error(500)] * 3),
+        retry_policy=NO_DELAY,
+    )
+    query = Similarity("bad")
+
+    assert manager._search(query, DATE_RANGE, limit=5) is None
+    assert manager._search(query, DATE_RANGE, limit=5) is None
+    fatal, exhausted = manager.failed_queries
+    assert (fatal.query, fatal.date_range, fatal.limit) == (query, DATE_RANGE, 5)
+    assert (fatal.attempts, exhausted.attempts) == (1, 3)
+    assert fatal.error == "invalid"
+
+
+def test_async_search_retries_transient_errors():
+    manager = AsyncSearchManager(
+        bigdata=make_bigdata([requests.ConnectionError()]), retry_policy=NO_DELAY
+    )
+    results = asyncio.run(manager.concurrent_search([Similarity("ok")], [DATE_RANGE]))
+    manager.close()
+
+    assert list(results.values()) == [["ok"]]
+    assert manager.failed_queries == []
+
+
+def test_replay_failed_queries():
+    queries = [Similarity("a"), Similarity("b")]
+    manager = SearchManager(
+        bigdata=make_bigdata([ValueError("invalid")] * 2), retry_policy=NO_DELAY
+    )
+    results = manager.concurrent_search(queries, [DATE_RANGE], max_workers=1)
+    assert list(results.values()) == [None, None]
+
+    replayed = replay_failed_queries(
+        manager.failed_queries, only_results=False, bigdata=make_bigdata([])
+    )
+    assert replayed == {
+        (query, DATE_RANGE): [query.to_dict()["value"][0]] for query in queries
+    }
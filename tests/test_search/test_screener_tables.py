@@ -0,0 +1,84 @@
+from bigdata_client.models.search import DocumentType
+from bigdata_research_tools import client
+from bigdata_research_tools.fake_bigdata import (
+    FakeCorpus,
+    FakeCorpusConfig,
+    use_fake_bigdata,
+)
+from bigdata_research_tools.search.screener_search import (
+    mask_sentences,
+    search_by_companies,
+)
+from bigdata_research_tools.search.screener_tables import (
+    ScreenerTables,
+    build_screener_tables,
+)
+from bigdata_research_tools.tracing import Trace
+from pandas.testing import assert_frame_equal
+
+
+def test_tables_store_each_chunk_and_mention_once(apple, microsoft, make_table):
+    _, table = make_table()
+    tables = build_screener_tables(table, [apple, microsoft])
+
+    assert tables.chunks["sentence_id"].tolist() == ["A-0", "B-0"]
+    assert tables.entities["entity_id"].tolist() == ["D8442A", "228D42"]
+    assert tables.mentions[["chunk", "entity", "start"]].values.tolist() == [
+        [0, 0, 0],
+        [1, 1, 6],
+        [1, 0, 20],
+    ]
+    assert tables.rows[["chunk", "entity"]].values.tolist() == [[0, 0], [1, 1], [1, 0]]
+
+    df = tables.to_frame()
+    assert df["masked_text"].tolist()[1:] == [
+        "Zeta, Target Company and Other Company_1",
+        "Zeta, Other Company_2 and Target Company",
+    ]
+    assert df["entities"][1] is df["entities"][2]
+
+
+def test_search_by_companies_returns_normalized_tables(monkeypatch):
+    monkeypatch.setattr(client, "_bigdata_clients", {})
+    corpus = FakeCorpus(FakeCorpusConfig(documents=500, companies=30, seed=2))
+    use_fake_bigdata(corpus=corpus)
+    arguments = dict(
+        companies=corpus.companies[:25],
+        sentences=["Supply chain", "Pricing power"],
+        start_date="2021-01-01",
+        end_date="2021-12-31",
+        scope=DocumentType.NEWS,
+        freq="M",
+        document_limit=5,
+        batch_size=5,
+    )
+    try:
+        expected = search_by_companies(**arguments, current_trace=Trace())
+        tables = search_by_companies(
+            **arguments, normalized=True, current_trace=Trace()
+        )
+    finally:
+        client.set_bigdata_client_factory(None)
+
+    assert isinstance(tables, ScreenerTables)
+    assert len(tables) == len(expected) > 0
+    assert len(tables.chunks) < len(expected)
+    assert_frame_equal(tables.to_frame(), expected)
+
+
+def test_braces_of_the_placeholders_are_removed(
+    apple, microsoft, make_table, monkeypatch
+):
+    monkeypatch.setenv("BIGDATA_TARGET_ENTITY_PLACEHOLDER", "{Target}")
+    monkeypatch.setenv("BIGDATA_OTHER_ENTITY_PLACEHOLDER", "{Other}")
+    _, table = make_table()
+    df = build_screener_tables(table, [apple, microsoft]).to_frame()
+    expected = mask_sentences(
+        df.drop(columns=["masked_text", "other_entities_map"]), max_workers=1
+    )
+
+    assert df["masked_text"].tolist()[1:] == [
+        "Zeta, Target and Other_1",
+        "Zeta, Other_2 and Target",
+    ]
+    assert_frame_equal(df, expected[df.columns])
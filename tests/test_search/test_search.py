@@ -0,0 +1,176 @@
+import asyncio
+
+import pytest
+from unittest.mock import MagicMock
+from bigdata_client.query import Similarity
+from bigdata_research_tools.search.concurrency import AdaptiveConcurrency
+from bigdata_research_tools.search.rate_limiter import (
+    RateLimiter,
+    get_shared_rate_limiter,
+)
+from bigdata_research_tools.search.search import (
+    MANAGER_ARGUMENTS,
+    AsyncSearchManager,
+    SearchManager,
+    run_search,
+)
+from bigdata_research_tools.tracing import Trace
+
+
+def make_bigdata(fail_on=None):
+    """Bigdata mock whose searches return the query sentence and date range."""
+    bigdata = MagicMock()
+
+    def new(query, date_range, **kwargs):
+        if fail_on is not None and query.to_dict()["value"] == [fail_on]:
+            raise RuntimeError("boom")
+        search = MagicMock()
+        search.run.return_value = [(query.to_dict()["value"][0], date_range)]
+        search.get_usage.return_value = 1
+        return search
+
+    bigdata.search.new.side_effect = new
+    return bigdata
+
+
+DATE_RANGES = [
+    ("2024-01-01 00:00:00", "2024-01-31 23:59:59"),
+    ("2024-02-01 00:00:00", "2024-02-29 23:59:59"),
+]
+
+
+@pytest.mark.asyncio
+async def test_async_concurrent_search_preserves_grid_order():
+    queries = [Similarity(f"sentence {i}") for i in range(5)]
+    async with AsyncSearchManager(bigdata=make_bigdata(), max_concurrency=3) as manager:
+        results = await manager.concurrent_search(queries, DATE_RANGES, limit=5)
+
+    assert list(results) == [(q, d) for q in queries for d in DATE_RANGES]
+    for (query, date_range), documents in results.items():
+        assert documents[0][0] == query.to_dict()["value"][0]
+        assert documents[0][1].start_dt.strftime("%Y-%m-%d") == date_range[0][:10]
+
+
+@pytest.mark.asyncio
+async def test_async_concurrent_search_keeps_failed_cells():
+    queries = [Similarity("ok"), Similarity("bad")]
+    async with AsyncSearchManager(bigdata=make_bigdata(fail_on="bad")) as manager:
+        results = await manager.concurrent_search(queries, DATE_RANGES[:1])
+
+    assert results[(queries[0], DATE_RANGES[0])] is not None
+    assert results[(queries[1], DATE_RANGES[0])] is None
+
+
+def test_async_and_sync_managers_agree():
+    queries = [Similarity(f"sentence {i}") for i in range(3)]
+    sync_results = SearchManager(bigdata=make_bigdata()).concurrent_search(
+        queries, DATE_RANGES
+    )
+    manager = AsyncSearchManager(bigdata=make_bigdata())
+    async_results = asyncio.run(manager.concurrent_search(queries, DATE_RANGES))
+    manager.close()
+
+    assert {k: v[0][0] for k, v in sync_results.items()} == {
+        k: v[0][0] for k, v in async_results.items()
+    }
+
+
+def test_iter_search_bounds_pending_searches():
+    bigdata = make_bigdata()
+    manager = SearchManager(bigdata=bigdata)
+    queries = [Similarity(f"sentence {i}") for i in range(10)]
+    stream = manager.iter_search(queries, DATE_RANGES, max_workers=2, max_pending=3)
+
+    first = next(stream)
+    assert first[2] is not None
+    # Only the submission window has been searched so far
+    assert bigdata.search.new.call_count <= 4
+    stream.close()
+
+    remaining = list(manager.iter_search(queries, DATE_RANGES, max_workers=2))
+    assert len(remaining) == len(queries) * len(DATE_RANGES)
+
+
+@pytest.mark.asyncio
+async def test_async_iter_search_yields_every_cell():
+    queries = (Similarity(f"sentence {i}") for i in range(4))
+    async with AsyncSearchManager(bigdata=make_bigdata(), max_concurrency=2) as manager:
+        cells = [
+            (query.to_dict()["value"][0], date_range)
+            async for query, date_range, _ in manager.iter_search(queries, DATE_RANGES)
+        ]
+
+    assert sorted(cells) == [
+        (f"sentence {i}", date_range) for i in range(4) for date_range in DATE_RANGES
+    ]
+
+
+@pytest.mark.asyncio
+async def test_async_executor_is_created_on_first_request():
+    queries = [Similarity(f"sentence {i}") for i in range(4)]
+    async with AsyncSearchManager(bigdata=make_bigdata(), max_concurrency=3) as manager:
+        assert manager._executor is None
+        await manager.concurrent_search(queries, DATE_RANGES)
+        assert manager._executor._max_workers == 3
+
+    concurrency = AdaptiveConcurrency(initial=1, max_concurrency=2)
+    async with AsyncSearchManager(
+        bigdata=make_bigdata(), concurrency=concurrency
+    ) as manager:
+        await manager.concurrent_search(queries, DATE_RANGES)
+        assert manager._executor._max_workers == 2
+
+
+@pytest.mark.asyncio
+async def test_use_async_in_a_running_event_loop_runs_in_threads(caplog):
+    queries = [Similarity(f"sentence {i}") for i in range(2)]
+    kwargs = dict(date_ranges=DATE_RANGES, current_trace=Trace())
+    expected = run_search(queries, bigdata=make_bigdata(), **kwargs)
+
+    results = run_search(queries, use_async=True, bigdata=make_bigdata(), **kwargs)
+
+    assert results == expected
+    assert "await arun_search" in caplog.text
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_manager_arguments_are_not_passed_to_searches(monkeypatch, use_async):
+    searches = []
+
+    def record(manager_class):
+        search = manager_class._search
+
+        def _search(self, *args, **kwargs):
+            searches.append(kwargs)
+            return search(self, *args, **kwargs)
+
+        monkeypatch.setattr(manager_class, "_search", _search)
+
+    record(SearchManager)
+    record(AsyncSearchManager)
+    run_search(
+        [Similarity("sentence")],
+        DATE_RANGES,
+        use_async=use_async,
+        bigdata=make_bigdata(),
+        rate_limiter=RateLimiter(rpm=600),
+        retry_policy=None,
+        max_workers=2,
+        current_trace=Trace(),
+    )
+
+    assert len(searches) == len(DATE_RANGES)
+    for kwargs in searches:
+        assert "current_trace" in kwargs
+        assert not MANAGER_ARGUMENTS.intersection(kwargs)
+
+
+@pytest.mark.parametrize("manager_class", [SearchManager, AsyncSearchManager])
+def test_explicit_budgets_get_their_own_rate_limiter(manager_class):
+    shared = get_shared_rate_limiter()
+    assert manager_class(bigdata=make_bigdata()).rate_limiter is shared
+
+    for kwargs in (dict(rpm=300), dict(rpm=299), dict(bucket_size=10)):
+        manager = manager_class(bigdata=make_bigdata(), **kwargs)
+        assert manager.rate_limiter is not shared
+        assert manager.rpm == kwargs.get("rpm", 300)
@@ -0,0 +1,98 @@
+import pytest
+from bigdata_client.models.search import DocumentType
+from bigdata_client.query import Similarity
+from bigdata_research_tools import client
+from bigdata_research_tools.fake_bigdata import (
+    FakeCorpus,
+    FakeCorpusConfig,
+    use_fake_bigdata,
+)
+from bigdata_research_tools.search.screener_search import (
+    merge_company_search_shards,
+    search_by_companies,
+    search_by_companies_shard,
+)
+from bigdata_research_tools.search.search import run_search
+from bigdata_research_tools.search.sharding import (
+    merge_shards,
+    run_search_shard,
+    shard_cells,
+)
+from bigdata_research_tools.tracing import Trace
+from pandas.testing import assert_frame_equal
+
+CORPUS = FakeCorpus(FakeCorpusConfig(documents=500, companies=30, seed=2))
+
+
+@pytest.fixture(autouse=True)
+def restore_factory(monkeypatch):
+    monkeypatch.setattr(client, "_bigdata_clients", {})
+    yield
+    client.set_bigdata_client_factory(None)
+
+
+def test_shards_partition_the_grid():
+    for by in ("cell", "query"):
+        cells = [cell for shard in range(3) for cell in shard_cells(4, 5, 3, shard, by)]
+        assert sorted(cells) == [(q, d) for q in range(4) for d in range(5)]
+    assert shard_cells(4, 2, 2, 1, by="query") == [(1, 0), (1, 1), (3, 0), (3, 1)]
+
+    with pytest.raises(ValueError):
+        shard_cells(4, 5, 3, 3)
+
+
+def test_merged_shards_match_a_single_run(make_bigdata, date_ranges, tmp_path):
+    queries = [Similarity("q1"), Similarity("q2"), Similarity("q3")]
+    expected = run_search(
+        queries,
+        date_ranges=date_ranges,
+        bigdata=make_bigdata(),
+        as_chunk_table=True,
+        current_trace=Trace(),
+    )
+
+    paths = [str(tmp_path / f"shard-{shard}.jsonl") for shard in range(2)]
+    for shard in (1, 0):
+        run_search_shard(
+            queries,
+            date_ranges,
+            shards=2,
+            shard=shard,
+            path=paths[shard],
+            bigdata=make_bigdata(),
+            current_trace=Trace(),
+        )
+    table = merge_shards(paths, queries)
+
+    assert table.document_ids.tolist() == expected.document_ids.tolist()
+    assert table.chunk_queries(1) == [queries[1]]
+
+    with pytest.raises(ValueError, match="missing"):
+        merge_shards(paths[:1])
+
+
+def test_merged_company_shards_match_search_by_companies(tmp_path):
+    use_fake_bigdata(corpus=CORPUS)
+    arguments = dict(
+        companies=CORPUS.companies[:25],
+        sentences=["Supply chain", "Pricing power"],
+        start_date="2021-01-01",
+        end_date="2021-12-31",
+        scope=DocumentType.NEWS,
+        freq="M",
+        document_limit=5,
+        batch_size=5,
+    )
+    expected = search_by_companies(**arguments, current_trace=Trace())
+
+    paths = [str(tmp_path / f"shard-{shard}.jsonl") for shard in range(3)]
+    for shard, path in enumerate(paths):
+        search_by_companies_shard(
+            **arguments, shards=3, shard=shard, path=path, by="query"
+        )
+    actual = merge_company_search_shards(
+        paths, CORPUS.companies[:25], scope=DocumentType.NEWS
+    )
+
+    assert len(expected) > 0
+    assert_frame_equal(actual, expected)